@@ -0,0 +1,21 @@
+import asyncio
+
+class FakeClock:
+    """Relógio controlado para o DeadlineScheduler: dormir apenas avança o tempo.
+
+    Com ele as penalidades de 2-5 minutos passam instantaneamente e os
+    benchmarks medem só o trabalho real de cada ciclo.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        seconds = max(seconds, 0)
+        self.now += seconds
+        self.slept += seconds
+        await asyncio.sleep(0)
@@ -0,0 +1,48 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+@dataclass
+class StubResponse:
+    text: Optional[str]
+
+class StubModel:
+    """Substituto local do modelo do Gemini para os benchmarks do `GeminiClient`.
+
+    Implementa só `generate_content_async`, com latência aleatória e frações
+    configuráveis de erros, chamadas que travam (até o timeout do cliente) e
+    respostas fora do formato. Registra a maior concorrência observada, para
+    conferir o limite do cliente.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0,
+                 hang_rate: float = 0.0, invalid_rate: float = 0.0, answer: str = "AB12C", seed: int = 1234):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.invalid_rate = invalid_rate
+        self.answer = answer
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+
+    async def generate_content_async(self, parts: List[Any]) -> StubResponse:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            roll = self._random.random()
+            if roll < self.hang_rate:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0))
+            roll -= self.hang_rate
+            if roll < self.error_rate:
+                raise ConnectionError("erro simulado da API")
+            if roll < self.error_rate + self.invalid_rate:
+                return StubResponse("não sei")
+            return StubResponse(" ".join(self.answer))
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,380 @@
+"""Servidor HTTP local que imita o narutoplayers.com.br para medições offline.
+
+As páginas em `benchmarks/pages/` reproduzem os seletores que o bot usa
+(login, seleção de personagem, status, caçadas por nível e por tempo,
+invasão e avisos `&aviso=5`). Os captchas de caçada são variações
+perturbadas das imagens de referência da raiz do repositório e os timers
+são configuráveis, então um ciclo completo roda sem tocar o site real.
+
+Uso direto:
+    python -m benchmarks.mock_server --port 8765 --penalty 0
+"""
+import argparse
+import io
+import logging
+import os
+import random
+import secrets
+import string
+import threading
+import time
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from PIL import Image, ImageDraw, ImageEnhance, ImageFont
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+CHARACTERS = ["Naruto", "Sakura", "Sasuke", "Kakashi"]
+LOGIN_ALPHABET = string.ascii_uppercase + string.digits
+
+@dataclass
+class MockConfig:
+    """Parâmetros do servidor simulado"""
+    penalty_seconds: int = 0           # penalidade após cada caçada por nível
+    timed_hunt_seconds: int = 0        # duração da caçada por tempo
+    invasion_interval: int = 0         # intervalo entre invasões
+    doujutsu_seconds: int = 3600       # duração do Rinnegan ativo
+    attack_error_rate: float = 0.0     # chance de o ataque à invasão voltar com &aviso=5
+    strict_login_captcha: bool = False # exige o texto exato do captcha de login
+    latency_ms: float = 0.0            # atraso artificial por requisição
+    captcha_variants: int = 8          # variações perturbadas por personagem
+    fixed_captcha_url: bool = False    # captcha sempre em /captcha/hunt.png, sem ?t= (como pode fazer o site real)
+    seed: int = 1234
+
+@dataclass
+class MockSession:
+    logged_in: bool = False
+    slot: Optional[int] = None
+    login_code: str = ""
+    expected_answer: Optional[str] = None
+    hunt_variant: Optional[bytes] = None
+    penalty_until: float = 0.0
+    timed_hunt_until: Optional[float] = None
+    reward_pending: bool = False
+    next_invasion: float = 0.0
+    doujutsu_until: float = 0.0
+    hp: int = 300
+    max_hp: int = 300
+    counters: Dict[str, int] = field(default_factory=dict)
+
+def _format_timer(seconds: float) -> str:
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def render_login_captcha(text: str, rng: Optional[random.Random] = None) -> bytes:
+    """Desenha um captcha de login de 5 caracteres com ruído (usado também para treinar o solver local)"""
+    rng = rng or random.Random()
+    image = Image.new("RGB", (120, 40), (230, 230, 230))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    x = 8
+    for char in text:
+        draw.text((x + rng.randint(-1, 1), 12 + rng.randint(-2, 2)), char, fill=(20, 20, 60), font=font)
+        x += 22
+    for _ in range(30):
+        draw.point((rng.randrange(120), rng.randrange(40)), fill=(150, 150, 150))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def perturb_reference(image: Image.Image, rng: random.Random) -> bytes:
+    """Gera uma variação do captcha de caçada (brilho, contraste, recorte e escala)"""
+    variant = ImageEnhance.Brightness(image).enhance(rng.uniform(0.8, 1.2))
+    variant = ImageEnhance.Contrast(variant).enhance(rng.uniform(0.85, 1.15))
+    width, height = variant.size
+    crop = rng.randint(0, 2)
+    variant = variant.crop((crop, crop, width - crop, height - crop))
+    scale = rng.uniform(0.9, 1.1)
+    variant = variant.resize((max(int(width * scale), 8), max(int(height * scale), 8)))
+    buffer = io.BytesIO()
+    variant.save(buffer, "JPEG", quality=rng.randint(70, 95))
+    return buffer.getvalue()
+
+def build_captcha_variants(count: int, seed: int = 1234) -> Dict[str, List[bytes]]:
+    """Variações perturbadas de cada imagem de referência (<personagem>.jpeg)"""
+    rng = random.Random(seed)
+    variants = {}
+    for char in CHARACTERS:
+        with Image.open(os.path.join(ROOT_DIR, f"{char.lower()}.jpeg")) as image:
+            reference = image.convert("RGB")
+        variants[char] = [perturb_reference(reference, rng) for _ in range(count)]
+    return variants
+
+_TINY_PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89"
+    b"\x00\x00\x00\rIDATx\x9cc\xf8\xcf\xc0\xf0\x1f\x00\x05\x00\x01\xff\x89\x99=\x1d\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+class MockGame:
+    """Estado do jogo simulado, compartilhado entre as threads do servidor"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.sessions: Dict[str, MockSession] = {}
+        self.lock = threading.Lock()
+        self.templates = {
+            name[:-5]: Template(open(os.path.join(PAGES_DIR, name), encoding="utf-8").read())
+            for name in os.listdir(PAGES_DIR) if name.endswith(".html")
+        }
+        self.variants = build_captcha_variants(config.captcha_variants, config.seed)
+        self.request_count = 0
+
+    def render(self, template: str, **values) -> str:
+        content = self.templates[template].safe_substitute(**values)
+        return self.templates["layout"].safe_substitute(content=content)
+
+    def session(self, session_id: str) -> MockSession:
+        if session_id not in self.sessions:
+            self.sessions[session_id] = MockSession(doujutsu_until=time.time() + self.config.doujutsu_seconds)
+        return self.sessions[session_id]
+
+    def new_hunt_captcha(self, session: MockSession) -> str:
+        char = self.rng.choice(CHARACTERS)
+        session.expected_answer = str(CHARACTERS.index(char) + 1)
+        session.hunt_variant = self.rng.choice(self.variants[char])
+        return self.render_captcha_block()
+
+    def render_captcha_block(self) -> str:
+        if self.config.fixed_captcha_url:
+            return self.templates["captcha_fixed"].safe_substitute()
+        return self.templates["captcha"].safe_substitute(token=secrets.token_hex(4))
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    game: MockGame = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug("mock: " + format % args)
+
+    # --- infraestrutura -------------------------------------------------
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        session_id = cookie["NPSESSID"].value if "NPSESSID" in cookie else None
+        new_cookie = None
+        if not session_id or session_id not in self.game.sessions:
+            session_id = secrets.token_hex(8)
+            new_cookie = session_id
+        return session_id, self.game.session(session_id), new_cookie
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _html(self, html: str, new_cookie: Optional[str] = None):
+        headers = {"Set-Cookie": f"NPSESSID={new_cookie}; Path=/"} if new_cookie else {}
+        self._send(200, html.encode("utf-8"), "text/html; charset=utf-8", headers)
+
+    def _redirect(self, location: str, new_cookie: Optional[str] = None):
+        headers = {"Location": location}
+        if new_cookie:
+            headers["Set-Cookie"] = f"NPSESSID={new_cookie}; Path=/"
+        self._send(302, b"", "text/html", headers)
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        return {key: values[0] for key, values in parse_qs(body).items()}
+
+    def do_GET(self):
+        self._dispatch({})
+
+    def do_POST(self):
+        self._dispatch(self._form())
+
+    def _dispatch(self, form: Dict[str, str]):
+        game = self.game
+        if game.config.latency_ms:
+            time.sleep(game.config.latency_ms / 1000)
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        with game.lock:
+            game.request_count += 1
+            session_id, session, new_cookie = self._session()
+            key = f"{url.path}?p={query.get('p', '')}"
+            session.counters[key] = session.counters.get(key, 0) + 1
+
+            if url.path == "/captcha/hunt.png":
+                return self._send(200, session.hunt_variant or b"", "image/jpeg", {"Cache-Control": "no-store"})
+            if url.path == "/captcha/login.png":
+                session.login_code = "".join(game.rng.choice(LOGIN_ALPHABET) for _ in range(5))
+                return self._send(200, render_login_captcha(session.login_code, game.rng), "image/png")
+            if url.path.startswith("/static/"):
+                return self._send(200, _TINY_PNG, "image/png")
+            if url.path != "/":
+                return self._send(404, b"not found", "text/plain")
+
+            page = query.get("p")
+            if page == "login" and self.command == "POST":
+                return self._login(session, form, new_cookie)
+            if not session.logged_in:
+                return self._html(game.render("login", token=secrets.token_hex(4)), new_cookie)
+            if page == "selecionar":
+                return self._select(session, query)
+            if session.slot is None:
+                return self._html(game.render("selecao"))
+            if page == "status":
+                return self._status(session, query)
+            if page == "cacadas":
+                return self._hunts(session, query, form)
+            if page == "invasao":
+                return self._invasion(session, query, form)
+            return self._redirect("?p=status")
+
+    # --- páginas --------------------------------------------------------
+    def _login(self, session: MockSession, form: Dict[str, str], new_cookie: Optional[str]):
+        code = form.get("codigo", "")
+        valid = code.upper() == session.login_code if self.game.config.strict_login_captcha else len(code) == 5
+        if form.get("usuario") and valid:
+            session.logged_in = True
+            return self._html(self.game.render("selecao"), new_cookie)
+        return self._html(self.game.render("login", token=secrets.token_hex(4)), new_cookie)
+
+    def _select(self, session: MockSession, query: Dict[str, str]):
+        slot = query.get("slot", "1")
+        if query.get("confirma") == "ok":
+            session.slot = int(slot)
+            return self._redirect("?p=status")
+        return self._html(self.game.render("confirmar", slot=slot))
+
+    def _status(self, session: MockSession, query: Dict[str, str]):
+        now = time.time()
+        if query.get("usar"):
+            session.hp = session.max_hp
+        if query.get("ativar"):
+            session.doujutsu_until = now + self.game.config.doujutsu_seconds
+        timer = _format_timer(session.doujutsu_until - now) if session.doujutsu_until > now else "Inativo"
+        return self._html(self.game.render(
+            "status", hp=session.hp, max_hp=session.max_hp,
+            doujutsu_name="Rinnegan", doujutsu_timer=timer
+        ))
+
+    def _hunts(self, session: MockSession, query: Dict[str, str], form: Dict[str, str]):
+        game, now = self.game, time.time()
+        action = query.get("action", "tempo")
+
+        if action == "atacar" and self.command == "POST":
+            enemy = game.rng.choice(["Zabuza", "Haku", "Kabuto", "Orochimaru"])
+            damage = game.rng.randint(10, 60)
+            session.hp = max(session.hp - damage, 1)
+            session.penalty_until = now + game.config.penalty_seconds
+            result = f"Você venceu a batalha contra {enemy}! Ganhou 25 de experiência e 40 ryous. Perdeu {damage} de HP."
+            return self._html(game.render("cacadas_resultado", enemy=enemy, result=result))
+
+        if action == "nivel":
+            if self.command == "POST":
+                if form.get("resposta") != session.expected_answer:
+                    return self._redirect("?p=cacadas&action=nivel&aviso=5")
+                return self._html(game.render("cacadas_batalha"))
+            if session.penalty_until > now:
+                return self._html(game.render("timer", timer=_format_timer(session.penalty_until - now)))
+            return self._html(game.render("cacadas_nivel", captcha=game.new_hunt_captcha(session)))
+
+        # Caçada por tempo (também é a página de ?p=cacadas)
+        if query.get("receber") and session.reward_pending:
+            session.reward_pending = False
+            reward = '<div class="cacada_recompensa">Você recebeu 120 de experiência e 200 ryous.</div>'
+            return self._html(game.render("cacadas_tempo", body="", reward=reward))
+        if self.command == "POST":
+            if form.get("resposta") != session.expected_answer:
+                return self._redirect("?p=cacadas&action=tempo&aviso=5")
+            session.timed_hunt_until = now + game.config.timed_hunt_seconds
+        if session.timed_hunt_until is not None:
+            if session.timed_hunt_until > now:
+                body = f'<span id="relogio_contador">{_format_timer(session.timed_hunt_until - now)}</span>'
+                return self._html(game.render("cacadas_tempo", body=body, reward=""))
+            session.timed_hunt_until = None
+            session.reward_pending = True
+        if session.reward_pending:
+            body = '<a id="receber_m" href="?p=cacadas&action=tempo&receber=1"><img src="/static/receber.png" width="60" height="20"></a>'
+            return self._html(game.render("cacadas_tempo", body=body, reward=""))
+        body = game.new_hunt_captcha(session) + '<input type="submit" value="Caçar">'
+        return self._html(game.render("cacadas_tempo", body=body, reward=""))
+
+    def _invasion(self, session: MockSession, query: Dict[str, str], form: Dict[str, str]):
+        game, now = self.game, time.time()
+        if self.command == "POST":
+            if session.hp < 25:
+                return self._redirect("?p=invasao&aviso=5&erro=hp")
+            if form.get("resposta") != session.expected_answer or game.rng.random() < game.config.attack_error_rate:
+                return self._redirect("?p=invasao&aviso=5")
+            session.next_invasion = now + game.config.invasion_interval
+            return self._html(game.render("invasao", captcha="", invasion=_format_timer(game.config.invasion_interval)))
+
+        if query.get("aviso") == "5":
+            error = ("Você precisa de pelo menos 25 pontos de HP para atacar." if query.get("erro") == "hp"
+                     else "Resposta incorreta, tente novamente.")
+            return self._html(game.render("aviso", error=error))
+
+        if session.next_invasion > now:
+            return self._html(game.render("invasao", captcha="", invasion=_format_timer(session.next_invasion - now)))
+        return self._html(game.render("invasao", captcha=game.new_hunt_captcha(session), invasion="Atacar!"))
+
+class MockServer:
+    """Servidor simulado rodando em uma thread de fundo"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.game = MockGame(config or MockConfig())
+        handler = type("BoundMockRequestHandler", (MockRequestHandler,), {"game": self.game})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local que imita o narutoplayers.com.br")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--penalty", type=int, default=0, help="Penalidade da caçada por nível (s)")
+    parser.add_argument("--timed-hunt", type=int, default=0, help="Duração da caçada por tempo (s)")
+    parser.add_argument("--invasion-interval", type=int, default=0, help="Intervalo entre invasões (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Chance de &aviso=5 no ataque à invasão")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fixed-captcha-url", action="store_true",
+                        help="Serve o captcha de caçada sempre na mesma URL, sem ?t=")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config = MockConfig(
+        penalty_seconds=args.penalty, timed_hunt_seconds=args.timed_hunt,
+        invasion_interval=args.invasion_interval, attack_error_rate=args.error_rate,
+        latency_ms=args.latency_ms, fixed_captcha_url=args.fixed_captcha_url
+    )
+    server = MockServer(config, port=args.port)
+    logging.info(f"Servidor simulado em {server.base_url} (NP_BASE_URL={server.base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
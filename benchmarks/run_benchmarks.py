@@ -0,0 +1,378 @@
+"""Benchmarks offline do bot contra o servidor simulado.
+
+Mede, sem tocar o site real:
+  - vazão e acurácia do reconhecimento do captcha de caçada
+    (caminho de `identify_character` e lote vetorizado);
+  - acurácia e latência do solver local do captcha de login;
+  - importação a frio dos módulos do bot (sem carregar o SDK do Gemini);
+  - rajada de captchas de login no cliente compartilhado do Gemini, contra
+    um modelo simulado com latência, erros e travamentos;
+  - com Chromium disponível: tempo até a primeira ação (fases do início),
+    tempo de login, latência ponta a ponta de cada tipo de ciclo (nível,
+    tempo, invasão) e memória por contexto em cada perfil de navegador
+    (standard e lite).
+
+Uso (na raiz do repositório):
+    python -m benchmarks.run_benchmarks --cycles 5 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from bot.browser_profile import PROFILES, BrowserProfile, get_profile
+from bot.captcha_processor import CaptchaProcessor
+from bot.gemini import GeminiClient
+from bot.login_captcha_processor import _clean_answer
+from bot.login_captcha_solver import LocalCaptchaSolver
+from bot.metrics import MetricsRegistry
+from benchmarks.fake_clock import FakeClock
+from benchmarks.gemini_stub import StubModel
+from benchmarks.mock_server import (
+    CHARACTERS, LOGIN_ALPHABET, ROOT_DIR, MockConfig, MockServer,
+    build_captcha_variants, render_login_captcha,
+)
+
+try:
+    import psutil
+except ImportError:  # opcional: apenas para a medição de memória
+    psutil = None
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    """Resumo em milissegundos de uma lista de durações em segundos"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def bench_hunt_captcha(variants_per_char: int) -> Dict:
+    """Acurácia e vazão do reconhecimento do captcha de caçada"""
+    processor = CaptchaProcessor(CHARACTERS)
+    variants = build_captcha_variants(variants_per_char, seed=98765)
+    images = [(char, image) for char, images in variants.items() for image in images]
+
+    durations, correct, rejected = [], 0, 0
+    for char, image in images:
+        start = time.perf_counter()
+        hashes = processor._get_image_hashes(image)
+        answer = processor._find_best_match(hashes) if hashes else None
+        durations.append(time.perf_counter() - start)
+        correct += answer == char
+        rejected += answer is None
+
+    start = time.perf_counter()
+    batch = processor.match_images([image for _, image in images])
+    batch_seconds = time.perf_counter() - start
+    margins = [result.margin for result in batch if result and result.margin is not None]
+
+    return {
+        "images": len(images),
+        "accuracy": correct / len(images),
+        "rejected": rejected,
+        "single": _summary(durations),
+        "batch_per_image_ms": batch_seconds / len(images) * 1000,
+        "mean_margin": statistics.mean(margins) if margins else None,
+    }
+
+def train_login_solver(samples: int, seed: int = 4321) -> LocalCaptchaSolver:
+    """Treina o solver local com captchas no mesmo formato do servidor simulado"""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(samples):
+            text = "".join(rng.choice(LOGIN_ALPHABET) for _ in range(5))
+            with open(os.path.join(directory, f"{text}_{i}.png"), "wb") as f:
+                f.write(render_login_captcha(text, rng))
+        solver = LocalCaptchaSolver(bank_path=None)
+        solver.train(directory)
+    return solver
+
+def bench_login_solver(solver: LocalCaptchaSolver, samples: int) -> Dict:
+    """Acurácia, cobertura (respostas confiantes) e latência do solver local"""
+    rng = random.Random(2468)
+    durations, correct, confident, confident_correct = [], 0, 0, 0
+    for _ in range(samples):
+        text = "".join(rng.choice(LOGIN_ALPHABET) for _ in range(5))
+        image = render_login_captcha(text, rng)
+        start = time.perf_counter()
+        solution = solver.solve(image)
+        durations.append(time.perf_counter() - start)
+        if solution:
+            correct += solution.text == text
+            confident += solution.confident
+            confident_correct += solution.confident and solution.text == text
+    return {
+        "samples": samples,
+        "accuracy": correct / samples,
+        "confident_rate": confident / samples,
+        "confident_precision": confident_correct / confident if confident else None,
+        "latency": _summary(durations),
+    }
+
+_IMPORT_PROBE = (
+    "import sys, time; start = time.perf_counter(); import bot.fleet; "
+    "print(time.perf_counter() - start, 'google.generativeai' in sys.modules)"
+)
+
+def bench_imports(runs: int = 3) -> Dict:
+    """Importação a frio dos módulos do bot (processo novo a cada vez) e se o SDK do Gemini foi carregado"""
+    durations, gemini_loaded = [], False
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.split()
+        durations.append(float(output[0]))
+        gemini_loaded |= output[1] == "True"
+    return {"import": _summary(durations), "gemini_loaded_at_import": gemini_loaded}
+
+async def bench_gemini_storm(logins: int = 40) -> Dict:
+    """Rajada de logins (como depois de um reinício) no cliente compartilhado do Gemini.
+
+    Escala de tempo reduzida: o modelo simulado responde em ~50 ms, 10% das
+    chamadas falham, 5% travam e 5% voltam fora do formato.
+    """
+    model = StubModel(latency=0.05, error_rate=0.10, hang_rate=0.05, invalid_rate=0.05)
+    client = GeminiClient(model_factory=lambda: model, rate=20.0, burst=5, max_concurrency=4,
+                          call_timeout=0.5, deadline=3.0, retries=2, backoff=0.05, max_backoff=0.4,
+                          metrics=MetricsRegistry())
+    durations: List[float] = []
+
+    async def login(index: int) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            return await client.generate(["prompt", b"imagem"], validate=_clean_answer, account=f"conta{index}")
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    logging.disable(logging.WARNING)
+    try:
+        start = time.perf_counter()
+        answers = await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "logins": logins,
+        "answered": sum(1 for answer in answers if answer),
+        "wall_s": elapsed,
+        "per_login": _summary(durations),
+        "model_calls": model.calls,
+        "max_concurrency": model.max_in_flight,
+        "client": client.stats(),
+    }
+
+async def bench_startup(config: MockConfig, profile: BrowserProfile, solver: LocalCaptchaSolver) -> Dict:
+    """Tempo até a primeira ação pela mesma via do index.py (run_fleet), com uma conta nova"""
+    from bot.naruto_bot import NarutoBot
+    from bot.captcha_cache import CaptchaCache
+    from bot.fleet import run_fleet
+    from bot.fleet_config import AccountConfig
+    from bot.login_captcha_processor import LoginCaptchaProcessor
+    from bot.scheduler import DeadlineScheduler
+    from bot.session_store import SessionStore
+    from bot.startup import StartupTimer
+
+    with MockServer(config) as server, tempfile.TemporaryDirectory() as sessions_dir:
+        startup = StartupTimer(metrics=MetricsRegistry())
+        clock = FakeClock()
+
+        def make_bot(account: AccountConfig) -> NarutoBot:
+            bot = NarutoBot(
+                username=account.username, password=account.password, hunt_type=account.hunt_type,
+                scheduler=DeadlineScheduler(clock=clock, sleep=clock.sleep),
+                session_store=SessionStore(sessions_dir), base_url=server.base_url,
+                metrics=startup.metrics, captcha_cache=CaptchaCache(path=None), profile=profile,
+                login_solver=solver, startup=startup,
+            )
+            bot.login_captcha_processor = LoginCaptchaProcessor(local_solver=solver, samples_dir=None)
+            return bot
+
+        accounts = {"bench_startup": AccountConfig("bench_startup", "bench", mode="invasion")}
+        fleet = asyncio.create_task(run_fleet(accounts, make_bot, profile=profile, startup=startup))
+        first_action = asyncio.create_task(startup.first_action_event.wait())
+        try:
+            await asyncio.wait({fleet, first_action}, timeout=120, return_when=asyncio.FIRST_COMPLETED)
+            if fleet.done():
+                fleet.result()  # a frota terminou antes da primeira ação: propaga o erro
+            if not first_action.done():
+                raise TimeoutError("Nenhuma ação em 120 segundos")
+        finally:
+            first_action.cancel()
+            fleet.cancel()
+            try:
+                await fleet
+            except asyncio.CancelledError:
+                pass
+    return startup.summary()
+
+def _browser_rss() -> Optional[int]:
+    """RSS somado dos processos filhos (driver do Playwright e Chromium)"""
+    if psutil is None:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+async def _measure_profile_memory(p, profile: BrowserProfile, contexts: int, server: MockServer) -> Optional[Dict]:
+    """RSS do navegador e por contexto em um perfil (None sem psutil)"""
+    baseline = _browser_rss()
+    browser = await p.chromium.launch(**profile.launch_options(headless=True))
+    try:
+        before = _browser_rss()
+        opened = []
+        for _ in range(contexts):
+            context = await browser.new_context(**profile.context_options())
+            await profile.request_filter(urlsplit(server.base_url).hostname).install(context)
+            page = await context.new_page()
+            await page.goto(server.base_url)
+            opened.append(context)
+        after = _browser_rss()
+        for context in opened:
+            await context.close()
+    finally:
+        await browser.close()
+    if baseline is None or before is None or after is None:
+        return None
+    return {
+        "browser_baseline_mb": (before - baseline) / 2 ** 20,
+        "per_context_mb": (after - before) / contexts / 2 ** 20,
+        "contexts": contexts,
+    }
+
+async def bench_browser(cycles: int, contexts: int, config: MockConfig, profile: BrowserProfile) -> Dict:
+    """Login, ciclos ponta a ponta por tipo de caçada (no perfil dado) e memória por contexto em cada perfil"""
+    from playwright.async_api import async_playwright
+    from bot.naruto_bot import NarutoBot
+    from bot.captcha_capture import ResponseImageCapture
+    from bot.captcha_cache import CaptchaCache
+    from bot.game_state import GameStateClient
+    from bot.login_captcha_processor import LoginCaptchaProcessor
+    from bot.scheduler import DeadlineScheduler
+    from bot.session_store import SessionStore
+
+    solver = train_login_solver(300)
+    # No benchmark o solver local sempre responde, então o Gemini nunca é chamado
+    solver.min_confidence = solver.min_margin = -1.0
+    metrics = MetricsRegistry()
+    results: Dict = {"profile": profile.name}
+
+    with MockServer(config) as server, tempfile.TemporaryDirectory() as sessions_dir:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(**profile.launch_options(headless=True))
+
+            for hunt_type, name in ((1, "level"), (2, "timed"), (3, "invasion")):
+                clock = FakeClock()
+                bot = NarutoBot(
+                    username=f"bench_{name}", password="bench", hunt_type=hunt_type,
+                    scheduler=DeadlineScheduler(clock=clock, sleep=clock.sleep),
+                    session_store=SessionStore(sessions_dir), base_url=server.base_url,
+                    metrics=metrics, captcha_cache=CaptchaCache(path=None), profile=profile
+                )
+                bot.login_captcha_processor = LoginCaptchaProcessor(local_solver=solver, samples_dir=None)
+
+                context = await bot._new_context(browser)
+                page = await context.new_page()
+                ResponseImageCapture.attach(page)
+
+                start = time.perf_counter()
+                await bot._authenticate(context, page)
+                login_seconds = time.perf_counter() - start
+                bot.state_client = GameStateClient(context, server.base_url)
+
+                cycle = {1: bot._execute_hunt_cycle, 2: bot._execute_timed_hunt_cycle, 3: bot._execute_invasion}[hunt_type]
+                durations, successes = [], 0
+                for _ in range(cycles):
+                    start = time.perf_counter()
+                    successes += bool(await cycle(page))
+                    durations.append(time.perf_counter() - start)
+
+                results[name] = {
+                    "login_ms": login_seconds * 1000,
+                    "cycle": _summary(durations),
+                    "success_rate": successes / cycles,
+                    "blocked_requests": bot.request_filter.summary(),
+                    "fake_seconds_scheduled": max(bot.scheduler.pending(bot.username).values(), default=0.0),
+                }
+                await context.close()
+
+            await browser.close()
+
+            # Memória: para cada perfil, um Chromium próprio com N contextos parados na página de login
+            for measured in PROFILES.values():
+                memory = await _measure_profile_memory(p, measured, contexts, server)
+                if memory is not None:
+                    results.setdefault("memory", {})[measured.name] = memory
+
+        results["server_requests"] = server.game.request_count
+    # Latência média de cada fase instrumentada, somando as contas
+    results["phases_mean_ms"] = {
+        h["labels"]["phase"]: h["sum"] / h["count"] * 1000
+        for h in metrics.snapshot()["histograms"]
+        if h["name"] == "phase_seconds" and h["labels"].get("account") and h["count"]
+    }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks offline do NarutoBot")
+    parser.add_argument("--cycles", type=int, default=5, help="Ciclos por tipo de caçada")
+    parser.add_argument("--contexts", type=int, default=4, help="Contextos para medir memória")
+    parser.add_argument("--captcha-variants", type=int, default=50, help="Captchas de caçada por personagem")
+    parser.add_argument("--login-samples", type=int, default=200, help="Captchas de login avaliados")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência artificial do servidor")
+    parser.add_argument("--profile", default="standard", choices=sorted(PROFILES),
+                        help="Perfil do navegador nos ciclos (a memória é medida em todos)")
+    parser.add_argument("--fixed-captcha-url", action="store_true",
+                        help="Captcha de caçada sempre na mesma URL (testa a captura pela rede sem ?t=)")
+    parser.add_argument("--skip-browser", action="store_true", help="Roda apenas os benchmarks sem Chromium")
+    parser.add_argument("--json", help="Salva o relatório em JSON neste arquivo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    os.chdir(ROOT_DIR)  # os hashes de referência ficam na raiz
+
+    report = {
+        "startup": bench_imports(),
+        "hunt_captcha": bench_hunt_captcha(args.captcha_variants),
+        "login_solver": bench_login_solver(train_login_solver(300), args.login_samples),
+        "gemini_storm": asyncio.run(bench_gemini_storm()),
+    }
+    if not args.skip_browser:
+        try:
+            report["browser"] = asyncio.run(bench_browser(
+                args.cycles, args.contexts, MockConfig(latency_ms=args.latency_ms, fixed_captcha_url=args.fixed_captcha_url), get_profile(args.profile)
+            ))
+        except Exception as e:
+            logging.error(f"Benchmarks com navegador ignorados: {e}")
+        try:
+            solver = train_login_solver(300)
+            solver.min_confidence = solver.min_margin = -1.0
+            report["startup"].update(asyncio.run(bench_startup(
+                MockConfig(latency_ms=args.latency_ms, fixed_captcha_url=args.fixed_captcha_url), get_profile(args.profile), solver
+            )))
+        except Exception as e:
+            logging.error(f"Benchmark de início com navegador ignorado: {e}")
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from .request_filter import RequestFilter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Recursos do Chromium que o bot nunca usa (cada um mantém processos, timers ou caches próprios)
+_LITE_DISABLED_FEATURES = (
+    "Translate", "MediaRouter", "OptimizationHints", "AutofillServerCommunication",
+    "BackForwardCache", "InterestFeedContentSuggestions", "DialMediaRouteProvider",
+)
+
+_LITE_ARGS = (
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    # Cache de disco mínimo: as páginas do jogo são dinâmicas e os captchas não se repetem pela URL
+    "--disk-cache-size=1048576",
+    "--media-cache-size=1",
+    "--disable-features=" + ",".join(_LITE_DISABLED_FEATURES),
+)
+
+@dataclass(frozen=True)
+class BrowserProfile:
+    """Flags de lançamento do Chromium, opções de contexto e política de bloqueio de um perfil"""
+    name: str
+    launch_args: Tuple[str, ...] = ()
+    viewport: Dict[str, int] = field(default_factory=lambda: {'width': 1920, 'height': 1080})
+    service_workers: str = "allow"
+    blocked_resource_types: Tuple[str, ...] = ("font", "media")
+    block_site_images: bool = False
+    block_third_party_stylesheets: bool = False
+
+    def launch_options(self, headless: bool = True) -> Dict:
+        """Argumentos de `chromium.launch`"""
+        return {"headless": headless, "args": list(self.launch_args)}
+
+    def context_options(self, storage_state: Optional[str] = None) -> Dict:
+        """Argumentos de `browser.new_context`"""
+        return {
+            "viewport": self.viewport,
+            "user_agent": USER_AGENT,
+            "service_workers": self.service_workers,
+            "storage_state": storage_state,
+        }
+
+    def request_filter(self, site_host: str, rate_controller=None) -> RequestFilter:
+        """Filtro de requisições com a política de bloqueio do perfil"""
+        return RequestFilter(
+            site_host=site_host,
+            rate_controller=rate_controller,
+            blocked_resource_types=self.blocked_resource_types,
+            block_site_images=self.block_site_images,
+            block_third_party_stylesheets=self.block_third_party_stylesheets,
+        )
+
+# O comportamento de sempre: janela grande, flags padrão, apenas anúncios, fontes e mídia bloqueados
+STANDARD = BrowserProfile("standard")
+
+# Para muitas contas por máquina: janela mínima (os captchas e botões continuam
+# dentro dela), recursos do Chromium desligados, sem service workers e sem
+# imagens do site fora das páginas de login, caçadas e invasão (veja
+# CAPTCHA_PAGES em request_filter.py). O CSS do próprio site continua carregando,
+# pois a visibilidade dos elementos que o bot espera depende dele.
+LITE = BrowserProfile(
+    "lite",
+    launch_args=_LITE_ARGS,
+    viewport={'width': 800, 'height': 600},
+    service_workers="block",
+    blocked_resource_types=("font", "media", "texttrack", "eventsource", "manifest"),
+    block_site_images=True,
+    block_third_party_stylesheets=True,
+)
+
+PROFILES: Dict[str, BrowserProfile] = {profile.name: profile for profile in (STANDARD, LITE)}
+
+def get_profile(name: str) -> BrowserProfile:
+    """Perfil pelo nome (`standard` ou `lite`)"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Perfil de navegador desconhecido: {name} (opções: {', '.join(PROFILES)})")
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+import numpy as np
+from .reference_bank import HASH_TYPES, HASH_VERSION
+
+DEFAULT_CACHE_PATH = "captcha_cache.npz"
+
+def image_digest(image_data: bytes) -> bytes:
+    """Digest exato dos bytes do captcha (a mesma imagem servida de novo tem o mesmo digest)"""
+    return hashlib.blake2b(image_data, digest_size=16).digest()
+
+class CachedCaptcha(NamedTuple):
+    character: str
+    row: Optional[np.ndarray]  # hashes (3,) uint64; None quando só o digest é conhecido
+    promoted: bool  # se a linha entra no banco de referências usado no casamento
+
+class CaptchaCache:
+    """Captchas já confirmados pelo site, usados como atalho e como referências novas.
+
+    Cada captcha resolvido fica pendente até a página seguinte confirmar a
+    resposta; só então entra aqui. A busca pelo digest exato devolve a resposta
+    sem calcular hashes, e as amostras promovidas ampliam o banco de
+    referências. O tamanho é limitado (descarte LRU) e o conteúdo é gravado
+    periodicamente em disco.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 2000,
+                 persist_every: int = 20):
+        self.path = path
+        self.max_entries = max_entries
+        self.persist_every = persist_every
+        self.version = 0  # muda sempre que o conjunto de linhas promovidas muda
+        self._entries: "OrderedDict[bytes, CachedCaptcha]" = OrderedDict()
+        self._unsaved = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, digest: bytes) -> Optional[str]:
+        """Resposta confirmada para um captcha idêntico, se houver"""
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        self._entries.move_to_end(digest)
+        return entry.character
+
+    def confirm(self, digest: bytes, character: str, row: Optional[np.ndarray], promote: bool) -> None:
+        """Guarda um captcha cuja resposta o site aceitou"""
+        previous = self._entries.pop(digest, None)
+        if previous is not None and row is None:
+            # Captcha reaproveitado pelo atalho: mantém a linha que já conhecíamos
+            row, promote = previous.row, previous.promoted
+        self._entries[digest] = CachedCaptcha(character, row, promote and row is not None)
+        if self._entries[digest].promoted or (previous is not None and previous.promoted):
+            self.version += 1
+
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            if evicted.promoted:
+                self.version += 1
+        self._mark_dirty()
+
+    def reject(self, digest: bytes) -> None:
+        """Remove um captcha cuja resposta guardada o site recusou"""
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            logging.warning(f"Captcha em cache recusado pelo site ({entry.character}), descartado.")
+            if entry.promoted:
+                self.version += 1
+            self._mark_dirty()
+
+    def promoted_rows(self) -> Dict[str, np.ndarray]:
+        """Linhas promovidas agrupadas por personagem"""
+        grouped: Dict[str, list] = {}
+        for entry in self._entries.values():
+            if entry.promoted:
+                grouped.setdefault(entry.character, []).append(entry.row)
+        return {char: np.array(rows, dtype=np.uint64) for char, rows in grouped.items()}
+
+    def _mark_dirty(self) -> None:
+        self._unsaved += 1
+        if self.path and self._unsaved >= self.persist_every:
+            self.save()
+
+    def save(self) -> None:
+        """Grava o cache (escrita atômica)"""
+        if not self.path or not self._unsaved:
+            return
+        entries = list(self._entries.items())
+        rows = np.array([e.row if e.row is not None else np.zeros(len(HASH_TYPES), dtype=np.uint64)
+                         for _, e in entries], dtype=np.uint64).reshape(-1, len(HASH_TYPES))
+        # Um arquivo temporário por processo: os workers da frota gravam o mesmo cache
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(
+                    f,
+                    digests=np.array([digest for digest, _ in entries], dtype="S16"),
+                    characters=np.array([e.character for _, e in entries], dtype=str),
+                    rows=rows,
+                    has_row=np.array([e.row is not None for _, e in entries], dtype=bool),
+                    promoted=np.array([e.promoted for _, e in entries], dtype=bool),
+                    hash_version=np.array(HASH_VERSION),
+                )
+            os.replace(temp_path, self.path)
+            self._unsaved = 0
+            logging.debug(f"Cache de captchas salvo em {self.path} ({len(entries)} entradas).")
+        except OSError as e:
+            logging.warning(f"Não foi possível salvar o cache de captchas: {e}")
+
+    def load(self) -> None:
+        """Carrega o cache salvo, na ordem LRU em que foi gravado"""
+        try:
+            with np.load(self.path) as data:
+                # Caches sem a marca são posteriores à versão 2 dos hashes
+                hash_version = int(data["hash_version"]) if "hash_version" in data.files else 2
+                if hash_version != HASH_VERSION:
+                    # As respostas por digest continuam valendo; as linhas de hash de outra versão não
+                    logging.warning(f"Cache de captchas com hashes da versão {hash_version}: "
+                                    f"referências promovidas descartadas.")
+                for digest, char, row, has_row, promoted in zip(
+                        data["digests"], data["characters"], data["rows"], data["has_row"], data["promoted"]):
+                    compatible = has_row and hash_version == HASH_VERSION
+                    self._entries[bytes(digest).ljust(16, b"\0")] = CachedCaptcha(
+                        str(char), row.copy() if compatible else None, bool(promoted) and compatible)
+            self.version += 1
+            logging.info(f"Cache de captchas carregado de {self.path}: {len(self._entries)} entradas.")
+        except (OSError, KeyError, ValueError) as e:
+            logging.error(f"Erro ao carregar o cache de captchas {self.path}: {e}")
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import logging
+from collections import OrderedDict
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+# Descobre a URL da imagem de um elemento: <img>, <img> descendente ou background-image do CSS
+_IMAGE_URL_SCRIPT = """
+(el) => {
+    const img = el.tagName === 'IMG' ? el : el.querySelector('img');
+    if (img && (img.currentSrc || img.src)) {
+        return img.currentSrc || img.src;
+    }
+    for (const node of [el, ...el.querySelectorAll('*')]) {
+        const match = /url\\(["']?(.*?)["']?\\)/.exec(getComputedStyle(node).backgroundImage || '');
+        if (match) {
+            return new URL(match[1], document.baseURI).href;
+        }
+    }
+    return null;
+}
+"""
+
+_captures: "WeakKeyDictionary" = WeakKeyDictionary()
+
+class ResponseImageCapture:
+    """Guarda as respostas de imagem recebidas pela página.
+
+    Permite obter os bytes originais da imagem do captcha direto da rede, sem
+    forçar layout, pintura e codificação PNG de um screenshot. Apenas os
+    objetos de resposta são guardados; o corpo só é lido quando pedido.
+
+    As respostas são esquecidas a cada navegação do frame principal: se o
+    site servir o captcha sempre na mesma URL, a imagem da página anterior
+    não pode ser confundida com a nova (o elemento fica visível antes de a
+    nova imagem chegar).
+    """
+
+    def __init__(self, page, max_entries: int = 64):
+        self._max_entries = max_entries
+        self._responses: "OrderedDict[str, object]" = OrderedDict()
+        self._arrived = asyncio.Event()
+        page.on("response", self._on_response)
+        page.on("framenavigated", self._on_navigated)
+
+    @classmethod
+    def attach(cls, page) -> "ResponseImageCapture":
+        """Começa a capturar as imagens da página (deve ser chamado antes da navegação)"""
+        if page not in _captures:
+            _captures[page] = cls(page)
+        return _captures[page]
+
+    @staticmethod
+    def get(page) -> Optional["ResponseImageCapture"]:
+        """Retorna a captura associada à página, se houver"""
+        return _captures.get(page)
+
+    def _on_navigated(self, frame) -> None:
+        if frame.parent_frame is None:
+            self._responses.clear()
+
+    def _on_response(self, response) -> None:
+        if response.request.resource_type != "image" or not response.ok:
+            return
+        self._responses[response.url] = response
+        self._responses.move_to_end(response.url)
+        while len(self._responses) > self._max_entries:
+            self._responses.popitem(last=False)
+        self._arrived.set()
+
+    async def image_for(self, locator, timeout: float = 2.0) -> Optional[bytes]:
+        """Retorna os bytes da imagem exibida pelo elemento, ou None se a rede não a capturou"""
+        url = await locator.evaluate(_IMAGE_URL_SCRIPT)
+        if not url:
+            return None
+
+        if url.startswith("data:"):
+            header, _, data = url.partition(",")
+            return base64.b64decode(data) if header.endswith(";base64") else None
+
+        # A resposta pode chegar logo depois do elemento ficar visível
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while url not in self._responses:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logging.debug(f"Imagem do captcha não interceptada: {url}")
+                return None
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            return await self._responses[url].body()
+        except Exception as e:
+            logging.debug(f"Corpo da imagem do captcha indisponível ({url}): {e}")
+            return None
+
+async def capture_element_image(page, locator, **screenshot_options) -> bytes:
+    """Obtém a imagem do elemento pela rede e cai para screenshot se a interceptação falhar"""
+    capture = ResponseImageCapture.get(page)
+    if capture is not None:
+        try:
+            image_data = await capture.image_for(locator)
+            if image_data:
+                return image_data
+        except Exception as e:
+            logging.debug(f"Falha ao capturar imagem pela rede: {e}")
+    logging.debug("Usando screenshot do elemento como fallback.")
+    return await locator.screenshot(**screenshot_options)
@@ -0,0 +1,128 @@
+import io
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageChops
+from .reference_bank import HASH_TYPES
+
+# Toda imagem é normalizada para este tamanho antes dos hashes, então variações
+# de escala e de recorte do captcha chegam iguais aos níveis menores. Isso muda os
+# valores em relação ao imagehash (ahash e dhash, sobretudo): qualquer mudança aqui
+# exige incrementar HASH_VERSION em reference_bank.py
+CANONICAL_SIZE = (64, 64)
+# Diferença mínima em relação à cor da borda para um pixel contar como conteúdo
+TRIM_TOLERANCE = 12
+# Menor recorte aceito (evita reduzir a imagem a um ruído isolado)
+MIN_TRIM_SIZE = 8
+_TRIM_LUT = [255 if v > TRIM_TOLERANCE else 0 for v in range(256)]
+
+def _dct_matrix(size: int, rows: int) -> np.ndarray:
+    """Primeiras `rows` linhas da DCT-II sem normalização (mesma escala do scipy.fftpack.dct)"""
+    k = np.arange(rows)[:, None]
+    n = np.arange(size)[None, :]
+    return 2 * np.cos(np.pi * k * (2 * n + 1) / (2 * size))
+
+_DCT_32_LOW = _dct_matrix(32, 8)
+
+def _phash_bits(pixels: np.ndarray) -> np.ndarray:
+    # DCT 2D só das 8x8 frequências baixas: C · X · Cᵀ
+    low = _DCT_32_LOW @ pixels @ _DCT_32_LOW.T
+    median = np.median(low.reshape(len(low), -1), axis=1)
+    return low > median[:, None, None]
+
+def _ahash_bits(pixels: np.ndarray) -> np.ndarray:
+    return pixels > pixels.mean(axis=(1, 2))[:, None, None]
+
+def _dhash_bits(pixels: np.ndarray) -> np.ndarray:
+    return pixels[:, :, 1:] > pixels[:, :, :-1]
+
+@dataclass(frozen=True)
+class HashSpec:
+    """Um hash perceptual: o nível da pirâmide que ele lê e a função que gera os bits"""
+    size: Tuple[int, int]  # (largura, altura)
+    bits: Callable[[np.ndarray], np.ndarray]  # (N, altura, largura) -> (N, 8, 8) booleano
+
+# Novos hashes entram aqui (e em HASH_TYPES) e reaproveitam os mesmos níveis
+HASH_SPECS: Dict[str, HashSpec] = {
+    "phash": HashSpec((32, 32), _phash_bits),
+    "ahash": HashSpec((8, 8), _ahash_bits),
+    "dhash": HashSpec((9, 8), _dhash_bits),
+}
+_LEVEL_SIZES = sorted({HASH_SPECS[hash_type].size for hash_type in HASH_TYPES}, reverse=True)
+
+def _area_matrix(size_out: int, size_in: int) -> np.ndarray:
+    """Matriz (size_out, size_in) que reduz um eixo pela média das áreas cobertas"""
+    edges = np.linspace(0, size_in, size_out + 1)
+    starts, ends = edges[:-1, None], edges[1:, None]
+    pixels = np.arange(size_in)[None, :]
+    overlap = np.clip(np.minimum(ends, pixels + 1) - np.maximum(starts, pixels), 0, None)
+    return overlap / overlap.sum(axis=1, keepdims=True)
+
+# Cada nível da pirâmide é A_altura · X · A_larguraᵀ sobre a imagem canônica
+_LEVEL_MATRICES = {
+    (width, height): (_area_matrix(height, CANONICAL_SIZE[1]), _area_matrix(width, CANONICAL_SIZE[0]).T)
+    for width, height in _LEVEL_SIZES
+}
+
+def _trim(gray: Image.Image, mask: Optional[Image.Image]) -> Tuple[Image.Image, Optional[Image.Image]]:
+    """Remove a borda transparente (ou de cor uniforme) em volta do captcha"""
+    if mask is not None:
+        bbox = mask.getbbox()
+    else:
+        background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+        bbox = ImageChops.difference(gray, background).point(_TRIM_LUT).getbbox()
+    if not bbox or bbox == (0, 0) + gray.size:
+        return gray, mask
+    if bbox[2] - bbox[0] < MIN_TRIM_SIZE or bbox[3] - bbox[1] < MIN_TRIM_SIZE:
+        return gray, mask
+    return gray.crop(bbox), mask.crop(bbox) if mask is not None else None
+
+def load_grayscale(image_data: bytes) -> Image.Image:
+    """Decodifica uma única vez, achata o alfa sobre branco, recorta e normaliza o tamanho"""
+    image = Image.open(io.BytesIO(image_data))
+    mask = None
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        mask = image.getchannel("A")
+    gray = image.convert("L")
+
+    gray, mask = _trim(gray, mask)
+    if mask is not None:
+        gray = Image.composite(gray, Image.new("L", gray.size, 255), mask)
+    return gray.resize(CANONICAL_SIZE, Image.LANCZOS)
+
+def build_pyramid(canonical: np.ndarray) -> Dict[Tuple[int, int], np.ndarray]:
+    """Níveis em tons de cinza compartilhados pelos hashes, para um lote (N, 64, 64)"""
+    return {size: rows @ canonical @ columns for size, (rows, columns) in _LEVEL_MATRICES.items()}
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(N, 8, 8) booleano -> (N,) uint64, bit mais significativo primeiro (como o imagehash)"""
+    packed = np.packbits(bits.reshape(len(bits), -1), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+def hash_images(images: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashes de um lote: linhas (N, 3) uint64 na ordem de HASH_TYPES e a máscara das válidas"""
+    canonical: List[np.ndarray] = []
+    valid = np.zeros(len(images), dtype=bool)
+    for i, image_data in enumerate(images):
+        try:
+            canonical.append(np.asarray(load_grayscale(image_data), dtype=np.float64))
+            valid[i] = True
+        except Exception as e:
+            logging.error(f"Erro ao pré-processar a imagem do captcha: {e}")
+
+    rows = np.zeros((len(images), len(HASH_TYPES)), dtype=np.uint64)
+    if canonical:
+        levels = build_pyramid(np.stack(canonical))
+        for column, hash_type in enumerate(HASH_TYPES):
+            spec = HASH_SPECS[hash_type]
+            rows[valid, column] = _pack(spec.bits(levels[spec.size]))
+    return rows, valid
+
+def hash_image(image_data: bytes) -> Optional[Dict[str, int]]:
+    """Hashes de uma única imagem como {tipo: inteiro de 64 bits}"""
+    rows, valid = hash_images([image_data])
+    if not valid[0]:
+        return None
+    return {hash_type: int(value) for hash_type, value in zip(HASH_TYPES, rows[0])}
@@ -1,19 +1,57 @@
 import logging
 import os
-import io
-from typing import Dict, Optional
-from PIL import Image
-import imagehash
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .captcha_preprocessing import hash_image, hash_images
+from .reference_bank import (ReferenceBank, MatchResult, HASH_TYPES, DEFAULT_BANK_FILE, hashes_to_row,
+                             read_hash_file, write_hash_file)
+from .captcha_cache import CaptchaCache, image_digest
+from .captcha_capture import capture_element_image
+from .events import EventStore
+from .metrics import MetricsRegistry, REGISTRY, DISTANCE_BUCKETS
 
 class CaptchaProcessor:
-    def __init__(self, characters: list):
+    def __init__(self, characters: list, threshold: int = 30,
+                 metrics: Optional[MetricsRegistry] = None, account: str = "",
+                 bank_path: Optional[str] = DEFAULT_BANK_FILE,
+                 cache: Optional[CaptchaCache] = None, promote_distance: int = 4,
+                 reference_bank: Optional[ReferenceBank] = None,
+                 events: Optional[EventStore] = None):
         self.characters = characters
-        self.reference_hashes = {}
-        self._load_all_reference_hashes()
+        self.events = events
+        # Um banco já carregado (por outra conta do processo) é reaproveitado como está
+        self.reference_bank = reference_bank if reference_bank is not None else self._open_bank(bank_path, threshold)
+        self.metrics = metrics or REGISTRY
+        self.account = account
+        # Captchas confirmados pelo site; amostras a mais de `promote_distance`
+        # da referência mais próxima viram referências novas
+        self.cache = cache
+        self.promote_distance = promote_distance
+        self._pending: Optional[Tuple[bytes, Optional[np.ndarray], str, bool]] = None
+        self._last_result: Optional[MatchResult] = None
+        self._matching_bank = self.reference_bank
+        self._matching_key = None
+        if reference_bank is None:
+            self._load_all_reference_hashes()
+
+    @staticmethod
+    def _open_bank(bank_path: Optional[str], threshold: int) -> ReferenceBank:
+        """Mapeia o banco binário gerado pelo `reference_bank_builder`, se existir"""
+        if bank_path and os.path.exists(bank_path):
+            try:
+                bank = ReferenceBank.load(bank_path, threshold=threshold)
+                logging.info(f"Banco de referências carregado de {bank_path}: {bank.counts()}")
+                return bank
+            except (OSError, ValueError) as e:
+                logging.error(f"Erro ao carregar {bank_path}, usando os arquivos de hashes: {e}")
+        return ReferenceBank(threshold=threshold)
 
     def _load_all_reference_hashes(self) -> None:
-        """Carrega todos os hashes de referência na inicialização"""
+        """Carrega os hashes de referência dos personagens que não estão no banco binário"""
+        in_bank = set(self.reference_bank.characters)
         for char in self.characters:
+            if char in in_bank:
+                continue
             try:
                 self._load_or_create_hashes(char)
             except Exception as e:
@@ -24,19 +62,25 @@ class CaptchaProcessor:
         hash_file = f"{char.lower()}_hashes.txt"
 
         if os.path.exists(hash_file):
-            self._load_hashes_from_file(char, hash_file)
-        else:
-            self._create_and_save_hashes(char)
+            try:
+                self._load_hashes_from_file(char, hash_file)
+                return
+            except ValueError as e:
+                # Hashes de outra versão nunca casariam com os captchas: recria a partir da imagem
+                logging.warning(f"{e}; recriando a partir de {char.lower()}.jpeg")
+        self._create_and_save_hashes(char)
 
     def _load_hashes_from_file(self, char: str, hash_file: str) -> None:
-        """Carrega hashes de um arquivo"""
-        with open(hash_file, "r") as f:
-            lines = f.read().strip().split('\n')
-            self.reference_hashes[char] = {
-                'phash': imagehash.hex_to_hash(lines[0]),
-                'ahash': imagehash.hex_to_hash(lines[1]),
-                'dhash': imagehash.hex_to_hash(lines[2])
-            }
+        """Carrega hashes de um arquivo (cada grupo de três linhas é uma referência)"""
+        self.reference_bank.add_rows(char, read_hash_file(hash_file))
+
+    def add_reference_image(self, char: str, image_data: bytes) -> bool:
+        """Adiciona uma variação de referência (luz, recorte, escala) para o personagem"""
+        hashes = self._get_image_hashes(image_data)
+        if not hashes:
+            return False
+        self.reference_bank.add(char, hashes)
+        return True
 
     def _create_and_save_hashes(self, char: str) -> None:
         """Cria e salva novos hashes para um personagem"""
@@ -51,62 +95,109 @@ class CaptchaProcessor:
         if not hashes:
             raise ValueError(f"Não foi possível gerar hashes para {char}")
 
-        self.reference_hashes[char] = hashes
+        self.reference_bank.add(char, hashes)
         self._save_hashes_to_file(char, hashes)
 
     def _save_hashes_to_file(self, char: str, hashes: Dict) -> None:
         """Salva hashes em um arquivo"""
-        with open(f"{char.lower()}_hashes.txt", "w") as f:
-            f.write(str(hashes['phash']) + '\n')
-            f.write(str(hashes['ahash']) + '\n')
-            f.write(str(hashes['dhash']) + '\n')
+        write_hash_file(f"{char.lower()}_hashes.txt", [hashes_to_row(hashes)])
         logging.info(f"Hashes de {char} salvos em arquivo.")
 
     @staticmethod
     def _get_image_hashes(image_data: bytes) -> Optional[Dict]:
-        """Calcula os hashes de uma imagem"""
-        try:
-            image = Image.open(io.BytesIO(image_data))
-            return {
-                'phash': imagehash.phash(image),
-                'ahash': imagehash.average_hash(image),
-                'dhash': imagehash.dhash(image)
-            }
-        except Exception as e:
-            logging.exception("Erro ao calcular hashes da imagem:")
-            return None
+        """Calcula os hashes de uma imagem (uma decodificação e uma pirâmide para os três)"""
+        return hash_image(image_data)
 
-    def identify_character(self, page) -> Optional[str]:
+    async def identify_character(self, page) -> Optional[str]:
         """Identifica um personagem baseado na imagem do captcha"""
         try:
             captcha_div = page.locator(".teste_img")
-            captcha_div.wait_for(state='visible', timeout=60000)
-            captcha_image_buffer = captcha_div.screenshot(omit_background=True)
-            captcha_hashes = self._get_image_hashes(captcha_image_buffer)
+            with self.metrics.phase("captcha.capture", self.account):
+                await captcha_div.wait_for(state='visible', timeout=60000)
+                # Usa os bytes da imagem vindos da rede; screenshot apenas se a interceptação falhar
+                captcha_image_buffer = await capture_element_image(page, captcha_div, omit_background=True)
+            digest = image_digest(captcha_image_buffer)
+            self._pending = None
+
+            # Atalho: captcha idêntico a um já confirmado pelo site
+            cached = self.cache.lookup(digest) if self.cache else None
+            if cached:
+                self.metrics.inc("captcha_total", result="cache", account=self.account)
+                self._pending = (digest, None, cached, False)
+                return cached
+
+            with self.metrics.phase("captcha.hash", self.account):
+                captcha_hashes = self._get_image_hashes(captcha_image_buffer)
 
             if not captcha_hashes:
+                self.metrics.inc("captcha_total", result="error", account=self.account)
                 return None
 
-            return self._find_best_match(captcha_hashes)
+            with self.metrics.phase("captcha.match", self.account):
+                character = self._find_best_match(captcha_hashes)
+            if character:
+                # Só vale a pena guardar como referência o que ainda não está coberto pelo banco
+                promote = self._last_result.distance > self.promote_distance
+                self._pending = (digest, np.array(hashes_to_row(captcha_hashes), dtype=np.uint64), character, promote)
+            return character
         except Exception as e:
             logging.exception("Erro ao identificar personagem:")
+            self.metrics.inc("captcha_total", result="error", account=self.account)
             return None
 
+    def record_result(self, accepted: bool, activity: str = "hunt") -> None:
+        """Confirma (ou recusa) a última resposta a partir da página após o envio.
+
+        `activity` (hunt, timed ou invasion) identifica o captcha no banco de eventos.
+        """
+        if self._pending is None:
+            return
+        digest, row, character, promote = self._pending
+        self._pending = None
+        self.metrics.inc("captcha_feedback_total", result="confirmed" if accepted else "rejected",
+                         account=self.account)
+        if self.events is not None:
+            self.events.captcha(self.account, activity, accepted)
+        if self.cache is None:
+            return
+        if accepted:
+            self.cache.confirm(digest, character, row, promote)
+        else:
+            self.cache.reject(digest)
+
+    def discard_pending(self) -> None:
+        """Esquece a última resposta quando a página não diz se ela estava certa"""
+        self._pending = None
+
+    def _bank(self) -> ReferenceBank:
+        """Banco de referências acrescido das amostras promovidas do cache"""
+        if self.cache is None:
+            return self.reference_bank
+        key = (self.cache.version, len(self.reference_bank))
+        if key != self._matching_key:
+            extra = self.cache.promoted_rows()
+            self._matching_bank = self.reference_bank.extended(extra) if extra else self.reference_bank
+            self._matching_key = key
+        return self._matching_bank
+
+    def match_images(self, images: Sequence[bytes]) -> List[Optional[MatchResult]]:
+        """Compara um lote de imagens de captcha em uma única chamada vetorizada"""
+        rows, valid = hash_images(images)
+        matches = iter(self._bank().match_rows(rows[valid]))
+        return [next(matches) if ok else None for ok in valid]
+
     def _find_best_match(self, captcha_hashes: Dict) -> Optional[str]:
         """Encontra o melhor match entre os hashes de referência"""
-        best_match = None
-        min_total_distance = float('inf')
-
-        for char, ref_hashes in self.reference_hashes.items():
-            total_distance = sum(
-                captcha_hashes[hash_type] - ref_hashes[hash_type]
-                for hash_type in captcha_hashes
-            )
-
-            logging.debug(f"Distância total para {char}: {total_distance}")
+        result = self._last_result = self._bank().match(captcha_hashes)
+        if result is None:
+            self.metrics.inc("captcha_total", result="error", account=self.account)
+            return None
 
-            if total_distance < min_total_distance:
-                min_total_distance = total_distance
-                best_match = char
+        self.metrics.observe("captcha_distance", result.distance, buckets=DISTANCE_BUCKETS, account=self.account)
+        self.metrics.inc("captcha_total", result="hit" if result.accepted else "miss", account=self.account)
 
-        return best_match if min_total_distance <= 30 else None
\ No newline at end of file
+        logging.debug(
+            f"Melhor: {result.character} ({result.distance}), "
+            f"segundo: {result.runner_up} ({result.runner_up_distance}), margem: {result.margin}"
+        )
+        return result.character if result.accepted else None
@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from .metrics import MetricsRegistry, REGISTRY
+
+DEFAULT_EVENTS_FILE = "events.db"
+
+# Tipos de evento gravados
+BATTLE = "battle"
+REWARD = "reward"
+INVASION = "invasion"
+CAPTCHA = "captcha"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    account TEXT NOT NULL,
+    mode TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    outcome TEXT,
+    enemy TEXT,
+    xp INTEGER,
+    gold INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+"""
+
+_XP = re.compile(r"(\d[\d.]*)\s*(?:pontos?\s+)?(?:de\s+)?(?:experi[êe]ncia|exp\b|xp\b)", re.IGNORECASE)
+_GOLD = re.compile(r"(\d[\d.]*)\s*(?:de\s+)?(?:ryous?\b|ryos?\b|ouro\b)", re.IGNORECASE)
+_WIN = re.compile(r"venceu|vit[óo]ria", re.IGNORECASE)
+_LOSS = re.compile(r"perdeu a batalha|voc[êe] foi derrotad|derrota\b", re.IGNORECASE)
+_DRAW = re.compile(r"empat", re.IGNORECASE)
+
+def _amount(pattern: re.Pattern, text: str) -> Optional[int]:
+    match = pattern.search(text)
+    # "1.200" usa o ponto como separador de milhar
+    return int(match.group(1).replace(".", "")) if match else None
+
+def parse_amounts(text: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Experiência e ryous de um texto de batalha ou recompensa (None quando não aparecem)"""
+    if not text:
+        return None, None
+    return _amount(_XP, text), _amount(_GOLD, text)
+
+def parse_outcome(text: Optional[str]) -> Optional[str]:
+    """Resultado da batalha ("win", "loss" ou "draw"), ou None se o texto não disser"""
+    if not text:
+        return None
+    # "Perdeu 12 de HP" aparece também nas vitórias, por isso a derrota exige "perdeu a batalha"
+    if _LOSS.search(text):
+        return "loss"
+    if _WIN.search(text):
+        return "win"
+    if _DRAW.search(text):
+        return "draw"
+    return None
+
+@dataclass
+class Event:
+    """Uma linha da tabela `events`"""
+    account: str
+    kind: str
+    mode: str = ""
+    outcome: Optional[str] = None
+    enemy: Optional[str] = None
+    xp: Optional[int] = None
+    gold: Optional[int] = None
+    detail: Optional[str] = None
+    ts: float = field(default_factory=time.time)
+
+    def row(self) -> tuple:
+        return (self.ts, self.account, self.mode, self.kind, self.outcome,
+                self.enemy, self.xp, self.gold, self.detail)
+
+
+class EventStore:
+    """Grava batalhas, recompensas, invasões e captchas em um SQLite local.
+
+    `record` só enfileira o evento; uma thread grava em lotes de até
+    `batch_size` eventos (ou a cada `flush_interval` segundos), cada lote em
+    uma transação, então o ciclo das contas nunca espera pelo disco. O banco
+    usa WAL, o que deixa os workers da frota gravarem no mesmo arquivo e o
+    relatório ler enquanto o bot roda. Com a fila cheia (disco travado) os
+    eventos novos são descartados e contados em `naruto_events_dropped_total`.
+    """
+
+    def __init__(self, path: str = DEFAULT_EVENTS_FILE, batch_size: int = 200, flush_interval: float = 2.0,
+                 max_queue: int = 10000, metrics: Optional[MetricsRegistry] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.metrics = metrics or REGISTRY
+        self._queue: "queue.Queue[Optional[Event]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, account: str, kind: str, mode: str = "", **fields) -> None:
+        """Enfileira um evento (não bloqueia)"""
+        try:
+            self._queue.put_nowait(Event(account, kind, mode, **fields))
+        except queue.Full:
+            self.metrics.inc("events_dropped_total", kind=kind)
+
+    def battle(self, account: str, mode: str, enemy: Optional[str], text: Optional[str],
+               kind: str = BATTLE) -> None:
+        """Resultado de uma batalha de caçada lido da página"""
+        xp, gold = parse_amounts(text)
+        self.record(account, kind, mode, outcome=parse_outcome(text), enemy=enemy, xp=xp, gold=gold, detail=text)
+
+    def invasion(self, account: str, mode: str, enemy: Optional[str], text: Optional[str]) -> None:
+        """Ataque ao invasor aceito pelo site"""
+        self.battle(account, mode, enemy, text, kind=INVASION)
+
+    def reward(self, account: str, mode: str, text: Optional[str]) -> None:
+        """Recompensa de uma caçada por tempo"""
+        xp, gold = parse_amounts(text)
+        self.record(account, REWARD, mode, outcome="received", xp=xp, gold=gold, detail=text)
+
+    def captcha(self, account: str, solver: str, accepted: bool) -> None:
+        """Resposta de captcha aceita ou recusada pelo site (`solver`: hunt, timed, invasion ou login)"""
+        self.record(account, CAPTCHA, outcome="accepted" if accepted else "rejected", detail=solver)
+
+    def _write(self, connection: sqlite3.Connection, batch: List[Event]) -> None:
+        try:
+            with connection:
+                connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                       [event.row() for event in batch])
+            self.metrics.inc("events_written_total", len(batch))
+        except sqlite3.Error as e:
+            logging.warning(f"Não foi possível gravar {len(batch)} eventos em {self.path}: {e}")
+            self.metrics.inc("events_dropped_total", len(batch), kind="batch")
+
+    def _loop(self) -> None:
+        connection = connect(self.path)
+        try:
+            stopping = False
+            while not stopping:
+                batch: List[Event] = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if event is None:
+                        stopping = True
+                        break
+                    batch.append(event)
+                if batch:
+                    self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def start(self) -> "EventStore":
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Grava os eventos ainda na fila e para a thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+def connect(path: str) -> sqlite3.Connection:
+    """Abre (e cria, se preciso) o banco de eventos em modo WAL"""
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+# Relatórios: as horas de cada conta são as horas (do relógio) em que ela gravou algum evento,
+# então as paradas do bot não diluem as taxas por hora
+_THROUGHPUT = """
+SELECT account, mode,
+       COUNT(DISTINCT CAST(ts / 3600 AS INTEGER)) AS hours,
+       SUM(kind = 'battle') AS battles,
+       SUM(kind = 'invasion') AS invasions,
+       SUM(kind = 'reward') AS rewards,
+       SUM(outcome = 'win') AS wins,
+       SUM(outcome = 'loss') AS losses,
+       COALESCE(SUM(xp), 0) AS xp,
+       COALESCE(SUM(gold), 0) AS gold
+FROM events
+WHERE kind IN ('battle', 'invasion', 'reward') AND ts >= ? {account}
+GROUP BY account, mode
+ORDER BY account, mode
+"""
+
+_HOURLY = """
+SELECT strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime') AS hour, account, mode,
+       SUM(kind IN ('battle', 'invasion')) AS battles,
+       SUM(outcome = 'win') AS wins,
+       SUM(outcome = 'loss') AS losses,
+       COALESCE(SUM(xp), 0) AS xp,
+       COALESCE(SUM(gold), 0) AS gold
+FROM events
+WHERE kind IN ('battle', 'invasion', 'reward') AND ts >= ? {account}
+GROUP BY hour, account, mode
+ORDER BY hour, account, mode
+"""
+
+_CAPTCHA = """
+SELECT strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime') AS hour, account, detail AS solver,
+       COUNT(*) AS total,
+       SUM(outcome = 'accepted') AS accepted
+FROM events
+WHERE kind = 'captcha' AND ts >= ? {account}
+GROUP BY hour, account, solver
+ORDER BY hour, account, solver
+"""
+
+def _query(connection: sqlite3.Connection, sql: str, since: float, account: Optional[str]) -> List[Dict]:
+    params: list = [since]
+    if account:
+        params.append(account)
+    cursor = connection.execute(sql.format(account="AND account = ?" if account else ""), params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def report(path: str, since_hours: Optional[float] = None, account: Optional[str] = None) -> Dict:
+    """XP, ryous, vitórias e derrotas por hora de cada conta e modo, e a taxa de acerto dos captchas por hora"""
+    since = time.time() - since_hours * 3600 if since_hours else 0.0
+    connection = connect(path)
+    try:
+        throughput = _query(connection, _THROUGHPUT, since, account)
+        for row in throughput:
+            hours = row["hours"] or 1
+            for key in ("battles", "invasions", "rewards", "wins", "losses", "xp", "gold"):
+                row[f"{key}_per_hour"] = row[key] / hours
+        captcha = _query(connection, _CAPTCHA, since, account)
+        for row in captcha:
+            row["success_rate"] = row["accepted"] / row["total"] if row["total"] else None
+        return {
+            "throughput": throughput,
+            "hourly": _query(connection, _HOURLY, since, account),
+            "captcha": captcha,
+        }
+    finally:
+        connection.close()
+
+def _print_table(title: str, rows: List[Dict], columns: List[Tuple[str, str]]) -> None:
+    print(f"\n{title}")
+    if not rows:
+        print("  (sem eventos)")
+        return
+    cells = [[header for _, header in columns]]
+    for row in rows:
+        cells.append([f"{row[key]:.1f}" if isinstance(row[key], float) else str(row[key]) for key, _ in columns])
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    for line in cells:
+        print("  " + "  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Relatório de batalhas, recompensas e captchas gravados pelo bot")
+    parser.add_argument("--db", default=DEFAULT_EVENTS_FILE, help="Banco de eventos (NP_EVENTS_FILE)")
+    parser.add_argument("--since", type=float, default=None, help="Só as últimas N horas")
+    parser.add_argument("--account", default=None, help="Só esta conta")
+    parser.add_argument("--hourly", action="store_true", help="Mostra também cada hora separadamente")
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON")
+    args = parser.parse_args()
+
+    result = report(args.db, args.since, args.account)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    _print_table("Rendimento por conta e modo (médias por hora ativa)", result["throughput"], [
+        ("account", "conta"), ("mode", "modo"), ("hours", "horas"), ("battles_per_hour", "batalhas/h"),
+        ("wins_per_hour", "vitórias/h"), ("losses_per_hour", "derrotas/h"), ("xp_per_hour", "xp/h"),
+        ("gold_per_hour", "ryous/h"), ("xp", "xp total"), ("gold", "ryous total"),
+    ])
+    if args.hourly:
+        _print_table("Por hora", result["hourly"], [
+            ("hour", "hora"), ("account", "conta"), ("mode", "modo"), ("battles", "batalhas"),
+            ("wins", "vitórias"), ("losses", "derrotas"), ("xp", "xp"), ("gold", "ryous"),
+        ])
+    captcha = [dict(row, success=f"{row['success_rate']:.0%}") for row in result["captcha"]]
+    _print_table("Captchas aceitos por hora", captcha, [
+        ("hour", "hora"), ("account", "conta"), ("solver", "captcha"), ("total", "total"),
+        ("accepted", "aceitos"), ("success", "acerto"),
+    ])
+
+if __name__ == "__main__":
+    main()
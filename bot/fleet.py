@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from playwright.async_api import async_playwright
+from .naruto_bot import NarutoBot
+from .supervisor import BrowserSupervisor, RecyclePolicy
+from .browser_profile import BrowserProfile, STANDARD
+from .fleet_config import AccountConfig, FleetConfigWatcher
+from .startup import StartupTimer
+
+class FleetManager:
+    """Uma tarefa por conta no navegador compartilhado, ajustada a cada nova configuração.
+
+    Contas novas começam, contas removidas param (salvando a sessão) e contas
+    alteradas recebem o novo modo e os novos limites sem reiniciar; só uma
+    mudança de senha ou de slot reinicia a conta, pois exige um novo login.
+    As demais contas nunca são tocadas.
+    """
+
+    def __init__(self, supervisor: BrowserSupervisor, make_bot: Callable[[AccountConfig], NarutoBot]):
+        self.supervisor = supervisor
+        self.make_bot = make_bot
+        self.accounts: Dict[str, AccountConfig] = {}
+        self.bots: Dict[str, NarutoBot] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    async def _build(self, accounts: List[AccountConfig]) -> List[NarutoBot]:
+        """Monta os bots em uma thread: carregar referências e solver não bloqueia o event loop"""
+        return await asyncio.to_thread(lambda: [self.make_bot(account) for account in accounts])
+
+    def _start(self, account: AccountConfig, bot: NarutoBot) -> None:
+        self.accounts[account.username] = account
+        self.bots[account.username] = bot
+        self.tasks[account.username] = asyncio.create_task(self._run(bot), name=f"bot:{account.username}")
+
+    async def _run(self, bot: NarutoBot) -> None:
+        try:
+            await bot.run(self.supervisor)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Conta {bot.username} encerrada com erro: {e}")
+        else:
+            logging.warning(f"Conta {bot.username} encerrada.")
+
+    async def _stop(self, username: str) -> None:
+        task = self.tasks.pop(username, None)
+        self.bots.pop(username, None)
+        self.accounts.pop(username, None)
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def apply(self, accounts: Dict[str, AccountConfig]) -> None:
+        """Leva a frota em execução ao conjunto de contas informado"""
+        for username in list(self.accounts.keys() - accounts.keys()):
+            logging.info(f"Conta {username} removida da configuração, parando.")
+            await self._stop(username)
+
+        starting: List[AccountConfig] = []
+        for username, account in accounts.items():
+            current = self.accounts.get(username)
+            if current is None:
+                logging.info(f"Iniciando a conta {username} (modo {account.mode}, slot {account.slot}).")
+                starting.append(account)
+            elif current.requires_restart(account):
+                logging.info(f"Senha ou slot de {username} alterados, reiniciando a conta.")
+                await self._stop(username)
+                starting.append(account)
+            elif current != account:
+                self.bots[username].apply_config(account)
+                self.accounts[username] = account
+
+        for account, bot in zip(starting, await self._build(starting)):
+            self._start(account, bot)
+
+    async def stop(self) -> None:
+        for username in list(self.tasks):
+            await self._stop(username)
+
+async def run_fleet(accounts: Dict[str, AccountConfig], make_bot: Callable[[AccountConfig], NarutoBot],
+                    watcher: Optional[FleetConfigWatcher] = None, headless: bool = True,
+                    policy: Optional[RecyclePolicy] = None, profile: BrowserProfile = STANDARD,
+                    reload_interval: float = 5.0, startup: Optional[StartupTimer] = None) -> None:
+    """Executa várias contas em um único event loop, com um Chromium compartilhado.
+
+    Cada bot recebe o seu próprio contexto (cookies e armazenamento isolados),
+    e todas as esperas de penalidade viram `asyncio.sleep`, então uma conta
+    aguardando não bloqueia as outras. O navegador fica sob um supervisor que
+    o reinicia se travar ou passar do teto de memória. `profile` define as
+    flags de lançamento; os bots devem usar o mesmo perfil nos seus contextos.
+
+    O driver do Playwright e o Chromium sobem enquanto os bots são montados
+    (referências do captcha, solver de login) em outra thread; cada bot só
+    abre o seu contexto quando o navegador fica pronto.
+
+    Com `watcher`, o arquivo da frota é verificado a cada `reload_interval`
+    segundos e as mudanças são aplicadas às contas em execução.
+    """
+    logging.info(f"Iniciando frota com {len(accounts)} conta(s).")
+    startup = startup or StartupTimer()
+    launch_options = profile.launch_options(headless=headless)
+    playwright = None
+
+    async def launch():
+        # Mantenha headless=False para depuração
+        return await playwright.chromium.launch(**launch_options)
+
+    supervisor = BrowserSupervisor(launch, policy)
+    manager = FleetManager(supervisor, make_bot)
+
+    async def build_accounts() -> None:
+        with startup.phase("accounts"):
+            await manager.apply(accounts)
+
+    building = asyncio.create_task(build_accounts())
+    try:
+        with startup.phase("browser"):
+            playwright = await async_playwright().start()
+            await supervisor.start()
+        await building
+        while watcher is not None or any(not task.done() for task in manager.tasks.values()):
+            await asyncio.sleep(reload_interval)
+            if watcher is not None:
+                reloaded = watcher.poll()
+                if reloaded is not None:
+                    await manager.apply(reloaded)
+    finally:
+        if not building.done():
+            building.cancel()
+        await manager.stop()
+        await supervisor.stop()
+        if playwright is not None:
+            await playwright.stop()
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Modos de caçada do arquivo e o `hunt_type` correspondente do NarutoBot
+HUNT_MODES = {"level": 1, "timed": 2, "invasion": 3}
+
+@dataclass(frozen=True)
+class AccountLimits:
+    """Limites por conta; 0 ou None desativa o limite"""
+    max_hunts_per_day: int = 0
+    active_hours: Optional[Tuple[int, int]] = None  # (hora inicial, hora final) no horário local
+
+    def is_active_hour(self, hour: int) -> bool:
+        if self.active_hours is None:
+            return True
+        start, end = self.active_hours
+        # Janelas que atravessam a meia-noite, como (22, 6), também valem
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+@dataclass(frozen=True)
+class AccountConfig:
+    """Uma conta da frota, como definida no arquivo de configuração"""
+    username: str
+    password: str
+    mode: str = "level"
+    slot: int = 1
+    limits: AccountLimits = field(default_factory=AccountLimits)
+
+    @property
+    def hunt_type(self) -> int:
+        return HUNT_MODES[self.mode]
+
+    def requires_restart(self, other: "AccountConfig") -> bool:
+        """Indica se a mudança só vale com um novo login (senha ou personagem)"""
+        return self.password != other.password or self.slot != other.slot
+
+def _parse_limits(raw: Dict, where: str) -> AccountLimits:
+    unknown = set(raw) - {"max_hunts_per_day", "active_hours"}
+    if unknown:
+        raise ValueError(f"{where}: limites desconhecidos: {', '.join(sorted(unknown))}")
+    active_hours = raw.get("active_hours")
+    if active_hours is not None:
+        if (not isinstance(active_hours, list) or len(active_hours) != 2
+                or not all(isinstance(h, int) and 0 <= h <= 24 for h in active_hours)):
+            raise ValueError(f"{where}: active_hours deve ser [hora inicial, hora final], entre 0 e 24")
+        active_hours = tuple(active_hours)
+    max_hunts = raw.get("max_hunts_per_day", 0)
+    if not isinstance(max_hunts, int) or max_hunts < 0:
+        raise ValueError(f"{where}: max_hunts_per_day deve ser um inteiro >= 0")
+    return AccountLimits(max_hunts_per_day=max_hunts, active_hours=active_hours)
+
+def _parse_account(raw: Dict, defaults: Dict, index: int) -> AccountConfig:
+    merged = {**defaults, **raw}
+    merged["limits"] = {**defaults.get("limits", {}), **raw.get("limits", {})}
+    where = f"conta {merged.get('username') or index + 1}"
+
+    username = merged.get("username")
+    if not username:
+        raise ValueError(f"{where}: username é obrigatório")
+    # A senha pode ficar fora do arquivo, em uma variável de ambiente
+    password = merged.get("password")
+    if password is None and merged.get("password_env"):
+        password = os.getenv(merged["password_env"])
+    if not password:
+        raise ValueError(f"{where}: informe password ou password_env (com a variável definida)")
+    mode = merged.get("mode", "level")
+    if mode not in HUNT_MODES:
+        raise ValueError(f"{where}: modo inválido {mode!r} (opções: {', '.join(HUNT_MODES)})")
+    slot = merged.get("slot", 1)
+    if not isinstance(slot, int) or slot < 1:
+        raise ValueError(f"{where}: slot deve ser um inteiro >= 1")
+    return AccountConfig(username, password, mode, slot, _parse_limits(merged["limits"], where))
+
+def parse_fleet_config(data: Dict) -> Dict[str, AccountConfig]:
+    """Valida o conteúdo do arquivo e devolve as contas habilitadas por usuário"""
+    defaults = data.get("defaults", {})
+    accounts: Dict[str, AccountConfig] = {}
+    for index, raw in enumerate(data.get("accounts", [])):
+        if not raw.get("enabled", True):
+            continue
+        account = _parse_account(raw, defaults, index)
+        if account.username in accounts:
+            raise ValueError(f"conta {account.username} definida mais de uma vez")
+        accounts[account.username] = account
+    return accounts
+
+def load_fleet_config(path: str) -> Dict[str, AccountConfig]:
+    """Lê e valida o arquivo JSON da frota"""
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_fleet_config(json.load(f))
+
+def accounts_from_env(credentials: List[Tuple[str, str]], mode: str = "level") -> Dict[str, AccountConfig]:
+    """Contas das variáveis NP_USER/NP_PASSWORD (e NP_USER_2, ...), todas no mesmo modo"""
+    if mode not in HUNT_MODES:
+        raise ValueError(f"Modo de caçada inválido {mode!r} (opções: {', '.join(HUNT_MODES)})")
+    return {user: AccountConfig(user, password, mode) for user, password in credentials if user}
+
+class FleetConfigWatcher:
+    """Recarrega o arquivo da frota quando ele muda (verificando o mtime)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[int] = None
+
+    def load(self) -> Dict[str, AccountConfig]:
+        """Carga inicial: erros de configuração interrompem o início"""
+        self._mtime = os.stat(self.path).st_mtime_ns
+        return load_fleet_config(self.path)
+
+    def poll(self) -> Optional[Dict[str, AccountConfig]]:
+        """Nova configuração se o arquivo mudou e é válido; None caso contrário"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logging.warning(f"Arquivo da frota inacessível, mantendo a configuração atual: {e}")
+            return None
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            accounts = load_fleet_config(self.path)
+        except (OSError, ValueError) as e:
+            # Um arquivo com erro nunca derruba as contas que já estão rodando
+            logging.error(f"Configuração da frota inválida em {self.path}, mantendo a atual: {e}")
+            return None
+        logging.info(f"Configuração da frota recarregada de {self.path}: {len(accounts)} conta(s).")
+        return accounts
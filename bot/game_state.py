@@ -0,0 +1,265 @@
+import logging
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+from .rate_controller import SessionLost
+
+BASE_URL = "https://www.narutoplayers.com.br/"
+
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+def parse_timer(text: Optional[str]) -> Optional[int]:
+    """Converte um texto HH:MM:SS em segundos (None se não houver timer)"""
+    if not text:
+        return None
+    match = re.search(r"(\d{2}):(\d{2}):(\d{2})", text)
+    if not match:
+        return None
+    hours, minutes, seconds = map(int, match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+@dataclass
+class GameState:
+    """Campos do jogo lidos de uma página (None quando o elemento não existe)"""
+    hp_text: Optional[str] = None
+    hunt_timer_text: Optional[str] = None
+    invasion_text: Optional[str] = None
+    doujutsu_name: Optional[str] = None
+    doujutsu_timer_text: Optional[str] = None
+    error_text: Optional[str] = None
+    reward_text: Optional[str] = None
+    enemy_name: Optional[str] = None
+    battle_text: Optional[str] = None
+    reward_available: bool = False
+
+    @property
+    def hp(self) -> Optional[Tuple[int, int]]:
+        """HP (atual, máximo)"""
+        if not self.hp_text or "/" not in self.hp_text:
+            return None
+        try:
+            current, maximum = self.hp_text.split("/")[:2]
+            return int(current.strip()), int(maximum.strip())
+        except ValueError:
+            return None
+
+    @property
+    def hunt_remaining(self) -> int:
+        """Segundos restantes de penalidade de caçada"""
+        return parse_timer(self.hunt_timer_text) or 0
+
+    @property
+    def invasion_available(self) -> bool:
+        """Indica se o invasor pode ser atacado agora"""
+        return (self.invasion_text or "").strip() == "Atacar!"
+
+    @property
+    def invasion_remaining(self) -> int:
+        """Segundos até a próxima invasão"""
+        return parse_timer(self.invasion_text) or 0
+
+    @property
+    def doujutsu_remaining(self) -> Optional[int]:
+        """Segundos restantes do doujutsu ativo"""
+        return parse_timer(self.doujutsu_timer_text)
+
+# Seletores (cadeia de descendentes de #id / .classe) de cada campo do GameState
+_FIELD_SELECTORS: Dict[str, List[Tuple[Optional[str], Tuple[str, ...]]]] = {
+    "hp_text": [("hp_baixo", ()), (None, ("hp_xp",))],
+    "hunt_timer_text": [("relogio_contador", ())],
+    "invasion_text": [("relogio_invasao", ())],
+    "doujutsu_name": [
+        (None, ("doujutsu",)), (None, ("doujutsu_centro",)), (None, ("doujutsu_info",)),
+        (None, ("linha_css2", "center", "rotulo")),
+    ],
+    "doujutsu_timer_text": [("doujutsu_relogio", ())],
+    "error_text": [("error", ())],
+    "reward_text": [("relogio_cacadas", ()), (None, ("cacada_recompensa",))],
+    "enemy_name": [("box_dir", ()), (None, ("char_dentro_h",)), (None, ("linha_css2",)), (None, ("col_css2",))],
+    "battle_text": [("corpo_col_dir", ()), (None, ("linha_css_memo", "center"))],
+}
+
+# Campos booleanos: apenas a presença do elemento importa
+_FLAG_SELECTORS: Dict[str, List[Tuple[Optional[str], Tuple[str, ...]]]] = {
+    "reward_available": [("form_cacadas", ()), ("receber_m", ())],
+}
+
+def _matches(element: Tuple[str, Optional[str], set], simple: Tuple[Optional[str], Tuple[str, ...]]) -> bool:
+    element_id, classes = element[1], element[2]
+    wanted_id, wanted_classes = simple
+    return (wanted_id is None or element_id == wanted_id) and all(c in classes for c in wanted_classes)
+
+class _GameStateParser(HTMLParser):
+    """Extrai o texto dos campos do GameState em uma única passada pelo HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[Tuple[str, Optional[str], set]] = []
+        self.texts: Dict[str, List[str]] = {}
+        self.flags = set()
+        self._capturing: Dict[str, int] = {}
+
+    def _selector_matches(self, chain) -> bool:
+        # O último seletor casa com o elemento atual e os demais com ancestrais, em ordem
+        if not _matches(self.stack[-1], chain[-1]):
+            return False
+        position = len(self.stack) - 2
+        for simple in reversed(chain[:-1]):
+            while position >= 0 and not _matches(self.stack[position], simple):
+                position -= 1
+            if position < 0:
+                return False
+            position -= 1
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        self.stack.append((tag, attributes.get("id"), set((attributes.get("class") or "").split())))
+        for flag, chain in _FLAG_SELECTORS.items():
+            if flag not in self.flags and self._selector_matches(chain):
+                self.flags.add(flag)
+        if tag in _VOID_TAGS:
+            self.stack.pop()
+            return
+        for field, chain in _FIELD_SELECTORS.items():
+            if field not in self._capturing and field not in self.texts and self._selector_matches(chain):
+                self._capturing[field] = len(self.stack)
+                self.texts[field] = []
+
+    def handle_endtag(self, tag):
+        # Fecha também elementos sem tag de fechamento explícita
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                for field, start in list(self._capturing.items()):
+                    if start > depth:
+                        del self._capturing[field]
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        for field in self._capturing:
+            self.texts[field].append(data)
+
+def parse_game_state(html: str) -> GameState:
+    """Lê os campos do jogo de uma página HTML"""
+    parser = _GameStateParser()
+    parser.feed(html)
+    parser.close()
+    fields = {field: " ".join("".join(parts).split()) for field, parts in parser.texts.items()}
+    return GameState(**fields, **{flag: True for flag in parser.flags})
+
+def _css(chain) -> str:
+    """Converte uma cadeia de seletores simples em um seletor CSS de descendentes"""
+    return " ".join(
+        (f"#{element_id}" if element_id else "") + "".join(f".{c}" for c in classes)
+        for element_id, classes in chain
+    )
+
+# Lê todos os campos em uma única ida ao navegador; elementos ausentes ou não
+# renderizados voltam como null, sem esperar nenhum timeout
+_SNAPSHOT_SCRIPT = """
+({texts, flags}) => {
+    const rendered = (el) => el && el.getClientRects().length > 0;
+    const state = {ready: document.readyState !== 'loading', texts: {}, flags: {}};
+    for (const [field, css] of Object.entries(texts)) {
+        const el = document.querySelector(css);
+        state.texts[field] = rendered(el) ? el.innerText : null;
+    }
+    for (const [flag, css] of Object.entries(flags)) {
+        state.flags[flag] = rendered(document.querySelector(css));
+    }
+    return state;
+}
+"""
+_SNAPSHOT_ARGUMENTS = {
+    "texts": {field: _css(chain) for field, chain in _FIELD_SELECTORS.items()},
+    "flags": {flag: _css(chain) for flag, chain in _FLAG_SELECTORS.items()},
+}
+
+class PageStateSnapshot:
+    """Estado lido do DOM da página com um único `page.evaluate`.
+
+    O resultado fica guardado até a próxima navegação do frame principal, então
+    várias leituras na mesma página custam uma ida só ao navegador.
+    """
+
+    def __init__(self, page):
+        self._page = page
+        self._state: Optional[GameState] = None
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_navigated(self, frame) -> None:
+        if frame == self._page.main_frame:
+            self._state = None
+
+    @classmethod
+    def of(cls, page) -> "PageStateSnapshot":
+        """Snapshot associado à página (criado na primeira leitura)"""
+        if page not in _snapshots:
+            _snapshots[page] = cls(page)
+        return _snapshots[page]
+
+    def invalidate(self) -> None:
+        """Descarta o estado guardado (por exemplo, após um clique que altera o DOM sem navegar)"""
+        self._state = None
+
+    async def read(self, refresh: bool = False) -> GameState:
+        if self._state is not None and not refresh:
+            return self._state
+        await self._page.wait_for_load_state("domcontentloaded")
+        raw = await self._page.evaluate(_SNAPSHOT_SCRIPT, _SNAPSHOT_ARGUMENTS)
+        fields = {field: " ".join(text.split()) for field, text in raw["texts"].items() if text is not None}
+        state = GameState(**fields, **raw["flags"])
+        # Só guarda quando o documento terminou de ser analisado
+        if raw["ready"]:
+            self._state = state
+        return state
+
+_snapshots: "WeakKeyDictionary" = WeakKeyDictionary()
+
+async def read_page_state(page, refresh: bool = False) -> GameState:
+    """Estado do jogo na página atual do navegador (um `page.evaluate` por navegação)"""
+    return await PageStateSnapshot.of(page).read(refresh)
+
+class GameStateClient:
+    """Leitura do estado do jogo por HTTP puro, sem renderizar a página.
+
+    Usa o APIRequestContext do próprio contexto do Playwright, que compartilha
+    os cookies da sessão e reaproveita as conexões; o navegador fica reservado
+    para os passos que precisam dele (captcha, formulários e cliques).
+    """
+
+    def __init__(self, context, base_url: str = BASE_URL, rate_controller=None):
+        self._request = context.request
+        self.base_url = base_url
+        self.rate_controller = rate_controller
+        self._host = urlsplit(base_url).hostname or ""
+
+    async def fetch(self, page_query: str) -> GameState:
+        """Busca `?p=<page_query>` e devolve o estado lido"""
+        if self.rate_controller is not None:
+            await self.rate_controller.acquire(self._host)
+        response = await self._request.get(f"{self.base_url}?p={page_query}")
+        if self.rate_controller is not None:
+            self.rate_controller.record_response(self._host, response.status)
+        if not response.ok:
+            raise RuntimeError(f"HTTP {response.status} ao buscar ?p={page_query}")
+        html = await response.text()
+        if 'name="senha"' in html:
+            raise SessionLost(f"?p={page_query} voltou para a página de login")
+        return parse_game_state(html)
+
+    async def status(self) -> GameState:
+        return await self.fetch("status")
+
+    async def invasion(self) -> GameState:
+        return await self.fetch("invasao")
+
+    async def hunts(self, action: str = "nivel") -> GameState:
+        return await self.fetch(f"cacadas&action={action}")
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from .metrics import MetricsRegistry, REGISTRY
+from .rate_limit import TokenBucket
+
+GEMINI_MODEL = 'gemini-2.0-flash-thinking-exp-01-21'
+
+_model = None
+
+def get_model():
+    """Modelo do Gemini, criado no primeiro uso.
+
+    O SDK (`google.generativeai`, com gRPC e protobuf) leva mais de um segundo
+    para importar e só é necessário quando o solver local não resolve um
+    captcha de login, então nem é carregado nos inícios que não precisam dele.
+    """
+    global _model
+    if _model is None:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("A chave API do Google (GOOGLE_API_KEY) não está configurada.")
+        start = time.perf_counter()
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _model = genai.GenerativeModel(GEMINI_MODEL)
+        logging.info(f"SDK do Gemini carregado em {time.perf_counter() - start:.2f}s.")
+    return _model
+
+def is_configured() -> bool:
+    """Indica se há chave para consultar o Gemini (sem importar o SDK)"""
+    return bool(os.getenv("GOOGLE_API_KEY"))
+
+
+class GeminiClient:
+    """Cliente do Gemini compartilhado por todas as contas do processo.
+
+    Mantém um único handle do modelo e limita as chamadas com um token bucket
+    (taxa) e um semáforo (concorrência), ambos comuns a todas as contas; cada
+    chamada tem um timeout próprio e o pedido inteiro (fila, tentativas e
+    esperas) tem um prazo total, então uma rajada de logins depois de um
+    reinício termina em tempo previsível. Falhas e timeouts são repetidos com
+    backoff exponencial com jitter; respostas inválidas não, pois o captcha
+    seguinte é outro. `model_factory` permite trocar o modelo real por um
+    stub local (veja `benchmarks/gemini_stub.py`).
+    """
+
+    def __init__(self, model_factory: Callable[[], Any] = get_model,
+                 rate: float = 1.0, burst: int = 5, max_concurrency: int = 4,
+                 call_timeout: float = 20.0, deadline: float = 60.0,
+                 retries: int = 2, backoff: float = 1.0, max_backoff: float = 8.0,
+                 metrics: Optional[MetricsRegistry] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._model_factory = model_factory
+        self._model = None
+        self._model_lock = asyncio.Lock()
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or REGISTRY
+        self._clock = clock
+        self.counts: Dict[str, int] = {}
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+    async def model(self):
+        """Handle único do modelo, criado na primeira chamada.
+
+        A criação (importar e configurar o SDK leva cerca de um segundo) roda
+        em uma thread, para não parar o loop das outras contas, e o lock
+        garante que só a primeira chamada a faça.
+        """
+        if self._model is None:
+            async with self._model_lock:
+                if self._model is None:
+                    self._model = await asyncio.to_thread(self._model_factory)
+        return self._model
+
+    def _count(self, result: str, account: str) -> None:
+        self.counts[result] = self.counts.get(result, 0) + 1
+        self.metrics.inc("gemini_calls_total", result=result, account=account)
+
+    async def generate(self, parts: List[Any], validate: Optional[Callable[[str], Optional[str]]] = None,
+                       account: str = "", deadline: Optional[float] = None) -> Optional[str]:
+        """Texto da resposta (validado por `validate`), ou None se não houve resposta válida no prazo"""
+        end = self._clock() + (deadline if deadline is not None else self.deadline)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(end - self._clock(), 0))
+        except asyncio.TimeoutError:
+            self._count("throttled", account)
+            return None
+        try:
+            return await self._attempts(parts, validate, account, end)
+        finally:
+            self._semaphore.release()
+
+    async def _attempts(self, parts, validate, account: str, end: float) -> Optional[str]:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retry", account)
+            if not await self.bucket.acquire(timeout=end - self._clock()):
+                self._count("throttled", account)
+                return None
+
+            try:
+                model = await self.model()
+                start = time.perf_counter()
+                response = await asyncio.wait_for(model.generate_content_async(parts),
+                                                  max(min(self.call_timeout, end - self._clock()), 0))
+                text = response.text if response else None
+            except asyncio.TimeoutError:
+                self._count("timeout", account)
+                logging.warning(f"Gemini não respondeu em {self.call_timeout:.0f}s (tentativa {attempt + 1}).")
+            except Exception as e:
+                self._count("error", account)
+                logging.warning(f"Erro na chamada ao Gemini (tentativa {attempt + 1}): {e}")
+            else:
+                latency = time.perf_counter() - start
+                self._latencies.append(latency)
+                self.metrics.observe("gemini_latency_seconds", latency, account=account)
+                answer = validate(text) if validate and text else text
+                self._count("ok" if answer else "invalid", account)
+                return answer
+
+            # Backoff exponencial com jitter, desde que ainda caiba no prazo
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff) * random.uniform(0.5, 1.5)
+            if self._clock() + delay >= end:
+                break
+            await asyncio.sleep(delay)
+        return None
+
+    def stats(self) -> Dict:
+        """Contagem por resultado e latência das respostas recentes (ms)"""
+        latencies = sorted(self._latencies)
+        latency = {}
+        if latencies:
+            latency = {
+                "mean_ms": statistics.mean(latencies) * 1000,
+                "p50_ms": latencies[len(latencies) // 2] * 1000,
+                "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+            }
+        answered = self.counts.get("ok", 0) + self.counts.get("invalid", 0)
+        return {
+            "counts": dict(self.counts),
+            "valid_ratio": self.counts.get("ok", 0) / answered if answered else None,
+            "latency": latency,
+        }
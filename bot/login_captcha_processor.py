@@ -1,47 +1,177 @@
+import asyncio
 import logging
 import io
-from typing import Optional
+import os
+import time
+from typing import Optional, Tuple
 from PIL import Image
-import google.generativeai as genai
+from .captcha_capture import capture_element_image
+from .events import EventStore
+from .gemini import GeminiClient, is_configured
+from .login_captcha_solver import LocalCaptchaSolver
+from .metrics import MetricsRegistry, REGISTRY
+
+CAPTCHA_SELECTOR = "#captcha_img #img_captcha"
+
+# Pede uma imagem nova com um parâmetro inédito na URL e espera ela carregar
+_REFRESH_SCRIPT = """
+(img) => new Promise((resolve) => {
+    const url = new URL(img.getAttribute('src'), document.baseURI);
+    url.searchParams.set('t', Date.now().toString(36) + Math.random().toString(36).slice(2));
+    img.onload = () => resolve(true);
+    img.onerror = () => resolve(false);
+    img.src = url.href;
+})
+"""
+
+def _clean_answer(text: str) -> Optional[str]:
+    """Resposta do Gemini sem espaços, se tiver os 5 caracteres do captcha"""
+    #Limpa a resposta: Remove espaços
+    cleaned_response = text.replace(" ", "").strip()
+    logging.info(f"Resposta bruta do Gemini (login): {text}")
+    logging.info(f"Resposta limpa do Gemini (login): {cleaned_response}")
+
+    #Valida o tamanho
+    if len(cleaned_response) == 5:
+        return cleaned_response
+    logging.warning(f"Resposta do Gemini para o login não tem 5 caracteres: {cleaned_response}")
+    return None
 
 class LoginCaptchaProcessor:
-    """Processador para o captcha de login (alfanumérico)."""
+    """Processador para o captcha de login (alfanumérico).
 
-    def solve_captcha(self, page) -> Optional[str]:
-        """Resolve o captcha de login usando o Gemini."""
+    Tenta primeiro o solver local (CPU, sem rede) e só consulta o Gemini quando
+    a confiança de algum glifo fica abaixo do limite (ou o solver local demora). Captchas aceitos pelo
+    site são guardados em `samples_dir` para treinar o solver local.
+
+    `gemini` é o cliente compartilhado pelas contas (limite de taxa e de
+    concorrência comuns); sem ele, um cliente próprio é criado no primeiro uso.
+    Os dois solvers disputam o mesmo captcha (veja `_race`), e a estratégia
+    vencedora fica em `last_strategy`.
+    """
+
+    def __init__(self, local_solver: Optional[LocalCaptchaSolver] = None,
+                 samples_dir: Optional[str] = "login_captchas",
+                 metrics: Optional[MetricsRegistry] = None, account: str = "",
+                 gemini: Optional[GeminiClient] = None, hedge_delay: float = 0.3,
+                 events: Optional[EventStore] = None):
+        self.events = events
+        self.local_solver = local_solver or LocalCaptchaSolver()
+        self.gemini = gemini
+        self.hedge_delay = hedge_delay
+        self.last_strategy: Optional[str] = None
+        self.samples_dir = samples_dir
+        self.metrics = metrics or REGISTRY
+        self.account = account
+        self._last_image: Optional[bytes] = None
+        self._last_answer: Optional[str] = None
+
+    async def solve_captcha(self, page) -> Optional[str]:
+        """Resolve o captcha de login localmente ou, se necessário, usando o Gemini."""
+        self.last_strategy = None
         try:
-            captcha_element = page.locator("#captcha_img #img_captcha")
+            captcha_element = page.locator(CAPTCHA_SELECTOR)
 
             # Se o elemento não existe, pode ser que a página não carregou corretamente
-            if not captcha_element.is_visible():
+            if not await captcha_element.is_visible():
                 logging.error("Elemento do captcha de login não encontrado.")
                 return None
 
-            captcha_image_buffer = captcha_element.screenshot()
-            image = Image.open(io.BytesIO(captcha_image_buffer))
-
-            # Prompt preciso para o Gemini
-            prompt = "Responda apenas com os 5 caracteres alfanuméricos do captcha, sem mais nenhuma palavra ou espaço."
-            logging.info("Resolvendo captcha de login com Gemini...")
-            response = genai.GenerativeModel('gemini-2.0-flash-thinking-exp-01-21').generate_content([prompt, image])
-
-            if response and response.text:
-                #Limpa a resposta: Remove espaços
-                cleaned_response = response.text.replace(" ", "").strip()
-
-                logging.info(f"Resposta bruta do Gemini (login): {response.text}")
-                logging.info(f"Resposta limpa do Gemini (login): {cleaned_response}")
-
-                #Valida o tamanho
-                if len(cleaned_response) == 5:
-                  return cleaned_response
-                else:
-                  logging.warning(f"Resposta do Gemini para o login não tem 5 caracteres: {cleaned_response}")
-                  return None
-            else:
-                logging.warning("Gemini não retornou uma resposta válida para o login.")
-                return None
+            with self.metrics.phase("login.captcha_capture", self.account):
+                captcha_image_buffer = await capture_element_image(page, captcha_element)
+            self._last_image, self._last_answer = captcha_image_buffer, None
+
+            start = time.perf_counter()
+            answer, strategy = await self._race(captcha_image_buffer)
+            if answer:
+                # Tempo até a resposta da estratégia vencedora
+                self.metrics.observe("phase_seconds", time.perf_counter() - start,
+                                     phase=f"login.captcha_{strategy}", account=self.account)
+                self.metrics.inc("login_captcha_total", solver=strategy, account=self.account)
+                self.last_strategy = strategy
+            self._last_answer = answer
+            return answer
 
         except Exception as e:
-            logging.exception("Erro ao resolver captcha de login com Gemini:")
-            return None
\ No newline at end of file
+            logging.exception("Erro ao resolver captcha de login:")
+            return None
+
+    async def _race(self, captcha_image_buffer: bytes) -> Tuple[Optional[str], Optional[str]]:
+        """Consulta os solvers em paralelo e devolve a primeira resposta válida e a estratégia que a deu.
+
+        O solver local roda em uma thread; se ele não der uma resposta confiante
+        em `hedge_delay` segundos (por baixa confiança ou por estar lento), o
+        Gemini entra na disputa e quem responder primeiro vence. O atraso evita
+        gastar cota do Gemini nos captchas que o solver local resolve sozinho.
+        """
+        local = asyncio.create_task(asyncio.to_thread(self.local_solver.solve, captcha_image_buffer))
+        pending = {local}
+        gemini = None
+        try:
+            await asyncio.wait(pending, timeout=self.hedge_delay)
+            while True:
+                if local in pending and local.done():
+                    pending.discard(local)
+                    local_solution = local.result()
+                    if local_solution:
+                        confidences = ", ".join(f"{c:.2f}" for c in local_solution.confidences)
+                        logging.info(f"Solver local (login): {local_solution.text} (confiança por glifo: {confidences})")
+                        if local_solution.confident:
+                            return local_solution.text, "local"
+                        logging.info("Confiança baixa no solver local, aguardando o Gemini.")
+                if gemini is None:
+                    if is_configured():
+                        gemini = asyncio.create_task(self._solve_with_gemini(captcha_image_buffer))
+                        pending.add(gemini)
+                    elif not pending:
+                        logging.warning("GOOGLE_API_KEY não configurada: captcha de login sem resposta, tentando outro.")
+                if gemini in pending and gemini.done():
+                    pending.discard(gemini)
+                    answer = gemini.result()
+                    if answer:
+                        return answer, "gemini"
+                if not pending:
+                    return None, None
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def refresh_captcha(self, page) -> bool:
+        """Troca só a imagem do captcha, sem recarregar a página; False se não foi possível"""
+        try:
+            captcha_element = page.locator(CAPTCHA_SELECTOR)
+            if not await captcha_element.is_visible():
+                return False
+            return bool(await captcha_element.evaluate(_REFRESH_SCRIPT))
+        except Exception as e:
+            logging.warning(f"Não foi possível recarregar a imagem do captcha de login: {e}")
+            return False
+
+    async def _solve_with_gemini(self, captcha_image_buffer: bytes) -> Optional[str]:
+        """Resolve o captcha de login usando o Gemini."""
+        if self.gemini is None:
+            self.gemini = GeminiClient(metrics=self.metrics)
+        image = Image.open(io.BytesIO(captcha_image_buffer))
+
+        # Prompt preciso para o Gemini
+        prompt = "Responda apenas com os 5 caracteres alfanuméricos do captcha, sem mais nenhuma palavra ou espaço."
+        logging.info("Resolvendo captcha de login com Gemini...")
+        return await self.gemini.generate([prompt, image], validate=_clean_answer, account=self.account)
+
+    def record_result(self, accepted: bool) -> None:
+        """Guarda o último captcha aceito pelo site como exemplo rotulado para o solver local"""
+        if self.events is not None and self._last_answer:
+            self.events.captcha(self.account, "login", accepted)
+        if not accepted or not self.samples_dir or not self._last_image or not self._last_answer:
+            return
+        try:
+            os.makedirs(self.samples_dir, exist_ok=True)
+            path = os.path.join(self.samples_dir, f"{self._last_answer}_{int(time.time() * 1000)}.png")
+            with open(path, "wb") as f:
+                f.write(self._last_image)
+            logging.debug(f"Captcha de login rotulado salvo em {path}")
+        except OSError as e:
+            logging.warning(f"Não foi possível salvar o captcha de login rotulado: {e}")
+        finally:
+            self._last_image = self._last_answer = None
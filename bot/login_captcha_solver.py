@@ -0,0 +1,211 @@
+import argparse
+import io
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+CAPTCHA_LENGTH = 5
+GLYPH_SIZE = 16
+DEFAULT_BANK_PATH = "login_glyphs.npz"
+
+def _otsu_threshold(gray: np.ndarray) -> float:
+    """Limiar de Otsu para binarizar a imagem em tons de cinza"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    mean_bg = np.cumsum(hist * levels)
+    mean_total = mean_bg[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_total * weight_bg / total - mean_bg) ** 2 / (weight_bg * weight_fg)
+    # Imagem de uma cor só (captcha que não carregou): nenhum limiar separa as classes
+    return float(np.argmax(np.nan_to_num(between, nan=-1.0)))
+
+def binarize(image: Image.Image) -> np.ndarray:
+    """Converte a imagem em máscara booleana onde True é tinta (a classe minoritária)"""
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    mask = gray <= _otsu_threshold(gray)
+    # O texto ocupa menos área que o fundo; inverte se o limiar pegou o fundo
+    mask = ~mask if mask.mean() > 0.5 else mask
+    return despeckle(mask)
+
+def despeckle(mask: np.ndarray) -> np.ndarray:
+    """Remove pixels de tinta isolados (sem nenhum vizinho), típicos do ruído do captcha"""
+    padded = np.pad(mask, 1).astype(np.uint8)
+    height, width = mask.shape
+    neighbours = sum(
+        padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx
+    )
+    return mask & (neighbours > 0)
+
+def _column_runs(mask: np.ndarray, min_ink: int = 1) -> List[Tuple[int, int]]:
+    """Intervalos [início, fim) de colunas consecutivas com tinta"""
+    ink = mask.sum(axis=0) >= min_ink
+    runs, start = [], None
+    for x, has_ink in enumerate(ink):
+        if has_ink and start is None:
+            start = x
+        elif not has_ink and start is not None:
+            runs.append((start, x))
+            start = None
+    if start is not None:
+        runs.append((start, len(ink)))
+    return runs
+
+def _fit_runs(runs: List[Tuple[int, int]], mask: np.ndarray, count: int) -> List[Tuple[int, int]]:
+    """Ajusta os intervalos para `count` glifos: descarta ruído, divide os largos e une os estreitos"""
+    # Descarta respingos muito pequenos
+    runs = [r for r in runs if mask[:, r[0]:r[1]].sum() >= 4] or runs
+
+    while len(runs) > count:
+        # Une o par vizinho com menor espaço entre si
+        gaps = [runs[i + 1][0] - runs[i][1] for i in range(len(runs) - 1)]
+        i = int(np.argmin(gaps))
+        runs[i:i + 2] = [(runs[i][0], runs[i + 1][1])]
+
+    while runs and len(runs) < count:
+        # Divide o intervalo mais largo na coluna de menor tinta perto do meio
+        i = max(range(len(runs)), key=lambda k: runs[k][1] - runs[k][0])
+        start, end = runs[i]
+        width = end - start
+        if width < 2:
+            break
+        profile = mask[:, start:end].sum(axis=0)
+        low, high = width // 4, width - width // 4
+        cut = start + low + int(np.argmin(profile[low:high])) if high > low else start + width // 2
+        cut = min(max(cut, start + 1), end - 1)
+        runs[i:i + 1] = [(start, cut), (cut, end)]
+    return runs
+
+def _normalize_glyph(glyph: np.ndarray) -> np.ndarray:
+    """Recorta a caixa do glifo e redimensiona para GLYPH_SIZE x GLYPH_SIZE"""
+    rows = np.flatnonzero(glyph.any(axis=1))
+    if len(rows):
+        glyph = glyph[rows[0]:rows[-1] + 1]
+    image = Image.fromarray((glyph * 255).astype(np.uint8))
+    resized = image.resize((GLYPH_SIZE, GLYPH_SIZE), Image.BILINEAR)
+    return np.asarray(resized, dtype=np.float32).ravel() / 255.0
+
+def segment_glyphs(image_data: bytes, count: int = CAPTCHA_LENGTH) -> List[np.ndarray]:
+    """Separa o captcha em `count` vetores de glifo normalizados (lista vazia se falhar)"""
+    image = Image.open(io.BytesIO(image_data))
+    mask = binarize(image)
+    runs = _fit_runs(_column_runs(mask), mask, count)
+    if len(runs) != count:
+        return []
+    return [_normalize_glyph(mask[:, start:end]) for start, end in runs]
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    """Centraliza e normaliza os vetores para comparação por correlação"""
+    centered = vectors - vectors.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=-1, keepdims=True)
+    return centered / np.where(norms == 0, 1, norms)
+
+@dataclass
+class LocalSolution:
+    """Resposta do solver local com a confiança de cada glifo"""
+    text: str
+    confidences: List[float]
+    margins: List[float]
+    confident: bool
+
+class LocalCaptchaSolver:
+    """Solver do captcha de login que roda na CPU, sem acesso à rede.
+
+    Os glifos são segmentados por projeção de colunas e classificados por
+    correlação contra um banco de modelos extraído de captchas rotulados.
+    """
+
+    def __init__(self, bank_path: Optional[str] = DEFAULT_BANK_PATH,
+                 min_confidence: float = 0.8, min_margin: float = 0.05):
+        self.bank_path = bank_path
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.templates = np.zeros((0, GLYPH_SIZE * GLYPH_SIZE), dtype=np.float32)
+        self.labels = np.zeros(0, dtype="<U1")
+        if bank_path and os.path.exists(bank_path):
+            self.load(bank_path)
+
+    @property
+    def ready(self) -> bool:
+        """Indica se há modelos de glifo carregados"""
+        return len(self.templates) > 0
+
+    def load(self, path: str) -> None:
+        """Carrega o banco de modelos de glifo"""
+        with np.load(path) as data:
+            self.templates = data["templates"].astype(np.float32)
+            self.labels = data["labels"]
+        logging.info(f"{len(self.labels)} modelos de glifo carregados de {path}.")
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Salva o banco de modelos de glifo"""
+        np.savez_compressed(path or self.bank_path, templates=self.templates, labels=self.labels)
+
+    def train(self, directory: str) -> int:
+        """Extrai modelos de captchas rotulados (`<TEXTO>.png` ou `<TEXTO>_<qualquer>.png`)"""
+        vectors, labels = [], []
+        for name in sorted(os.listdir(directory)):
+            match = re.match(rf"^([A-Za-z0-9]{{{CAPTCHA_LENGTH}}})(?:_.*)?\.(png|jpe?g|gif)$", name)
+            if not match:
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                glyphs = segment_glyphs(f.read())
+            if not glyphs:
+                logging.warning(f"Não foi possível segmentar {name}, ignorando.")
+                continue
+            vectors.extend(glyphs)
+            labels.extend(match.group(1))
+
+        if vectors:
+            self.templates = np.concatenate([self.templates, _unit(np.array(vectors, dtype=np.float32))])
+            self.labels = np.concatenate([self.labels, np.array(labels, dtype="<U1")])
+        return len(vectors)
+
+    def solve(self, image_data: bytes) -> Optional[LocalSolution]:
+        """Classifica os glifos do captcha; None se não houver modelos ou a segmentação falhar"""
+        if not self.ready:
+            return None
+        glyphs = segment_glyphs(image_data)
+        if not glyphs:
+            return None
+
+        scores = _unit(np.array(glyphs, dtype=np.float32)) @ self.templates.T
+        classes = np.unique(self.labels)
+        # Melhor correlação de cada glifo para cada caractere (G, C)
+        per_class = np.stack([scores[:, self.labels == c].max(axis=1) for c in classes], axis=1)
+        order = np.argsort(-per_class, axis=1)
+
+        text, confidences, margins = [], [], []
+        for row, ranking in zip(per_class, order):
+            best = float(row[ranking[0]])
+            runner_up = float(row[ranking[1]]) if len(ranking) > 1 else -1.0
+            text.append(str(classes[ranking[0]]))
+            confidences.append(best)
+            margins.append(best - runner_up)
+
+        confident = min(confidences) >= self.min_confidence and min(margins) >= self.min_margin
+        return LocalSolution("".join(text), confidences, margins, confident)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Treina o solver local do captcha de login")
+    parser.add_argument("directories", nargs="+", help="Pastas com captchas rotulados (<TEXTO>.png)")
+    parser.add_argument("-o", "--output", default=DEFAULT_BANK_PATH, help="Arquivo do banco de glifos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    solver = LocalCaptchaSolver(bank_path=None)
+    for directory in args.directories:
+        added = solver.train(directory)
+        logging.info(f"{added} glifos extraídos de {directory}.")
+    solver.save(args.output)
+    logging.info(f"Banco com {len(solver.labels)} glifos salvo em {args.output}.")
+
+if __name__ == "__main__":
+    main()
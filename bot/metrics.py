@@ -0,0 +1,255 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Limites da distância de Hamming (soma dos três hashes) do captcha de caçada
+DISTANCE_BUCKETS = (0, 2, 4, 8, 12, 16, 20, 25, 30, 40, 60, 100)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, object]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: Sequence[Tuple[str, str]], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # último: acima do maior limite
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        running, result = 0, []
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas com rótulos, seguros entre threads.
+
+    O bot registra aqui a latência de cada fase (login, captcha, navegação,
+    batalha, cura...), os acertos e erros do captcha e o tempo ocioso de cada
+    conta; os exportadores leem o mesmo registro em Prometheus ou JSON lines.
+    """
+
+    def __init__(self, prefix: str = "naruto_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, _Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str) -> None:
+        """Texto de ajuda exportado junto com a métrica"""
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Incrementa um contador"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Define o valor atual de um gauge"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float,
+                buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+        """Registra uma amostra em um histograma"""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Mede a duração do bloco (inclusive quando ele lança exceção)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def phase(self, phase: str, account: str = ""):
+        """Atalho para medir uma fase de um ciclo do bot"""
+        return self.timer("phase_seconds", phase=phase, account=account)
+
+    def snapshot(self) -> Dict:
+        """Cópia de todas as métricas em estruturas simples (para JSON)"""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name, "labels": dict(labels), "count": h.count, "sum": h.total,
+                        "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.cumulative())),
+                    }
+                    for (name, labels), h in sorted(self._histograms.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Formato de exposição em texto do Prometheus"""
+        lines: List[str] = []
+        described = set()
+
+        def header(name: str, kind: str) -> None:
+            if name in described:
+                return
+            described.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {self.prefix}{name} {self._help[name]}")
+            lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, "counter")
+                lines.append(f"{self.prefix}{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                header(name, "gauge")
+                lines.append(f"{self.prefix}{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                header(name, "histogram")
+                metric = f"{self.prefix}{name}"
+                for bound, count in zip([*(f"{b:g}" for b in h.buckets), "+Inf"], h.cumulative()):
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.total:g}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+# Registro padrão do processo, compartilhado por todas as contas
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("phase_seconds", "Duração de cada fase dos ciclos do bot")
+REGISTRY.describe("cycle_seconds", "Duração de cada atividade executada")
+REGISTRY.describe("captcha_total", "Captchas de caçada por resultado (hit, miss, cache, error)")
+REGISTRY.describe("captcha_feedback_total", "Respostas do captcha de caçada confirmadas ou recusadas pelo site")
+REGISTRY.describe("captcha_distance", "Distância de Hamming do melhor match do captcha de caçada")
+REGISTRY.describe("login_attempts_total", "Tentativas de login por resultado")
+REGISTRY.describe("login_captcha_total", "Captchas de login respondidos, por estratégia vencedora (local, gemini)")
+REGISTRY.describe("gemini_calls_total", "Chamadas ao Gemini por resultado (ok, invalid, error, timeout, retry, throttled)")
+REGISTRY.describe("gemini_latency_seconds", "Latência das respostas do Gemini")
+REGISTRY.describe("errors_total", "Erros das atividades por classe (network, timeout, captcha, game, session, unknown)")
+REGISTRY.describe("backoff_seconds", "Espera antes de repetir uma atividade, por classe de erro")
+REGISTRY.describe("circuit_open", "1 enquanto o circuit breaker do host está aberto")
+REGISTRY.describe("circuit_trips_total", "Aberturas do circuit breaker por host")
+REGISTRY.describe("host_throttle_seconds_total", "Tempo de espera pelo orçamento de requisições do host")
+REGISTRY.describe("wait_seconds_saved_total", "Segundos economizados por passo em relação às pausas fixas antigas")
+REGISTRY.describe("wait_seconds_lost_total", "Segundos a mais por passo quando a condição demorou mais que a pausa antiga")
+REGISTRY.describe("events_written_total", "Eventos gravados no banco de eventos")
+REGISTRY.describe("events_dropped_total", "Eventos descartados (fila cheia ou erro do SQLite)")
+REGISTRY.describe("cycle_seconds_saved", "Segundos economizados em cada ciclo em relação às pausas fixas antigas")
+REGISTRY.describe("worker_accounts", "Contas atribuídas a cada processo worker")
+REGISTRY.describe("worker_restarts_total", "Workers relançados após morrer")
+REGISTRY.describe("idle_seconds_total", "Tempo esperando prazos (penalidades e timers)")
+REGISTRY.describe("active_seconds_total", "Tempo executando atividades")
+REGISTRY.describe("idle_ratio", "Fração do tempo da conta gasta esperando")
+REGISTRY.describe("state_cache_total", "Leituras de página evitadas (hit) ou feitas (miss) pelo cache de estado")
+REGISTRY.describe("context_recycles_total", "Contextos recriados por motivo (cycles, memory, timeout)")
+REGISTRY.describe("browser_restarts_total", "Reinícios do navegador por motivo (unresponsive, memory, context_hang)")
+REGISTRY.describe("page_heap_bytes", "Heap JS da página de cada conta")
+REGISTRY.describe("browser_rss_bytes", "RSS somado dos processos do Chromium")
+REGISTRY.describe("startup_seconds", "Duração de cada fase do início do processo")
+REGISTRY.describe("time_to_first_action_seconds", "Tempo do início do processo até a primeira atividade da conta")
+
+class MetricsServer:
+    """Endpoint HTTP `/metrics` no formato de texto do Prometheus, em uma thread"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"Métricas disponíveis em http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+class JsonLinesWriter:
+    """Acrescenta um snapshot das métricas por linha em um arquivo, periodicamente"""
+
+    def __init__(self, path: str, registry: MetricsRegistry = REGISTRY, interval: float = 60.0):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> None:
+        """Grava um snapshot imediatamente"""
+        line = json.dumps({"timestamp": time.time(), **self.registry.snapshot()}, ensure_ascii=False)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar as métricas em {self.path}: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self) -> "JsonLinesWriter":
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Para a thread e grava o último snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
@@ -1,520 +1,901 @@
+import asyncio
 import logging
 import time
 import random
-from datetime import datetime
-from typing import Dict
-import re
-from playwright.sync_api import sync_playwright
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Set
+from urllib.parse import urlsplit
+from playwright.async_api import async_playwright, Browser
 from .captcha_processor import CaptchaProcessor
-from .login_captcha_processor import LoginCaptchaProcessor
+from .login_captcha_processor import CAPTCHA_SELECTOR, LoginCaptchaProcessor
+from .gemini import GeminiClient
+from .login_captcha_solver import LocalCaptchaSolver
+from .reference_bank import ReferenceBank
+from .scheduler import DeadlineScheduler, HUNT, INVASION, DOUJUTSU
+from .captcha_capture import ResponseImageCapture
+from .session_store import SessionStore
+from .game_state import GameState, GameStateClient, BASE_URL, read_page_state
+from .browser_profile import BrowserProfile, STANDARD
+from .fleet_config import AccountConfig, AccountLimits, HUNT_MODES
+from .events import EventStore
+from .captcha_cache import CaptchaCache
+from .state_cache import GameStateCache
+from .metrics import MetricsRegistry, REGISTRY
+from .supervisor import BrowserSupervisor, MB
+from .startup import StartupTimer
+from .waits import LATENCY_PROFILES, LatencyProfile, StepWaits
+from .rate_controller import (HostRateController, SessionLost, classify_error,
+                              CAPTCHA, ELEMENT, GAME, NETWORK, SESSION, TIMEOUT, UNKNOWN)
+
+# Personagens do captcha de caçada e o id da resposta de cada um no formulário
+CHARACTER_IDS = {
+    "Naruto": "teste_resp1",
+    "Sakura": "teste_resp2",
+    "Sasuke": "teste_resp3",
+    "Kakashi": "teste_resp4"
+}
+
+# Logins enviados e imagens do captcha trocadas antes de desistir do login
+LOGIN_SUBMITS = 3
+LOGIN_REFRESHES = 5
 
 class NarutoBot:
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, hunt_type: int = 1,
+                 scheduler: Optional[DeadlineScheduler] = None,
+                 session_store: Optional[SessionStore] = None,
+                 base_url: str = BASE_URL,
+                 metrics: Optional[MetricsRegistry] = None,
+                 captcha_cache: Optional[CaptchaCache] = None,
+                 profile: Optional[BrowserProfile] = None,
+                 slot: int = 1,
+                 limits: Optional[AccountLimits] = None,
+                 reference_bank: Optional[ReferenceBank] = None,
+                 login_solver: Optional[LocalCaptchaSolver] = None,
+                 gemini_client: Optional[GeminiClient] = None,
+                 rate_controller: Optional[HostRateController] = None,
+                 latency: Optional[LatencyProfile] = None,
+                 events: Optional[EventStore] = None,
+                 startup: Optional[StartupTimer] = None):
         self.username = username
         self.password = password
-        self.character_to_id = {
-            "Naruto": "teste_resp1",
-            "Sakura": "teste_resp2",
-            "Sasuke": "teste_resp3",
-            "Kakashi": "teste_resp4"
-        }
-        self.captcha_processor = CaptchaProcessor(list(self.character_to_id.keys()))
-        self.login_captcha_processor = LoginCaptchaProcessor()
+        self.base_url = base_url
+        self.character_to_id = dict(CHARACTER_IDS)
+        self.metrics = metrics or REGISTRY
+        # Batalhas, recompensas e captchas gravados para os relatórios de rendimento (opcional)
+        self.events = events
+        self.captcha_processor = CaptchaProcessor(list(self.character_to_id.keys()),
+                                                  metrics=self.metrics, account=username,
+                                                  cache=captcha_cache or CaptchaCache(),
+                                                  reference_bank=reference_bank, events=events)
+        self.login_captcha_processor = LoginCaptchaProcessor(local_solver=login_solver, gemini=gemini_client,
+                                                             metrics=self.metrics, account=username,
+                                                             events=events)
+        self.startup = startup
+        self.scheduler = scheduler or DeadlineScheduler()
+        self.session_store = session_store or SessionStore()
+        # Respostas de páginas já lidas, válidas até o jogo indicar que mudaram
+        self.state_cache = GameStateCache(clock=self.scheduler.now)
+        self._authenticated = False
+        self.state_client: Optional[GameStateClient] = None
+        self._context = None
+        self._generation = 0
+        self._cycles_in_context = 0
+        self.profile = profile or STANDARD
+        # Orçamento de requisições, circuit breaker e backoff por classe de erro (compartilhado na frota)
+        self.rate = rate_controller or HostRateController(metrics=self.metrics)
+        self.host = urlsplit(base_url).hostname or ""
+        self.request_filter = self.profile.request_filter(self.host, self.rate)
+        # Esperas por condição; a pausa "humana" entre passos vem do perfil de latência
+        self.waits = StepWaits(latency or LATENCY_PROFILES["human"], self.metrics, username)
+        # Classes de erro com backoff no ciclo atual (os handlers tratam os próprios erros e retornam)
+        self._cycle_failures: Set[str] = set()
+        self._idle_seconds = 0.0
+        self._active_seconds = 0.0
         logging.info("NarutoBot inicializado.")
 
-        # Adiciona a escolha do tipo de caçada no início
-        self.hunt_type = self._choose_hunt_type()
-
-    def _choose_hunt_type(self) -> int:
-        """Permite ao usuário escolher o tipo de caçada."""
-        while True:
-            print("Escolha o tipo de caçada:")
-            print("1 - Caçada por level (Gennin)")
-            print("2 - Caçada por tempo")
-            print("3 - Farmar invasões")
-            choice = input("Digite 1, 2 ou 3 (padrão: 1): ")
-            if choice in ("1", "2", "3" ):
-                return int(choice)
-            elif choice == "":
-                return 1  # Caçada aleatória como padrão
-            else:
-                print("Opção inválida. Digite 1, 2 ou 3.")
+        # Tipo de caçada (1: level, 2: tempo, 3: só invasões), personagem e limites da conta
+        self.hunt_type = hunt_type
+        self.slot = slot
+        self.limits = limits or AccountLimits()
+        self._hunt_day: Optional[date] = None
+        self._hunts_today = 0
+
+    def apply_config(self, account: AccountConfig) -> None:
+        """Aplica modo e limites novos sem reiniciar a conta (senha e slot exigem novo login)"""
+        previous = self.hunt_type
+        self.hunt_type = account.hunt_type
+        self.limits = account.limits
+        if previous != self.hunt_type:
+            logging.info(f"Modo de {self.username} alterado para {account.mode}.")
+            if self.hunt_type == 3:
+                self.scheduler.cancel(self.username, HUNT)
+            elif self.scheduler.deadline(self.username, HUNT) is None:
+                self.scheduler.schedule(self.username, HUNT, 0)
+
+    @property
+    def mode(self) -> str:
+        """Nome do modo de caçada atual (level, timed ou invasion)"""
+        return next((name for name, hunt_type in HUNT_MODES.items() if hunt_type == self.hunt_type), "")
+
+    def _limit_delay(self, activity: str) -> float:
+        """Segundos até a atividade voltar a ser permitida pelos limites da conta (0: permitida)"""
+        now = datetime.now()
+        if not self.limits.is_active_hour(now.hour):
+            # Fora do horário: volta a olhar na próxima hora cheia
+            return 3600 - now.minute * 60 - now.second + random.uniform(2, 5)
+        if activity == HUNT and self.limits.max_hunts_per_day:
+            if self._hunt_day != now.date():
+                self._hunt_day, self._hunts_today = now.date(), 0
+            if self._hunts_today >= self.limits.max_hunts_per_day:
+                midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+                return (midnight - now).total_seconds() + random.uniform(2, 5)
+        return 0.0
 
     @staticmethod
-    def get_remaining_time(page) -> int:
+    async def get_remaining_time(page) -> int:
         """Extrai o tempo restante do elemento HTML do timer"""
         try:
-            # Primeiro verifica se o elemento existe com um timeout curto
-            if not page.locator("#relogio_contador").is_visible(timeout=2000):
+            state = await read_page_state(page)
+            if state.hunt_timer_text is None:
                 logging.info("Contador não encontrado na página")
                 return 0
-
-            # Se existir, pega o texto com timeout curto
-            timer_text = page.locator("#relogio_contador").inner_text(timeout=2000)
-            match = re.match(r"(\d{2}):(\d{2}):(\d{2})", timer_text)
-            if match:
-                hours, minutes, seconds = map(int, match.groups())
-                return hours * 3600 + minutes * 60 + seconds
-            return 0
+            return state.hunt_remaining
         except Exception as e:
             logging.info("Sem tempo de penalidade para aguardar")
             return 0
 
     @staticmethod
-    def get_remaining_invasion_time(page) -> int:
+    async def get_remaining_invasion_time(page) -> int:
         """Extrai o tempo restante do elemento HTML do timer de invasão"""
         try:
-            # Primeiro verifica se o elemento existe com um timeout curto
-            if not page.locator("#relogio_invasao").is_visible(timeout=2000):
+            state = await read_page_state(page)
+            if state.invasion_text is None:
                 logging.info("Contador de invasão não encontrado na página")
                 return 0
-
-            # Se existir, pega o texto com timeout curto
-            timer_text = page.locator("#relogio_invasao").inner_text(timeout=2000)
-            match = re.match(r"(\d{2}):(\d{2}):(\d{2})", timer_text)
-            if match:
-                hours, minutes, seconds = map(int, match.groups())
-                return hours * 3600 + minutes * 60 + seconds
-            return 0
+            return state.invasion_remaining
         except Exception as e:
             logging.info("Sem tempo de invasão para aguardar")
             return 0
 
-    def wait_for_hunt_timer(self, page) -> None:
-        """Espera o timer de caçada terminar com tempo aleatório adicional"""
-        remaining_time = self.get_remaining_time(page)
+    async def defer_for_hunt_timer(self, page) -> bool:
+        """Reagenda a caçada para o fim do timer (com tempo aleatório adicional).
+
+        Retorna True quando há penalidade ativa e a caçada foi adiada; nesse
+        meio tempo o agendador fica livre para atender outras atividades.
+        """
+        remaining_time = await self.get_remaining_time(page)
         if remaining_time > 0:
             # Adiciona um tempo aleatório extra para parecer mais humano
             extra_time = random.randint(0, 5)
             total_wait = remaining_time + extra_time
-            logging.info(f"Aguardando {total_wait} segundos (inclui {extra_time}s aleatórios)")
-            time.sleep(total_wait)
-            page.reload()
-            page.wait_for_load_state()
+            logging.info(f"Caçada adiada em {total_wait} segundos (inclui {extra_time}s aleatórios)")
+            self.scheduler.schedule(self.username, HUNT, total_wait)
+            return True
+        return False
+
+    async def run(self, supervisor: Optional[BrowserSupervisor] = None) -> None:
+        """Executa o bot principal.
+
+        Quando `supervisor` é informado, a conta roda em um contexto próprio
+        dentro do navegador compartilhado (modo multi-contas); caso contrário o
+        bot inicia e encerra o seu próprio Chromium, também supervisionado.
+        """
+        logging.info(f"Iniciando a execução do bot ({self.username}).")
+
+        if supervisor is None:
+            async with async_playwright() as p:
+                # Mantenha headless=False para depuração
+                launch_options = self.profile.launch_options(headless=True)
+                supervisor = await BrowserSupervisor(lambda: p.chromium.launch(**launch_options),
+                                                     metrics=self.metrics).start()
+                try:
+                    await self.run(supervisor)
+                finally:
+                    await supervisor.stop()
+            return
 
-    def run(self) -> None:
-        """Executa o bot principal"""
-        logging.info("Iniciando a execução do bot.")
+        policy = supervisor.policy
+        try:
+            # Na frota, as contas são montadas enquanto o Chromium ainda está subindo
+            await supervisor.wait_started()
+            # A página é aberta dentro do ciclo: uma falha no primeiro login também passa pelo backoff
+            page = None
+
+            if self.hunt_type not in (1, 2, 3):
+                raise ValueError("Tipo de caçada inválido.")
+            if self.hunt_type in (1, 2):
+                self.scheduler.schedule(self.username, HUNT, 0)
+            self.scheduler.schedule(self.username, INVASION, 0)
+
+            # Sempre acorda para o prazo que vencer primeiro (caçada, invasão ou doujutsu)
+            while True:
+                waiting_since = self.scheduler.now()
+                activity = await self.scheduler.next_activity(self.username)
+                idle = self.scheduler.now() - waiting_since
+                # Site degradado: espera o circuito liberar em vez de somar mais uma tentativa
+                blocked = self.rate.retry_after(self.host)
+                if blocked > 0:
+                    logging.info(f"Site indisponível, {activity} adiada em {blocked:.0f} segundos.")
+                    self.scheduler.schedule(self.username, activity, blocked + random.uniform(0, 5))
+                    self._record_timeline(idle, 0.0)
+                    continue
+                started = time.perf_counter()
+                self._cycle_failures.clear()
+                try:
+                    # Primeira abertura, contexto reciclado ou navegador reiniciado: abre a partir da sessão salva
+                    if page is None or self._generation != supervisor.generation:
+                        page = await self._open_page(supervisor)
+                    if self.startup is not None:
+                        self.startup.first_action(self.username)
+                    with self.metrics.timer("cycle_seconds", activity=activity, account=self.username):
+                        await asyncio.wait_for(self._run_activity(page, activity), policy.cycle_timeout)
+                    self._cycles_in_context += 1
+                    # Um ciclo que retornou pode ter falhado e agendado um backoff: só as classes
+                    # que não falharam nele são zeradas, senão o backoff nunca passaria do primeiro passo
+                    recovered = {NETWORK, TIMEOUT, ELEMENT, SESSION, UNKNOWN} - self._cycle_failures
+                    if recovered:
+                        self.rate.succeeded(self.username, *recovered)
+                    reason = await self._recycle_reason(supervisor, page)
+                except asyncio.TimeoutError:
+                    logging.error(f"Atividade {activity} travada por mais de {policy.cycle_timeout:.0f}s.")
+                    self.scheduler.schedule(self.username, activity, self._backoff(TIMEOUT))
+                    reason = "timeout"
+                except Exception as e:
+                    error_class = classify_error(e)
+                    delay = self._backoff(error_class)
+                    if error_class == UNKNOWN:
+                        logging.exception(f"Erro durante a atividade {activity}:")
+                    else:
+                        logging.error(f"Erro ({error_class}) durante a atividade {activity}: {e}")
+                    logging.info(f"Nova tentativa de {activity} em {delay:.1f} segundos.")
+                    self.scheduler.schedule(self.username, activity, delay)
+                    # Sessão perdida: o contexto é recriado e o login refeito no próximo ciclo
+                    reason = "session" if error_class == SESSION else None
+                if reason is not None and page is not None:
+                    await self._recycle_context(supervisor, reason)
+                    page = None
+                self.waits.cycle_report(activity)
+                self._record_timeline(idle, time.perf_counter() - started)
 
-        with sync_playwright() as p:
+        except Exception as e:
+            logging.exception("Erro crítico durante execução do bot:")
+        finally:
+            self.scheduler.remove_account(self.username)
+            self.request_filter.log_summary(f"[{self.username}] ")
+            self.captcha_processor.cache.save()
+            await self._close_context(policy.close_timeout)
+
+    async def _open_page(self, supervisor: BrowserSupervisor):
+        """Cria o contexto e a página da conta no navegador atual e restaura a sessão"""
+        # Sobra de uma abertura que falhou no meio, ou de um navegador que já foi reiniciado
+        await self._close_context(supervisor.policy.close_timeout)
+        self._generation = supervisor.generation
+        self._context = await self._new_context(supervisor.browser, self.session_store.load(self.username))
+        page = await self._context.new_page()
+        # Captura as imagens dos captchas direto das respostas de rede
+        ResponseImageCapture.attach(page)
+
+        await self._authenticate(self._context, page)
+        # Leituras de estado (HP, timers, doujutsu) por HTTP, com os cookies do contexto
+        self.state_client = GameStateClient(self._context, self.base_url, self.rate)
+        self._cycles_in_context = 0
+        return page
+
+    async def _recycle_reason(self, supervisor: BrowserSupervisor, page) -> Optional[str]:
+        """Motivo para recriar o contexto da conta, ou None se ele ainda está saudável"""
+        policy = supervisor.policy
+        if self._cycles_in_context >= policy.max_cycles:
+            return "cycles"
+        heap = await supervisor.page_heap(page)
+        if heap is not None:
+            self.metrics.set_gauge("page_heap_bytes", heap, account=self.username)
+            if heap > policy.max_page_heap_mb * MB:
+                return "memory"
+        return None
+
+    async def _recycle_context(self, supervisor: BrowserSupervisor, reason: str) -> None:
+        """Fecha o contexto da conta; o próximo ciclo abre outro a partir da sessão salva"""
+        logging.info(f"Recriando o contexto de {self.username} (motivo: {reason}, "
+                     f"{self._cycles_in_context} atividades).")
+        self.metrics.inc("context_recycles_total", reason=reason, account=self.username)
+        generation = self._generation
+        if not await self._close_context(supervisor.policy.close_timeout):
+            # Nem o fechamento responde: o navegador inteiro está travado
+            await supervisor.restart("context_hang", generation)
+
+    async def _close_context(self, timeout: float) -> bool:
+        """Salva a sessão e fecha o contexto atual; False se o fechamento travou"""
+        context, self._context = self._context, None
+        self.state_client = None
+        if context is None:
+            return True
+        # Guarda os cookies mais recentes para o próximo contexto (ou o próximo início)
+        if self._authenticated:
             try:
-                ad_domains = [
-                    "*googleadservices.com*",
-                    "*doubleclick.net*",
-                    "*google-analytics.com*",
-                    "*googlesyndication.com*",
-                    "*adnxs.com*",
-                    "*advertising.com*",
-                    "*adform.net*",
-                    "*facebook.com*",
-                    "*analytics*",
-                    "*tracker*",
-                    "*pixel*",
-                    "*banner*",
-                    "*ads*",
-                    "*adsystem*",
-                    "*adserver*",
-                    "*tracking*",
-                ]
-                browser = p.chromium.launch(headless=True)  # Mantenha headless=False para depuração
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                )
-                context.route(
-                    "**/*(ads|analytics|facebook|doubleclick|googleadservices|googlesyndication)*",
-                    lambda route: route.abort()
-                )
-
-                # Bloqueia múltiplos padrões de URLs
-                for pattern in ad_domains:
-                    context.route(pattern, lambda route: route.abort())
-
-                # Bloqueia scripts específicos de anúncios
-                context.route("**/*.js", lambda route: route.abort()
-                    if any(ad in route.request.url for ad in ["ads", "analytics", "pixel", "track"])
-                    else route.continue_()
-                )
-
-                # Bloqueia requisições de imagens suspeitas de serem anúncios
-                context.route("**/*.{png,jpg,gif}", lambda route: route.abort()
-                    if any(ad in route.request.url for ad in ["ads", "banner", "popup"])
-                    else route.continue_()
-                )
-
-                page = context.new_page()
-
-                self._login(page)
-                self._select_character(page)
-
-                while True:
-                    try:
-                        if self.hunt_type == 1:
-                            success = self._execute_hunt_cycle(page)
-                        elif self.hunt_type == 2:
-                            success = self._execute_timed_hunt_cycle(page)
-                        elif self.hunt_type == 3:
-                            success = self._execute_invasion(page)
-                        else:
-                            raise ValueError("Tipo de caçada inválido.")
-                        time.sleep(random.uniform(2, 5))  # Delay aleatório
-                    except Exception as e:
-                        logging.exception("Erro durante ciclo de caçada:")
-                        time.sleep(60)
-
+                await asyncio.wait_for(self.session_store.save(context, self.username), timeout)
             except Exception as e:
-                logging.exception("Erro crítico durante execução do bot:")
-            finally:
-                browser.close()
+                logging.warning(f"Não foi possível salvar a sessão: {e!r}")
+        try:
+            await asyncio.wait_for(context.close(), timeout)
+            return True
+        except Exception as e:
+            logging.warning(f"O contexto de {self.username} não fechou: {e!r}")
+            return False
 
+    def _backoff(self, error_class: str) -> float:
+        """Espera antes de repetir uma atividade que falhou com erro da classe informada"""
+        self._cycle_failures.add(error_class)
+        return self.rate.backoff(self.username, error_class, self.host)
+
+    def _phase(self, name: str):
+        """Mede uma fase do ciclo no histograma `phase_seconds` da conta"""
+        return self.metrics.phase(name, self.username)
+
+    def _record_timeline(self, idle: float, active: float) -> None:
+        """Acumula o tempo ocioso (esperando prazos) e ativo da conta"""
+        self._idle_seconds += idle
+        self._active_seconds += active
+        self.metrics.inc("idle_seconds_total", idle, account=self.username)
+        self.metrics.inc("active_seconds_total", active, account=self.username)
+        total = self._idle_seconds + self._active_seconds
+        if total > 0:
+            self.metrics.set_gauge("idle_ratio", self._idle_seconds / total, account=self.username)
+
+    async def _authenticate(self, context, page) -> None:
+        """Restaura a sessão salva da conta ou faz o login completo"""
+        if self.session_store.load(self.username):
+            if await self._session_is_valid(context):
+                logging.info("Sessão salva ainda válida, login ignorado.")
+                self._authenticated = True
+                return
+            logging.info("Sessão salva expirou, refazendo o login.")
+            self.session_store.discard(self.username)
 
-    def _login(self, page, attempts=0) -> None:
-        """Realiza o login no site, usando o Gemini para o captcha."""
-        if attempts >= 3:  # Limite de 3 tentativas (conforme sugerido anteriormente)
-            raise RuntimeError("Falha ao resolver o captcha de login após múltiplas tentativas.")
-        logging.info("Acessando a página de login.")
-        page.goto("https://www.narutoplayers.com.br/")
-        page.wait_for_load_state()
+        await self._login(page)
+        await self._select_character(page)
+        self._authenticated = True
+        await self.session_store.save(context, self.username)
 
-        # Resolve o captcha de login
-        captcha_solution = self.login_captcha_processor.solve_captcha(page)
+    async def _session_is_valid(self, context) -> bool:
+        """Verifica a sessão com uma única requisição leve à página de status"""
+        try:
+            response = await context.request.get(f"{self.base_url}?p=status")
+            html = await response.text()
+            # Só a página de status de um personagem selecionado tem a barra de HP
+            return response.ok and 'hp_baixo' in html
+        except Exception as e:
+            logging.warning(f"Falha ao verificar a sessão salva: {e}")
+            return False
 
-        if captcha_solution:
-            page.locator('input[name="usuario"]').fill(self.username)
-            page.locator('input[name="senha"]').fill(self.password)
-            page.locator('input[name="codigo"]').fill(captcha_solution) #Preenche o campo do captcha
-            page.locator('input[value="Login"]').click()
-            page.wait_for_load_state() # Espere a página após o login
+    async def _run_activity(self, page, activity: str) -> None:
+        """Executa a atividade cujo prazo venceu"""
+        delay = self._limit_delay(activity) if activity in (HUNT, INVASION) else 0.0
+        if delay > 0:
+            logging.info(f"Limites de {self.username}: {activity} adiada em {delay:.0f} segundos.")
+            self.scheduler.schedule(self.username, activity, delay)
+            return
+        if activity == HUNT:
+            if self.hunt_type == 3:
+                return  # o modo mudou para só invasões depois do agendamento
+            if self.hunt_type == 1:
+                hunted = await self._execute_hunt_cycle(page)
+            else:
+                hunted = await self._execute_timed_hunt_cycle(page)
+            if hunted:
+                self._hunts_today += 1
+            # Se o ciclo falhou sem agendar a próxima caçada, tenta de novo em instantes
+            if self.scheduler.deadline(self.username, HUNT) is None:
+                self.scheduler.schedule(self.username, HUNT, random.uniform(2, 5))  # Delay aleatório
+        elif activity == INVASION:
+            await self._execute_invasion(page)
+        elif activity == DOUJUTSU:
+            await self._check_doujutsu(page)
+
+    async def _new_context(self, browser: Browser, storage_state: Optional[str] = None):
+        """Cria um contexto isolado (cookies próprios) no perfil da conta, com o filtro de requisições"""
+        context = await browser.new_context(**self.profile.context_options(storage_state))
+        # Um único handler bloqueia anúncios, rastreadores, fontes e mídia (e, no perfil lite, imagens)
+        await self.request_filter.install(context)
+        return context
+
+    async def _login(self, page) -> None:
+        """Realiza o login no site, resolvendo o captcha localmente ou com o Gemini.
+
+        A página de login é carregada uma vez. Um captcha sem resposta é trocado
+        recarregando só a imagem (o servidor só aceita a última imagem gerada),
+        e um login recusado já volta com o formulário e um captcha novo.
+        """
+        logging.info("Acessando a página de login.")
+        with self._phase("login.goto"):
+            await page.goto(self.base_url)
+
+        submits = refreshes = 0
+        while submits < LOGIN_SUBMITS:
+            # Resolve o captcha de login
+            captcha_solution = await self.login_captcha_processor.solve_captcha(page)
+
+            if not captcha_solution:
+                logging.error("Não foi possível resolver o captcha de login.")
+                self.metrics.inc("login_attempts_total", result="unsolved", account=self.username)
+                refreshes += 1
+                if refreshes > LOGIN_REFRESHES:
+                    break
+                with self._phase("login.refresh"):
+                    if not await self.login_captcha_processor.refresh_captcha(page):
+                        await page.goto(self.base_url)
+                continue
+
+            submits += 1
+            with self._phase("login.submit"):
+                await page.locator('input[name="usuario"]').fill(self.username)
+                await page.locator('input[name="senha"]').fill(self.password)
+                await page.locator('input[name="codigo"]').fill(captcha_solution) #Preenche o campo do captcha
+                # Espere a página após o login
+                await self.waits.navigation(page, "login.submit", page.locator('input[value="Login"]').click)
 
             #Verifica se o login foi bem-sucedido.
-            if page.locator('#corpo .selecao_char a[href="?p=selecionar&slot=1"]').is_visible():
-                logging.info("Login bem-sucedido!")
-            else:
-                logging.error("Falha no login. Verifique as credenciais e o captcha.")
-                self._login(page, attempts + 1)
+            if await page.locator(f'#corpo .selecao_char a[href="?p=selecionar&slot={self.slot}"]').is_visible():
+                logging.info(f"Login bem-sucedido! (captcha: {self.login_captcha_processor.last_strategy})")
+                self.metrics.inc("login_attempts_total", result="success", account=self.username)
+                # Captcha aceito: vira exemplo rotulado para o solver local
+                self.login_captcha_processor.record_result(True)
                 return
 
-        else:
-            logging.error("Não foi possível resolver o captcha de login.")
-            self._login(page, attempts + 1)
-            return
+            logging.error("Falha no login. Verifique as credenciais e o captcha.")
+            self.metrics.inc("login_attempts_total", result="rejected", account=self.username)
+            self.login_captcha_processor.record_result(False)
+            if not await page.locator(CAPTCHA_SELECTOR).is_visible():
+                with self._phase("login.goto"):
+                    await page.goto(self.base_url)
+
+        raise RuntimeError("Falha ao resolver o captcha de login após múltiplas tentativas.")
 
+    async def _select_character(self, page) -> None:
+        """Seleciona o personagem no slot configurado da conta"""
+        with self._phase("select_character"):
+            await self._select_character_slot(page)
 
-    def _select_character(self, page) -> None:
-        """Seleciona o personagem no slot 1"""
-        logging.info("Selecionando personagem no slot 1.")
-        selector = '#corpo .selecao_char a[href="?p=selecionar&slot=1"]'
+    async def _select_character_slot(self, page) -> None:
+        logging.info(f"Selecionando personagem no slot {self.slot}.")
+        selector = f'#corpo .selecao_char a[href="?p=selecionar&slot={self.slot}"]'
         try:
-            page.wait_for_selector(selector, state='visible', timeout=30000)  # Espera até 30 segundos
-            if page.locator(selector).is_visible():
+            await page.wait_for_selector(selector, state='visible', timeout=30000)  # Espera até 30 segundos
+            if await page.locator(selector).is_visible():
                 logging.info("Elemento de seleção de personagem está visível.")
-                page.locator(selector).click()
-                page.wait_for_timeout(1000)
+                await page.locator(selector).click()
 
-                confirm_selector = 'input[onclick="javascript:redirect(\'?p=selecionar&slot=1&confirma=ok\'); return false;"]'
-                page.wait_for_selector(confirm_selector, state='visible', timeout=30000)  # Espera até 30 segundos
-                if page.locator(confirm_selector).is_visible():
+                confirm_selector = f'input[onclick="javascript:redirect(\'?p=selecionar&slot={self.slot}&confirma=ok\'); return false;"]'
+                # Espera até 30 segundos pelo botão de confirmação (antes havia ainda uma pausa fixa de 1 s)
+                await self.waits.until("select.confirm", page.wait_for_selector(confirm_selector, state='visible',
+                                                                                timeout=30000), legacy=1.0)
+                if await page.locator(confirm_selector).is_visible():
                     logging.info("Elemento de confirmação de seleção está visível.")
-                    page.locator(confirm_selector).click()
+                    # A sessão é salva logo depois: ela precisa já ter o personagem selecionado
+                    await self.waits.navigation(page, "select.submit", page.locator(confirm_selector).click)
                     logging.info("Personagem selecionado com sucesso.")
                 else:
                     logging.error("Elemento de confirmação de seleção não está visível.")
-                    page.screenshot(path="error_select_character_confirm.png")
+                    await page.screenshot(path="error_select_character_confirm.png")
                     raise Exception("Elemento de confirmação de seleção não está visível.")
             else:
                 logging.error("Elemento de seleção de personagem não está visível.")
-                page.screenshot(path="error_select_character.png")
+                await page.screenshot(path="error_select_character.png")
                 raise Exception("Elemento de seleção de personagem não está visível.")
         except Exception as e:
             logging.exception("Erro ao selecionar personagem:")
-            page.screenshot(path="error_select_character_exception.png")
+            await page.screenshot(path="error_select_character_exception.png")
             raise e
 
-    def _process_invasion(self, page) -> bool:
-        """Processa a invasão após a caçada"""
+    def _record_captcha_outcome(self, page, activity: str) -> Optional[str]:
+        """Recusa a última resposta do captcha se o site voltou com &aviso=5; senão a esquece.
+
+        Devolve a classe do erro (captcha) quando o site recusou a resposta.
+        """
+        if "aviso=5" in page.url:
+            self.captcha_processor.record_result(False, activity)
+            return CAPTCHA
+        self.captcha_processor.discard_pending()
+        return None
+
+    async def _fetch_state(self, page_query: str) -> Optional[GameState]:
+        """Lê o estado do jogo por HTTP; None se o caminho rápido não estiver disponível"""
+        if self.state_client is None:
+            return None
         try:
-            page.goto("https://www.narutoplayers.com.br/?p=invasao")
-            page.wait_for_timeout(1000)
+            state = await self.state_client.fetch(page_query)
+        except SessionLost:
+            raise
+        except Exception as e:
+            logging.debug(f"Leitura por HTTP de ?p={page_query} falhou, usando o navegador: {e}")
+            return None
+        self.state_cache.update(state)
+        return state
+
+    def _cache_result(self, field: str, hit: bool) -> None:
+        """Conta leituras de página evitadas (hit) ou necessárias (miss) pelo cache de estado"""
+        self.metrics.inc("state_cache_total", field=field, result="hit" if hit else "miss",
+                         account=self.username)
+
+    def _schedule_next_invasion(self, remaining_invasion_time: int) -> None:
+        """Agenda a próxima verificação de invasão a partir do timer da página"""
+        if remaining_invasion_time > 0:
+            logging.info(f"Próxima invasão em {remaining_invasion_time} segundos.")
+            self.scheduler.schedule(self.username, INVASION, remaining_invasion_time)
+        else:
+            # Sem timer legível: volta a olhar em um minuto
+            self.scheduler.schedule(self.username, INVASION, 60)
+
+    async def _process_invasion(self, page) -> bool:
+        """Processa a invasão e agenda a próxima verificação"""
+        try:
+            # O timer lido antes ainda não zerou: nenhuma página precisa ser buscada
+            cached_remaining = self.state_cache.invasion_remaining()
+            self._cache_result("invasion", cached_remaining > 0)
+            if cached_remaining > 0:
+                logging.info("Invasor não está disponível para ataque no momento (timer em cache)")
+                self._schedule_next_invasion(cached_remaining)
+                return False
+
+            # Caminho rápido: se o HTML já mostra o timer, nem abre a página no navegador
+            with self._phase("invasion.check"):
+                state = await self._fetch_state("invasao")
+            if state is not None and state.invasion_text and not state.invasion_available:
+                logging.info("Invasor não está disponível para ataque no momento")
+                self._schedule_next_invasion(state.invasion_remaining)
+                return False
+
+            with self._phase("invasion.goto"):
+                await page.goto(f"{self.base_url}?p=invasao")
+                # O timer (ou "Atacar!") é o que decide o passo seguinte
+                await self.waits.until("invasion.timer", page.wait_for_selector("#relogio_invasao", state="attached",
+                                                                                timeout=30000), legacy=1.0)
 
             # Verifica se está escrito "Atacar!"
-            invasion_text = page.locator('#relogio_invasao').inner_text()
-            if invasion_text.strip() == "Atacar!":
+            if (await read_page_state(page)).invasion_available:
                 logging.info("Invasor disponível para ataque!")
 
                 # Processa o captcha como na caçada
-                identified_character = self.captcha_processor.identify_character(page)
+                identified_character = await self.captcha_processor.identify_character(page)
                 if not identified_character:
                     logging.warning("Falha na identificação do personagem na invasão")
+                    self.scheduler.schedule(self.username, INVASION, self._backoff(CAPTCHA))
                     return False
 
                 radio_button_id = self.character_to_id.get(identified_character)
                 if not radio_button_id:
                     logging.error(f"ID não encontrado para o personagem na invasão: {identified_character}")
+                    self.scheduler.schedule(self.username, INVASION, self._backoff(CAPTCHA))
                     return False
 
                 # Seleciona o personagem e ataca
-                page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
-                page.locator(f"#{radio_button_id}").check()
-                page.locator('#relogio_invasao').click()
+                with self._phase("invasion.attack"):
+                    await page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
+                    await page.locator(f"#{radio_button_id}").check()
+                    # O resultado (&aviso=5 ou não) só vale depois da navegação do ataque
+                    await self.waits.navigation(page, "invasion.attack", page.locator('#relogio_invasao').click)
                 # Verifica se o ataque foi bem-sucedido, caso a url possua &aviso=5 é porque o ataque deu errado
                 if "&aviso=5" in page.url:
                     logging.error("Erro ao atacar o invasor.")
                     # Loga o erro da pagina
-                    error_text = page.locator('#error').inner_text()
+                    error_text = (await read_page_state(page)).error_text or ""
                     logging.error(error_text)
                     # Se error_text conter a seguinte frase "25 pontos de HP", va para status e recupe o HP.
                     if "25 pontos de HP" in error_text:
-                        page.goto("https://www.narutoplayers.com.br/?p=status")
-                        page.wait_for_load_state()
-                        hp_text = page.locator('#hp_baixo .hp_xp').inner_text()
-                        current_hp = int(hp_text.split("/")[0].strip())
-                        max_hp = int(hp_text.split("/")[1].strip())
-                        if current_hp < max_hp / 2:
-                            logging.info("HP baixo, curando...")
-                            use_link = page.locator('a').filter(has_text="Usar").nth(0)
-                            if use_link:
-                                use_link.click()
-                            else:
-                                logging.error("Link 'Usar' não encontrado.")
-                                return False
-                        else:
-                            logging.info("HP atual: %d/%d, não é necessário curar.", current_hp, max_hp)
+                        # Recusa por falta de HP: não diz nada sobre a resposta do captcha
+                        self.captcha_processor.discard_pending()
+                        with self._phase("invasion.heal"):
+                            await page.goto(f"{self.base_url}?p=status")
+                            await self._heal_if_needed(page)
+                        self.scheduler.schedule(self.username, INVASION, self._backoff(GAME))
+                    else:
+                        self.captcha_processor.record_result(False, "invasion")
+                        self.scheduler.schedule(self.username, INVASION, self._backoff(CAPTCHA))
                     return False
 
                 logging.info("Ataque ao invasor realizado com sucesso!")
+                if self.events is not None:
+                    result = await read_page_state(page)
+                    self.events.invasion(self.username, self.mode, result.enemy_name, result.battle_text)
+                self.captcha_processor.record_result(True, "invasion")
+                self.rate.succeeded(self.username, CAPTCHA, GAME)
+                self.state_cache.invalidate_hp()
+                # Relê o timer da próxima invasão logo em seguida
+                self.scheduler.schedule(self.username, INVASION, random.uniform(2, 5))
                 return True
             else:
                 logging.info("Invasor não está disponível para ataque no momento")
-                if self.hunt_type == 3:
-                    remaining_invasion_time = self.get_remaining_invasion_time(page)
-                    if remaining_invasion_time > 0:
-                        logging.info(f"Aguardando {remaining_invasion_time} segundos até a próxima invasão...")
-                        time.sleep(remaining_invasion_time)
+                remaining_invasion_time = await self.get_remaining_invasion_time(page)
+                self.state_cache.record_invasion(False, remaining_invasion_time)
+                self._schedule_next_invasion(remaining_invasion_time)
                 return False
 
+        except SessionLost:
+            raise
         except Exception as e:
             logging.exception("Erro durante o processamento da invasão:")
+            self.scheduler.schedule(self.username, INVASION, self._backoff(classify_error(e)))
             return False
 
-    def _check_doujutsu(self, page) -> int:
-        """Verifica se o Doujutsu está ativo e retorna o tempo restante."""
-        try:
-            # Caso já esteja na página de status, não é necessário navegar para ela
-            if not page.url.endswith("status"):
-                page.goto("https://www.narutoplayers.com.br/?p=status")
-            page.wait_for_load_state()
-            doujutsu_element = page.locator('#doujutsu_relogio')
-            doujutsu_name_element = page.locator('.doujutsu .doujutsu_centro .doujutsu_info .linha_css2.center.rotulo')
+    async def _heal_if_needed(self, page) -> bool:
+        """Na página de status, usa o item de cura se o HP estiver abaixo de 50%"""
+        hp = (await read_page_state(page)).hp
+        if hp is None:
+            logging.error("HP não encontrado na página de status.")
+            return False
+        current_hp, max_hp = hp
+        self.state_cache.record_hp(current_hp, max_hp)
+        if current_hp < max_hp / 2:
+            logging.info("HP baixo, curando...")
+            use_link = page.locator('a').filter(has_text="Usar").nth(0)
+            if use_link:
+                # O item já usado ou um clique por AJAX não navegam: espera pouco e segue
+                await self.waits.navigation(page, "heal.use", use_link.click, legacy=2.0, timeout=3000,
+                                            required=False)
+            else:
+                logging.error("Link 'Usar' não encontrado.")
+                return False
+            # O HP após a cura só é conhecido na próxima leitura
+            self.state_cache.invalidate_hp()
+        else:
+            logging.info("HP atual: %d/%d, não é necessário curar.", current_hp, max_hp)
+        return True
+
+    async def _check_doujutsu(self, page) -> int:
+        """Verifica se o Doujutsu está ativo e retorna o tempo restante.
 
-            if not doujutsu_name_element.is_visible(timeout=2000):
+        Quando o Rinnegan está ativo, agenda uma nova verificação para o momento
+        em que ele expirar, para reativá-lo sem esperar o próximo ciclo.
+        """
+        try:
+            # O timer lido antes ainda vale: o doujutsu só muda quando ele acaba
+            cached = self.state_cache.doujutsu_remaining()
+            self._cache_result("doujutsu", cached is not None)
+            if cached is not None:
+                logging.info(f"Doujutsu em cache, tempo restante: {cached} segundos.")
+                return cached
+
+            state = await self._fetch_state("status")
+            if state is None or state.hp is None:
+                # Caminho rápido indisponível: lê pelo navegador
+                state = await self._read_doujutsu_from_page(page)
+                if state.hp is not None:
+                    self.state_cache.record_hp(*state.hp)
+
+            if not state.doujutsu_name:
                 logging.info("Doujutsu não está ativo ou nome não encontrado.")
+                self.state_cache.record_doujutsu(0)
                 return 0
 
-            doujutsu_name = doujutsu_name_element.inner_text().strip()
-
             # Se o nome do doujutsu não contiver "Rinnegan", retorna 0 para usar a penalidade padrão
-            if "Rinnegan" not in doujutsu_name:
-                logging.info(f"Doujutsu ativo ({doujutsu_name}), mas não é Rinnegan. Usando penalidade padrão.")
+            if "Rinnegan" not in state.doujutsu_name:
+                logging.info(f"Doujutsu ativo ({state.doujutsu_name}), mas não é Rinnegan. Usando penalidade padrão.")
+                self.state_cache.record_doujutsu(0)
                 return 0
 
-            if doujutsu_element.is_visible(timeout=2000):
-                timer_text = doujutsu_element.inner_text()
-                match = re.search(r"(\d{2}):(\d{2}):(\d{2})", timer_text)
-                if match:
-                    hours, minutes, seconds = map(int, match.groups())
-                    total_seconds = hours * 3600 + minutes * 60 + seconds
-                    logging.info(f"Doujutsu ativo, tempo restante: {hours:02d}:{minutes:02d}:{seconds:02d}")
-                    return total_seconds
-                else:
-                    logging.warning("Tempo restante do Doujutsu não encontrado. Ativando-o!")
-                    page.locator('#form_doujutsu input[value="Ativar"]').click()
-                    page.locator('#conteudo_box_alerta a[href="javascript:envia_form(\'form_doujutsu\');"]').click()
-                    return 0
-            else:
+            if state.doujutsu_timer_text is None:
                 logging.info("Doujutsu não está ativo.")
+                self.state_cache.record_doujutsu(0)
                 return 0
+
+            total_seconds = state.doujutsu_remaining
+            if total_seconds is not None:
+                hours, rest = divmod(total_seconds, 3600)
+                minutes, seconds = divmod(rest, 60)
+                logging.info(f"Doujutsu ativo, tempo restante: {hours:02d}:{minutes:02d}:{seconds:02d}")
+                self.scheduler.schedule(self.username, DOUJUTSU, total_seconds + 1)
+                self.state_cache.record_doujutsu(total_seconds)
+                return total_seconds
+
+            logging.warning("Tempo restante do Doujutsu não encontrado. Ativando-o!")
+            # O novo timer só aparece na próxima leitura
+            self.state_cache.invalidate_doujutsu()
+            # A ativação precisa do navegador na página de status
+            if not page.url.endswith("status"):
+                await page.goto(f"{self.base_url}?p=status")
+            await page.locator('#form_doujutsu input[value="Ativar"]').click()
+            await self.waits.navigation(
+                page, "doujutsu.activate",
+                page.locator('#conteudo_box_alerta a[href="javascript:envia_form(\'form_doujutsu\');"]').click)
+            return 0
+        except SessionLost:
+            raise
         except Exception as e:
             logging.exception("Erro ao verificar o Doujutsu:")
             return 0
 
-    def _execute_hunt_cycle(self, page) -> bool:
-        """Executa um ciclo completo de caçada"""
-        page.wait_for_load_state()
+    async def _read_doujutsu_from_page(self, page) -> GameState:
+        """Lê o nome e o timer do doujutsu pela página de status no navegador"""
+        # Caso já esteja na página de status, não é necessário navegar para ela
+        if not page.url.endswith("status"):
+            await page.goto(f"{self.base_url}?p=status")
+        return await read_page_state(page)
+
+    async def _execute_hunt_cycle(self, page) -> bool:
+        """Executa um ciclo completo de caçada e agenda o fim da penalidade"""
         # Verifica se o doujutsu está ativo para reduzir a penalidade
-        doujutsu_active_time = self._check_doujutsu(page)
+        with self._phase("hunt.doujutsu"):
+            doujutsu_active_time = await self._check_doujutsu(page)
         if doujutsu_active_time > 0:
             penalty_time = 120  # 2 minutos
         else:
             penalty_time = 300  # 5 minutos
         logging.info("Iniciando caçada...")
 
-        page.goto("https://www.narutoplayers.com.br/?p=cacadas&action=nivel")
-        self.wait_for_hunt_timer(page)
+        with self._phase("hunt.goto"):
+            await page.goto(f"{self.base_url}?p=cacadas&action=nivel")
+            deferred = await self.defer_for_hunt_timer(page)
+        if deferred:
+            return False
         logging.info("Selecionando inimigo aleatório...")
-        page.wait_for_timeout(random.uniform(1000, 2000))
-        page.select_option('select[name="nivel_inimigo"]', "2")
+        await self.waits.pause("hunt.select")
+        await page.select_option('select[name="nivel_inimigo"]', "2")
         logging.info("Gennin selecionado!")
 
-        identified_character = self.captcha_processor.identify_character(page)
+        identified_character = await self.captcha_processor.identify_character(page)
 
         if not identified_character:
+            # O próximo ciclo abre a página de novo, com outro captcha
             logging.warning("Falha na identificação do personagem")
-            page.reload()
+            self.scheduler.schedule(self.username, HUNT, self._backoff(CAPTCHA))
             return False
 
         radio_button_id = self.character_to_id.get(identified_character)
         if not radio_button_id:
             logging.error(f"ID não encontrado para o personagem: {identified_character}")
+            self.scheduler.schedule(self.username, HUNT, self._backoff(CAPTCHA))
             return False
 
         try:
-            page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
-            page.locator(f"#{radio_button_id}").check()
-            page.locator('input[value="Caçar"]').click()
-            page.wait_for_timeout(random.uniform(1000, 2000))
-            try:
-                page.wait_for_selector('input[value="Atacar"]', timeout=30000)
-                page.locator('input[value="Atacar"]').click()
-            except Exception as e:
-                logging.error(f"Falha ao clicar no botão 'Atacar': {e}")
-                return False
-            enemy_name = page.locator('#box_dir .char_dentro_h .linha_css2 .col_css2').inner_text()
-            logging.info(f"Caçando {enemy_name}...")
-            first_element = page.locator("#corpo_col_dir .linha_css_memo.center").nth(0)
-            if first_element:
-                battle_result = first_element.inner_text()
-                logging.info(battle_result)
-            else:
-                logging.info("Resultado da batalha não encontrado")
-
-            # Marca o início da penalidade
-            penalty_start = time.time()
-
-            invasion_successful = self._process_invasion(page)
-
-            # Se a invasão não foi bem-sucedida, vá para a página de status
-            if not invasion_successful:
-                logging.info("Invasão não disponível, indo para a página de status.")
-                page.locator('.menu_lateral li a[href="?p=status"]').click()
-                # Espere a pagina carregar
-                page.wait_for_load_state()
-                # Cheque o hp do personagem
-                hp_text = page.locator('#hp_baixo .hp_xp').inner_text()
-                # Se estiver abaixo de 50%, vamos curar.
-                current_hp = int(hp_text.split("/")[0].strip())
-                max_hp = int(hp_text.split("/")[1].strip())
-                if current_hp < max_hp / 2:
-                    logging.info("HP baixo, curando...")
-                    use_link = page.locator('a').filter(has_text="Usar").nth(0)
-                    if use_link:
-                        use_link.click()
-                    else:
-                        logging.error("Link 'Usar' não encontrado.")
-                        return False
-                    page.wait_for_timeout(2000)
-                else:
-                    logging.info("HP atual: %d/%d, não é necessário curar.", current_hp, max_hp)
-
-            # Calcula quanto tempo já se passou durante o processamento da invasão
-            elapsed_time = time.time() - penalty_start
-            remaining_penalty = max(penalty_time - elapsed_time, 0)
+            with self._phase("hunt.battle"):
+                await page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
+                await page.locator(f"#{radio_button_id}").check()
+                await self.waits.navigation(page, "hunt.submit", page.locator('input[value="Caçar"]').click,
+                                            legacy=1.5)
+                try:
+                    # Captcha recusado: a página já diz, sem esperar pelo botão
+                    if "aviso=5" in page.url:
+                        raise RuntimeError("captcha recusado (&aviso=5)")
+                    await page.wait_for_selector('input[value="Atacar"]', timeout=30000)
+                    # O botão só aparece quando o site aceitou a resposta do captcha
+                    self.captcha_processor.record_result(True, "hunt")
+                    self.rate.succeeded(self.username, CAPTCHA, GAME)
+                    await self.waits.navigation(page, "hunt.attack", page.locator('input[value="Atacar"]').click)
+                except Exception as e:
+                    logging.error(f"Falha ao clicar no botão 'Atacar': {e}")
+                    error_class = self._record_captcha_outcome(page, "hunt") or classify_error(e)
+                    self.scheduler.schedule(self.username, HUNT, self._backoff(error_class))
+                    return False
 
-            if remaining_penalty > 0:
-                logging.info(f"Aguardando {remaining_penalty:.1f} segundos restantes de penalidade...")
-                time.sleep(remaining_penalty)
+                # Marca o início da penalidade: a próxima caçada fica agendada para o fim dela,
+                # e qualquer invasão que abrir nesse intervalo é atendida primeiro
+                penalty_start = self.scheduler.now()
+                self.scheduler.schedule_at(self.username, HUNT, penalty_start + penalty_time + random.uniform(2, 5))
+
+                try:
+                    await self.waits.until("hunt.result", page.wait_for_selector(
+                        "#corpo_col_dir .linha_css_memo", state="attached", timeout=5000), legacy=None)
+                except Exception:
+                    pass  # registrado abaixo como resultado não encontrado
+                battle = await read_page_state(page)
+                logging.info(f"Caçando {battle.enemy_name}...")
+                if battle.battle_text:
+                    logging.info(battle.battle_text)
+                else:
+                    logging.info("Resultado da batalha não encontrado")
+                if self.events is not None:
+                    self.events.battle(self.username, self.mode, battle.enemy_name, battle.battle_text)
+
+            # Cheque o hp do personagem: a estimativa em cache dispensa a leitura enquanto
+            # houver folga para mais uma batalha; só abre a página de status se precisar curar
+            self.state_cache.record_battle()
+            with self._phase("hunt.heal"):
+                safe = self.state_cache.hp_is_safe()
+                self._cache_result("hp", safe)
+                state = None if safe else await self._fetch_state("status")
+                hp = state.hp if state else None
+                if safe:
+                    logging.info("HP estimado: %d/%d, não é necessário curar.", *self.state_cache.hp_estimate())
+                elif hp and hp[0] >= hp[1] / 2:
+                    logging.info("HP atual: %d/%d, não é necessário curar.", *hp)
+                else:
+                    # Espere a pagina carregar
+                    await self.waits.navigation(page, "hunt.status",
+                                                page.locator('.menu_lateral li a[href="?p=status"]').click)
+                    # Se estiver abaixo de 50%, vamos curar.
+                    if not await self._heal_if_needed(page):
+                        return False
 
+            logging.info(f"Próxima caçada em {self.scheduler.deadline(self.username, HUNT) - self.scheduler.now():.1f} segundos.")
             return True
 
+        except SessionLost:
+            raise
         except Exception as e:
             logging.exception("Erro durante a execução da caçada:")
+            self.scheduler.schedule(self.username, HUNT, self._backoff(classify_error(e)))
             return False
 
-    def _execute_timed_hunt_cycle(self, page) -> bool:
-        """Executa um caça por tempo"""
-        page.wait_for_timeout(random.uniform(1000, 2000))
-        page.goto("https://www.narutoplayers.com.br/?p=cacadas&action=tempo")
-        page.wait_for_load_state()
-        logging.info("Iniciando caçada...")
-
-        self.wait_for_hunt_timer(page)
+    async def _execute_timed_hunt_cycle(self, page) -> bool:
+        """Executa um caça por tempo; a recompensa é recebida no ciclo seguinte"""
+        await self.waits.pause("timed.start")
+        with self._phase("timed.goto"):
+            await page.goto(f"{self.base_url}?p=cacadas&action=tempo")
+            logging.info("Iniciando caçada...")
+            deferred = await self.defer_for_hunt_timer(page)
+        if deferred:
+            return False
 
         # Verifica se existe recompença para receber
-        if page.locator('#form_cacadas #receber_m img').is_visible():
-            page.locator('#form_cacadas #receber_m img').click()
-            page.wait_for_load_state()
-            logging.info("Recebendo recompensa...")
-            # Loga a recompença recebida
-            reward_text = page.locator('#relogio_cacadas .cacada_recompensa').inner_text()
-            logging.info(reward_text)
-            page.goto("https://www.narutoplayers.com.br/?p=cacadas&action=tempo")
-            page.wait_for_load_state()
+        if (await read_page_state(page)).reward_available:
+            with self._phase("timed.reward"):
+                await self.waits.navigation(page, "timed.reward", page.locator('#form_cacadas #receber_m img').click)
+                logging.info("Recebendo recompensa...")
+                # Loga a recompença recebida
+                reward_text = (await read_page_state(page)).reward_text
+                logging.info(reward_text)
+                if self.events is not None:
+                    self.events.reward(self.username, self.mode, reward_text)
+                await page.goto(f"{self.base_url}?p=cacadas&action=tempo")
 
         logging.info("Selecionando tempo de caça de 5 minutos...")
 
-        identified_character = self.captcha_processor.identify_character(page)
+        identified_character = await self.captcha_processor.identify_character(page)
 
         if not identified_character:
+            # O próximo ciclo abre a página de novo, com outro captcha
             logging.warning("Falha na identificação do personagem")
-            page.reload()
+            self.scheduler.schedule(self.username, HUNT, self._backoff(CAPTCHA))
             return False
 
         radio_button_id = self.character_to_id.get(identified_character)
         if not radio_button_id:
             logging.error(f"ID não encontrado para o personagem: {identified_character}")
+            self.scheduler.schedule(self.username, HUNT, self._backoff(CAPTCHA))
             return False
 
         try:
-            page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
-            page.locator(f"#{radio_button_id}").check()
-            page.locator('input[value="Caçar"]').click()
-            page.wait_for_timeout(random.uniform(1000, 2000))
-
-            # Marca o início da penalidade
-            penalty_start = time.time()
-
-            self._process_invasion(page)
-
-            # Calcula quanto tempo já se passou durante o processamento da invasão
-            elapsed_time = time.time() - penalty_start
-            remaining_penalty = max(300 - elapsed_time, 0)  # 300 segundos (5 minutos) menos o tempo gasto
-
-            if remaining_penalty > 0:
-                logging.info(f"Aguardando {remaining_penalty:.1f} segundos restantes de penalidade...")
-                time.sleep(remaining_penalty)
-
-            page.wait_for_selector('.menu_lateral li a[href="?p=cacadas"]', state='visible', timeout=30000)
-            page.locator('.menu_lateral li a[href="?p=cacadas"]').click()
-            page.wait_for_load_state()
-
-            try:
-                page.locator('#form_cacadas #receber_m img').click()
-                page.wait_for_load_state()
-                logging.info("Recebendo recompensa...")
-                # Loga a recompença recebida
-                reward_text = page.locator('#relogio_cacadas .cacada_recompensa').inner_text()
-                logging.info(reward_text)
-                page.wait_for_timeout(random.uniform(1000, 2000))
-            except Exception as e:
-                logging.error(f"Falha ao clicar no botão 'Receber': {e}")
+            with self._phase("timed.start"):
+                await page.wait_for_selector(f"#{radio_button_id}", state="visible", timeout=60000)
+                await page.locator(f"#{radio_button_id}").check()
+                # O &aviso=5 só pode ser lido depois da navegação do envio
+                await self.waits.navigation(page, "timed.submit", page.locator('input[value="Caçar"]').click,
+                                            legacy=1.5)
+
+            if "aviso=5" in page.url:
+                # Captcha recusado: a caçada não começou, tenta de novo em instantes
+                logging.warning("Captcha da caçada por tempo recusado pelo site.")
+                self.captcha_processor.record_result(False, "timed")
+                self.scheduler.schedule(self.username, HUNT, self._backoff(CAPTCHA))
                 return False
+            self.captcha_processor.record_result(True, "timed")
+            self.rate.succeeded(self.username, CAPTCHA, GAME)
 
+            # A caçada dura 300 segundos (5 minutos); ao fim dela o próximo ciclo recebe a recompensa
+            self.scheduler.schedule(self.username, HUNT, 300 + random.uniform(2, 5))
+            logging.info("Caçada por tempo iniciada, recompensa agendada para daqui 5 minutos.")
             return True
 
+        except SessionLost:
+            raise
         except Exception as e:
             logging.exception("Erro durante a execução da caçada:")
+            self.scheduler.schedule(self.username, HUNT, self._backoff(classify_error(e)))
             return False
 
-    def _execute_invasion(self, page) -> bool:
-        """Executa invasões continuamente com um delay de 5 minutos entre cada uma."""
-        while True:
-            try:
-                success = self._process_invasion(page)
+    async def _execute_invasion(self, page) -> bool:
+        """Executa uma tentativa de invasão; a próxima fica agendada pelo timer da página."""
+        try:
+            success = await self._process_invasion(page)
 
-                if success:
-                    logging.info("Invasão processada com sucesso.")
-                else:
-                    logging.warning("Falha ao processar a invasão.")
+            if success:
+                logging.info("Invasão processada com sucesso.")
+            else:
+                logging.warning("Falha ao processar a invasão.")
+            return success
 
-            except Exception as e:
-                logging.exception("Erro durante a execução da invasão:")
-                time.sleep(15)
\ No newline at end of file
+        except SessionLost:
+            raise
+        except Exception as e:
+            logging.exception("Erro durante a execução da invasão:")
+            self.scheduler.schedule(self.username, INVASION, self._backoff(classify_error(e)))
+            return False
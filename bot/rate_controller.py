@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from .metrics import MetricsRegistry, REGISTRY
+from .rate_limit import TokenBucket
+
+# Classes de erro, cada uma com a sua política de espera
+NETWORK = "network"    # conexão recusada, DNS, HTTP 5xx: o site pode estar degradado
+TIMEOUT = "timeout"    # navegação, requisição HTTP ou atividade que não respondeu a tempo
+ELEMENT = "element"    # elemento que não apareceu na página (seletor ou clique): o site respondeu
+CAPTCHA = "captcha"    # captcha não identificado ou recusado
+GAME = "game"          # recusa do jogo (&aviso=5) que não é do captcha, como falta de HP
+SESSION = "session"    # sessão perdida: o site voltou para o login
+UNKNOWN = "unknown"
+
+# Só estas contam para o circuit breaker: as outras não dizem nada sobre a saúde do site
+HOST_FAILURES = (NETWORK, TIMEOUT)
+
+# Tipos de requisição que gastam o orçamento do host (imagens e CSS não)
+BUDGETED_TYPES = ("document", "xhr", "fetch")
+
+# Timeouts do Playwright de navegação ou de requisição; os demais esperavam um seletor ou elemento
+_NAVIGATION_TIMEOUT = re.compile(r"navigat|goto|reload|load_state|waiting until|APIRequestContext|"
+                                 r"Request timed out|\u2192 (?:GET|POST)", re.IGNORECASE)
+
+class SessionLost(Exception):
+    """O site respondeu com a página de login no lugar de uma página do jogo"""
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """Espera exponencial com jitter: base * factor^(falhas - 1), limitada a `cap`, ±`jitter`"""
+    base: float
+    cap: float
+    factor: float = 2.0
+    jitter: float = 0.5
+
+    def delay(self, failures: int) -> float:
+        raw = min(self.base * self.factor ** max(failures - 1, 0), self.cap)
+        return raw * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+DEFAULT_POLICIES: Dict[str, BackoffPolicy] = {
+    NETWORK: BackoffPolicy(base=2.0, cap=120.0),
+    TIMEOUT: BackoffPolicy(base=10.0, cap=300.0),
+    CAPTCHA: BackoffPolicy(base=1.0, cap=15.0),   # o próximo captcha é outro: vale tentar logo
+    GAME: BackoffPolicy(base=5.0, cap=60.0),
+    ELEMENT: BackoffPolicy(base=5.0, cap=120.0),
+    SESSION: BackoffPolicy(base=1.0, cap=30.0),   # o contexto é recriado e o login refeito
+    UNKNOWN: BackoffPolicy(base=5.0, cap=120.0),
+}
+
+def classify_error(error: BaseException) -> str:
+    """Classe do erro de uma atividade"""
+    if isinstance(error, SessionLost):
+        return SESSION
+    if isinstance(error, PlaywrightTimeoutError):
+        # Um elemento ausente (mudança de layout, invasão sem relógio) não diz nada sobre a saúde do site
+        return TIMEOUT if _NAVIGATION_TIMEOUT.search(str(error)) else ELEMENT
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(error, (ConnectionError, OSError)):
+        return NETWORK
+    if isinstance(error, PlaywrightError):
+        message = str(error)
+        if "net::ERR_" in message or "NS_ERROR_" in message or "ECONNRESET" in message:
+            return NETWORK
+        if "Target page, context or browser has been closed" in message:
+            return SESSION
+    if "HTTP 5" in str(error):
+        return NETWORK
+    return UNKNOWN
+
+class CircuitBreaker:
+    """Circuit breaker de um host: aberto após `threshold` falhas em `window` segundos.
+
+    Aberto, ninguém acessa o host até o fim do período; depois uma única
+    requisição de sonda é liberada (meio aberto). Se ela falhar, o circuito
+    reabre com o período dobrado (até `max_open_seconds`); se der certo, fecha.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 5, window: float = 60.0, open_seconds: float = 30.0,
+                 max_open_seconds: float = 600.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.trips = 0
+        self._failures: Deque[float] = deque()
+        self._open_until = 0.0
+        self._probe_started = 0.0
+
+    def _period(self) -> float:
+        return min(self.open_seconds * 2 ** max(self.trips - 1, 0), self.max_open_seconds)
+
+    def remaining(self) -> float:
+        """Segundos até o fim do período aberto, sem liberar a sonda"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self._open_until - self._clock(), 0.0)
+
+    def retry_after(self) -> float:
+        """Segundos até poder acessar o host; 0 libera (no meio aberto, só para a sonda)"""
+        now = self._clock()
+        if self.state == self.CLOSED:
+            return 0.0
+        if self.state == self.OPEN:
+            if now < self._open_until:
+                return self._open_until - now
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            return 0.0
+        # Meio aberto: os demais aguardam o resultado da sonda (ou uma nova, se ela sumir)
+        waited = now - self._probe_started
+        if waited >= self.open_seconds:
+            self._probe_started = now
+            return 0.0
+        return self.open_seconds - waited
+
+    def record_success(self) -> bool:
+        """Registra um acesso bem-sucedido; True se isso fechou o circuito"""
+        self._failures.clear()
+        if self.state == self.CLOSED:
+            return False
+        self.state = self.CLOSED
+        self.trips = 0
+        return True
+
+    def record_failure(self) -> bool:
+        """Registra uma falha do host; True se isso abriu o circuito"""
+        now = self._clock()
+        if self.state == self.OPEN:
+            return False
+        if self.state == self.CLOSED:
+            self._failures.append(now)
+            while self._failures and self._failures[0] < now - self.window:
+                self._failures.popleft()
+            if len(self._failures) < self.threshold:
+                return False
+        self.trips += 1
+        self.state = self.OPEN
+        self._open_until = now + self._period()
+        self._failures.clear()
+        return True
+
+class HostRateController:
+    """Orçamento de requisições, circuit breaker e backoff, compartilhados pelas contas do processo.
+
+    Cada host tem um token bucket (`rate` requisições por segundo, rajada de
+    `burst`) gasto pelas navegações e leituras de estado de todas as contas,
+    e um circuit breaker alimentado pelas respostas 5xx e pelos erros de
+    rede. As esperas após um erro seguem a política da classe do erro,
+    crescendo com as falhas seguidas da conta naquela classe.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 20,
+                 policies: Optional[Dict[str, BackoffPolicy]] = None,
+                 failure_threshold: int = 5, failure_window: float = 60.0,
+                 open_seconds: float = 30.0, max_open_seconds: float = 600.0,
+                 clock=time.monotonic, metrics: Optional[MetricsRegistry] = None):
+        self.rate = rate
+        self.burst = burst
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self._breaker_options = dict(threshold=failure_threshold, window=failure_window,
+                                     open_seconds=open_seconds, max_open_seconds=max_open_seconds)
+        self._clock = clock
+        self.metrics = metrics or REGISTRY
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(clock=self._clock, **self._breaker_options)
+        return breaker
+
+    async def acquire(self, host: str) -> None:
+        """Gasta uma requisição do orçamento do host, esperando se ele acabou"""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst, clock=self._clock)
+        start = self._clock()
+        await bucket.acquire()
+        waited = self._clock() - start
+        if waited > 0:
+            self.metrics.inc("host_throttle_seconds_total", waited, host=host)
+
+    def retry_after(self, host: str) -> float:
+        """Segundos até o host poder ser acessado de novo (0 com o circuito fechado)"""
+        return self.breaker(host).retry_after()
+
+    def record_response(self, host: str, status: int) -> None:
+        """Resposta de uma navegação ou leitura de estado: 5xx é falha do host, o resto é sucesso"""
+        if status >= 500:
+            self.host_failed(host)
+        else:
+            self.host_succeeded(host)
+
+    def host_succeeded(self, host: str) -> None:
+        if self.breaker(host).record_success():
+            logging.info(f"Circuito de {host} fechado: o site voltou a responder.")
+            self.metrics.set_gauge("circuit_open", 0, host=host)
+
+    def host_failed(self, host: str) -> None:
+        breaker = self.breaker(host)
+        if breaker.record_failure():
+            logging.warning(f"Circuito de {host} aberto por {breaker.remaining():.0f}s: "
+                            f"site degradado (abertura {breaker.trips}).")
+            self.metrics.inc("circuit_trips_total", host=host)
+            self.metrics.set_gauge("circuit_open", 1, host=host)
+
+    def backoff(self, account: str, error_class: str, host: Optional[str] = None) -> float:
+        """Registra uma falha da conta e devolve quanto esperar antes de tentar de novo"""
+        key = (account, error_class)
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        self.metrics.inc("errors_total", error_class=error_class, account=account)
+        if host is not None and error_class in HOST_FAILURES:
+            self.host_failed(host)
+        delay = self.policies.get(error_class, self.policies[UNKNOWN]).delay(failures)
+        if host is not None:
+            # Com o site fora do ar, ninguém volta antes do circuito permitir
+            delay = max(delay, self.breaker(host).remaining())
+        self.metrics.observe("backoff_seconds", delay, error_class=error_class)
+        return delay
+
+    def succeeded(self, account: str, *error_classes: str) -> None:
+        """Zera as falhas seguidas da conta nas classes informadas (todas, se nenhuma)"""
+        for error_class in error_classes or tuple(self.policies):
+            self._failures.pop((account, error_class), None)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+class TokenBucket:
+    """Limite de taxa assíncrono: `rate` fichas por segundo, acumulando até `capacity`.
+
+    Quem chega primeiro é atendido primeiro (a espera acontece com o lock
+    tomado), então uma rajada de pedidos sai espaçada na taxa configurada em
+    vez de disputar as fichas. `clock` e `sleep` podem ser trocados por um
+    relógio falso nos benchmarks.
+    """
+
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate deve ser > 0 e capacity >= 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Consome `tokens` fichas; False (sem consumir) se não der para esperar até `timeout`"""
+        deadline = None if timeout is None else self._clock() + timeout
+        async with self._lock:
+            self._refill()
+            wait = max(tokens - self._tokens, 0) / self.rate
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            if wait > 0:
+                await self._sleep(wait)
+                self._refill()
+            self._tokens -= tokens
+            return True
@@ -0,0 +1,300 @@
+import logging
+import os
+import struct
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Ordem fixa das colunas de hash no banco de referências
+HASH_TYPES = ('phash', 'ahash', 'dhash')
+
+# Versão do cálculo dos hashes. A 2 (captcha_preprocessing: recorte e redimensionamento
+# canônico 64x64) gera valores diferentes dos da 1 (imagehash direto na imagem), então
+# referências gravadas por uma versão não podem ser comparadas com captchas da outra
+HASH_VERSION = 2
+# Primeira linha dos arquivos `<personagem>_hashes.txt`; sem ela o arquivo é da versão 1
+HASH_FILE_HEADER = "# hash-version: {}"
+
+# Arquivo binário do banco: cabeçalho, tabela de personagens e as linhas (N, 3) uint64
+DEFAULT_BANK_FILE = "reference_bank.bin"
+BANK_MAGIC = b"NPRB"
+BANK_VERSION = 2  # 2: cabeçalho com a versão dos hashes
+_HEADER = struct.Struct("<4sHHHII")      # magic, versão, versão dos hashes, colunas, personagens, linhas
+_CHAR_ENTRY = struct.Struct("<32sII")    # nome (UTF-8), primeira linha, quantidade
+
+if hasattr(np, "bitwise_count"):
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Quantidade de bits 1 de cada inteiro (a distância de Hamming, aplicada a um XOR)"""
+        return np.bitwise_count(values)
+else:
+    # numpy < 2.0: conta os bits byte a byte com uma tabela de consulta
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Quantidade de bits 1 de cada inteiro (a distância de Hamming, aplicada a um XOR)"""
+        as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+        return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+@dataclass
+class MatchResult:
+    """Resultado da comparação de um captcha contra o banco de referências"""
+    character: str
+    distance: int
+    runner_up: Optional[str]
+    runner_up_distance: Optional[int]
+    accepted: bool
+
+    @property
+    def margin(self) -> Optional[int]:
+        """Diferença de distância entre o segundo colocado e o vencedor"""
+        if self.runner_up_distance is None:
+            return None
+        return self.runner_up_distance - self.distance
+
+def hash_to_uint64(image_hash) -> int:
+    """Converte um hash de 64 bits (inteiro, ImageHash ou string hex) em inteiro"""
+    if isinstance(image_hash, (int, np.integer)):
+        return int(image_hash)
+    return int(str(image_hash), 16)
+
+def hashes_to_row(hashes: Dict) -> List[int]:
+    """Converte um dicionário {tipo: hash} na linha de inteiros do banco"""
+    return [hash_to_uint64(hashes[hash_type]) for hash_type in HASH_TYPES]
+
+def read_hash_file(path: str) -> List[List[int]]:
+    """Referências de um arquivo `<personagem>_hashes.txt` (cada grupo de três linhas é uma).
+
+    Levanta ValueError se o arquivo não for da versão atual dos hashes.
+    """
+    with open(path, "r") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    version = 1
+    if lines and lines[0].startswith("#"):
+        try:
+            version = int(lines.pop(0).split(":", 1)[1])
+        except (IndexError, ValueError):
+            raise ValueError(f"Cabeçalho inválido em {path}")
+    if version != HASH_VERSION:
+        raise ValueError(f"{path} tem hashes da versão {version}, incompatíveis com a versão {HASH_VERSION}")
+    return [[int(value, 16) for value in lines[i:i + len(HASH_TYPES)]]
+            for i in range(0, len(lines) - len(HASH_TYPES) + 1, len(HASH_TYPES))]
+
+def write_hash_file(path: str, rows: Iterable[Sequence[int]]) -> None:
+    """Grava referências no formato de `read_hash_file`, com o cabeçalho da versão dos hashes"""
+    with open(path, "w") as f:
+        f.write(HASH_FILE_HEADER.format(HASH_VERSION) + "\n")
+        for row in rows:
+            for value in row:
+                f.write(f"{int(value):016x}\n")
+
+class ReferenceBank:
+    """Banco de hashes de referência empacotados em arrays uint64.
+
+    Cada personagem pode ter várias referências (variações de luz, recorte e
+    escala). As distâncias de Hamming contra todas elas são calculadas de uma
+    vez com XOR + popcount vetorizados, inclusive para lotes de captchas.
+    """
+
+    def __init__(self, threshold: int = 30):
+        self.threshold = threshold
+        self._pending: Dict[str, List[List[int]]] = {}
+        self._characters: List[str] = []
+        self._hashes = np.zeros((0, len(HASH_TYPES)), dtype=np.uint64)
+        self._group_starts = np.zeros(0, dtype=np.intp)
+        # Segmento de memória compartilhada que guarda as linhas (bancos abertos com `attach`)
+        self._shared: Optional[shared_memory.SharedMemory] = None
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self._hashes)
+
+    @property
+    def characters(self) -> List[str]:
+        """Personagens presentes no banco"""
+        self._compact()
+        return list(self._characters)
+
+    def add(self, char: str, hashes: Dict) -> None:
+        """Adiciona uma referência ({'phash', 'ahash', 'dhash'}) para o personagem"""
+        self._pending.setdefault(char, []).append(hashes_to_row(hashes))
+
+    def add_rows(self, char: str, rows: Iterable[Sequence[int]]) -> None:
+        """Adiciona referências já convertidas em inteiros"""
+        self._pending.setdefault(char, []).extend(list(row) for row in rows)
+
+    def extended(self, extra: Dict[str, np.ndarray]) -> "ReferenceBank":
+        """Novo banco com as referências deste mais as linhas extras de cada personagem"""
+        self._compact()
+        bank = ReferenceBank(threshold=self.threshold)
+        bank._characters = list(self._characters)
+        bank._hashes = self._hashes
+        bank._group_starts = self._group_starts.copy()
+        bank._shared = self._shared
+        for char, rows in extra.items():
+            bank.add_rows(char, rows.tolist())
+        return bank
+
+    def counts(self) -> Dict[str, int]:
+        """Quantidade de referências por personagem"""
+        self._compact()
+        sizes = np.diff(np.append(self._group_starts, len(self._hashes)))
+        return dict(zip(self._characters, sizes.tolist()))
+
+    def _compact(self) -> None:
+        """Incorpora as referências pendentes, mantendo as linhas agrupadas por personagem"""
+        if not self._pending:
+            return
+
+        groups: Dict[str, List[np.ndarray]] = {}
+        for i, char in enumerate(self._characters):
+            end = self._group_starts[i + 1] if i + 1 < len(self._characters) else len(self._hashes)
+            groups[char] = [self._hashes[self._group_starts[i]:end]]
+        for char, rows in self._pending.items():
+            groups.setdefault(char, []).append(np.array(rows, dtype=np.uint64).reshape(-1, len(HASH_TYPES)))
+        self._pending = {}
+
+        # Personagem sem nenhuma linha (arquivo de hashes só com o cabeçalho) fica de fora:
+        # um grupo vazio repetiria o início do seguinte e quebraria o reduceat
+        blocks = {char: np.concatenate(parts) for char, parts in groups.items()}
+        blocks = {char: block for char, block in blocks.items() if len(block)}
+        self._characters = list(blocks)
+        self._hashes = (np.concatenate(list(blocks.values())) if blocks
+                        else np.zeros((0, len(HASH_TYPES)), dtype=np.uint64))
+        sizes = [len(block) for block in blocks.values()]
+        self._group_starts = np.cumsum([0] + sizes[:-1] if sizes else []).astype(np.intp)
+
+    def save(self, path: str) -> None:
+        """Grava o banco no formato binário versionado (escrita atômica)"""
+        self._compact()
+        sizes = np.diff(np.append(self._group_starts, len(self._hashes)))
+        for char in self._characters:
+            if len(char.encode("utf-8")) > _CHAR_ENTRY.size - 8:
+                raise ValueError(f"Nome de personagem longo demais para o banco: {char}")
+        table = b"".join(
+            _CHAR_ENTRY.pack(char.encode("utf-8"), int(start), int(size))
+            for char, start, size in zip(self._characters, self._group_starts, sizes)
+        )
+        header = _HEADER.pack(BANK_MAGIC, BANK_VERSION, HASH_VERSION, len(HASH_TYPES),
+                              len(self._characters), len(self._hashes))
+        # As linhas começam alinhadas em 8 bytes para o memmap
+        padding = b"\0" * (-(len(header) + len(table)) % 8)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(header + table + padding)
+            f.write(np.ascontiguousarray(self._hashes, dtype="<u8").tobytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, threshold: int = 30, mmap: bool = True) -> "ReferenceBank":
+        """Abre um banco binário; com `mmap` as linhas são mapeadas do arquivo, sem cópia"""
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < 6 or header[:4] != BANK_MAGIC:
+                raise ValueError(f"Arquivo não é um banco de referências: {path}")
+            # A versão vem logo depois do magic em todos os formatos
+            version = struct.unpack_from("<H", header, 4)[0]
+            if version != BANK_VERSION:
+                raise ValueError(f"Banco de referências no formato {version} (hashes de uma versão anterior), "
+                                 f"reconstrua com `python -m bot.reference_bank_builder`: {path}")
+            if len(header) < _HEADER.size:
+                raise ValueError(f"Banco de referências truncado: {path}")
+            _, _, hash_version, columns, char_count, row_count = _HEADER.unpack(header)
+            if hash_version != HASH_VERSION or columns != len(HASH_TYPES):
+                raise ValueError(f"Banco com hashes da versão {hash_version} ({columns} colunas), incompatível "
+                                 f"com a versão {HASH_VERSION}; reconstrua com "
+                                 f"`python -m bot.reference_bank_builder`: {path}")
+            entries = [_CHAR_ENTRY.unpack(f.read(_CHAR_ENTRY.size)) for _ in range(char_count)]
+
+        offset = _HEADER.size + _CHAR_ENTRY.size * char_count
+        offset += -offset % 8
+        shape = (row_count, len(HASH_TYPES))
+        if mmap and row_count:
+            hashes = np.memmap(path, dtype="<u8", mode="r", offset=offset, shape=shape)
+        else:
+            hashes = np.fromfile(path, dtype="<u8", offset=offset, count=row_count * len(HASH_TYPES)).reshape(shape)
+
+        # Bancos gravados antes podiam ter personagens sem linhas; eles não entram nos grupos
+        entries = [entry for entry in entries if entry[2]]
+        bank = cls(threshold=threshold)
+        bank._characters = [name.rstrip(b"\0").decode("utf-8") for name, _, _ in entries]
+        bank._group_starts = np.array([start for _, start, _ in entries], dtype=np.intp)
+        bank._hashes = hashes
+        return bank
+
+    def share(self) -> Tuple[shared_memory.SharedMemory, Dict]:
+        """Publica as linhas em memória compartilhada para outros processos.
+
+        Devolve o segmento (quem publica deve mantê-lo vivo e chamar `unlink`
+        ao final) e um descritor pequeno e serializável para `attach`.
+        """
+        self._compact()
+        hashes = np.ascontiguousarray(self._hashes, dtype="<u8")
+        segment = shared_memory.SharedMemory(create=True, size=max(hashes.nbytes, 1))
+        np.ndarray(hashes.shape, dtype="<u8", buffer=segment.buf)[:] = hashes
+        descriptor = {
+            "name": segment.name,
+            "rows": len(hashes),
+            "characters": list(self._characters),
+            "group_starts": self._group_starts.tolist(),
+            "threshold": self.threshold,
+        }
+        return segment, descriptor
+
+    @classmethod
+    def attach(cls, descriptor: Dict) -> "ReferenceBank":
+        """Abre, sem cópia e somente para leitura, um banco publicado com `share`"""
+        # Os workers são filhos de quem publicou e usam o mesmo resource tracker,
+        # então o segmento só é removido pelo `unlink` do dono
+        segment = shared_memory.SharedMemory(name=descriptor["name"])
+        hashes = np.ndarray((descriptor["rows"], len(HASH_TYPES)), dtype="<u8", buffer=segment.buf)
+        hashes.flags.writeable = False
+        bank = cls(threshold=descriptor["threshold"])
+        bank._characters = list(descriptor["characters"])
+        bank._group_starts = np.array(descriptor["group_starts"], dtype=np.intp)
+        bank._hashes = hashes
+        bank._shared = segment
+        return bank
+
+    def distances(self, queries: np.ndarray) -> np.ndarray:
+        """Distâncias totais (soma dos três hashes) de cada consulta (M, 3) para cada referência (M, N)"""
+        self._compact()
+        xor = np.bitwise_xor(queries[:, None, :], self._hashes[None, :, :])
+        return popcount(xor).sum(axis=-1, dtype=np.int32)
+
+    def match(self, hashes: Dict) -> Optional[MatchResult]:
+        """Compara um único conjunto de hashes"""
+        results = self.match_batch([hashes])
+        return results[0]
+
+    def match_batch(self, hashes_list: Sequence[Dict]) -> List[Optional[MatchResult]]:
+        """Compara vários captchas de uma vez e retorna o melhor e o segundo melhor personagem"""
+        if not hashes_list:
+            return []
+        return self.match_rows(np.array([hashes_to_row(h) for h in hashes_list], dtype=np.uint64))
+
+    def match_rows(self, queries: np.ndarray) -> List[Optional[MatchResult]]:
+        """Como `match_batch`, mas recebe as linhas (M, 3) uint64 já empacotadas"""
+        self._compact()
+        if not self._characters or not len(queries):
+            return [None] * len(queries)
+
+        # Menor distância de cada consulta para cada personagem (M, C)
+        per_char = np.minimum.reduceat(self.distances(queries), self._group_starts, axis=1)
+
+        results = []
+        order = np.argsort(per_char, axis=1, kind="stable")
+        for row, ranking in zip(per_char, order):
+            best = int(ranking[0])
+            distance = int(row[best])
+            runner_up = int(ranking[1]) if len(ranking) > 1 else None
+            results.append(MatchResult(
+                character=self._characters[best],
+                distance=distance,
+                runner_up=self._characters[runner_up] if runner_up is not None else None,
+                runner_up_distance=int(row[runner_up]) if runner_up is not None else None,
+                accepted=distance <= self.threshold
+            ))
+            logging.debug(f"Distâncias por personagem: {dict(zip(self._characters, row.tolist()))}")
+        return results
@@ -0,0 +1,177 @@
+"""Construtor offline do banco binário de referências do captcha de caçada.
+
+Lê pastas de captchas rotulados (um subdiretório por personagem, por
+exemplo `captchas/Naruto/*.png`), calcula os três hashes de cada imagem em um
+pool de processos, remove quase-duplicatas e grava `reference_bank.bin`, que
+o CaptchaProcessor mapeia em memória na inicialização.
+
+Um manifesto ao lado do banco guarda tamanho, mtime e hashes de cada
+imagem, então uma reconstrução só recalcula as imagens novas ou alteradas:
+    python -m bot.reference_bank_builder captchas -o reference_bank.bin
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .captcha_processor import CaptchaProcessor
+from .reference_bank import (ReferenceBank, DEFAULT_BANK_FILE, HASH_TYPES, hashes_to_row, read_hash_file,
+                             popcount)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+MANIFEST_VERSION = 2  # 2: hashes da pirâmide compartilhada (captcha_preprocessing)
+
+def _hash_file(path: str) -> Optional[List[int]]:
+    """Hashes de uma imagem como linha de inteiros (executa nos processos do pool)"""
+    try:
+        with open(path, "rb") as f:
+            hashes = CaptchaProcessor._get_image_hashes(f.read())
+    except OSError:
+        return None
+    return hashes_to_row(hashes) if hashes else None
+
+def find_labeled_images(directories: List[str]) -> Dict[str, str]:
+    """Mapeia cada imagem para o personagem do subdiretório onde ela está"""
+    images = {}
+    for directory in directories:
+        for path in glob.glob(os.path.join(directory, "*", "*")):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                label = os.path.basename(os.path.dirname(path))
+                images[os.path.abspath(path)] = label.capitalize()
+    return images
+
+def seed_rows(directory: str = ".") -> Dict[str, List[List[int]]]:
+    """Referências dos arquivos `<personagem>_hashes.txt` (as imagens originais)"""
+    rows: Dict[str, List[List[int]]] = {}
+    for path in glob.glob(os.path.join(directory, "*_hashes.txt")):
+        char = os.path.basename(path)[:-len("_hashes.txt")].capitalize()
+        try:
+            rows.setdefault(char, []).extend(read_hash_file(path))
+        except ValueError as e:
+            # Arquivo de uma versão anterior dos hashes: usa a imagem original, se houver
+            image_path = os.path.join(directory, f"{char.lower()}.jpeg")
+            row = _hash_file(image_path) if os.path.exists(image_path) else None
+            if row is None:
+                logging.error(f"{e}; referência de {char} ignorada")
+                continue
+            logging.warning(f"{e}; usando {image_path}")
+            rows.setdefault(char, []).append(row)
+    return rows
+
+def remove_near_duplicates(rows: np.ndarray, max_distance: int) -> np.ndarray:
+    """Mantém uma linha só se ela estiver a mais de `max_distance` de todas as já mantidas"""
+    if len(rows) == 0:
+        return rows
+    rows = np.unique(rows, axis=0)  # duplicatas exatas saem de uma vez
+    if max_distance <= 0:
+        return rows
+    kept = np.empty_like(rows)
+    count = 0
+    for row in rows:
+        if count:
+            distances = popcount(np.bitwise_xor(kept[:count], row)).sum(axis=1)
+            if distances.min() <= max_distance:
+                continue
+        kept[count] = row
+        count += 1
+    return kept[:count]
+
+class ReferenceBankBuilder:
+    """Reconstrução incremental do banco a partir de pastas de imagens rotuladas"""
+
+    def __init__(self, output: str = DEFAULT_BANK_FILE, workers: Optional[int] = None,
+                 dedup_distance: int = 2):
+        self.output = output
+        self.manifest_path = f"{output}.manifest.json"
+        self.workers = workers
+        self.dedup_distance = dedup_distance
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Manifesto ilegível, recalculando tudo: {e}")
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("files", {})
+
+    def _save_manifest(self, files: Dict[str, Dict]) -> None:
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def build(self, directories: List[str], seed: Optional[Dict[str, List[List[int]]]] = None) -> ReferenceBank:
+        """Atualiza o manifesto, refaz os hashes necessários e grava o banco"""
+        start = time.perf_counter()
+        images = find_labeled_images(directories)
+        previous = self._load_manifest()
+
+        files: Dict[str, Dict] = {}
+        stale: List[Tuple[str, os.stat_result]] = []
+        for path, label in sorted(images.items()):
+            stat = os.stat(path)
+            entry = previous.get(path)
+            if (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                    and entry["label"] == label):
+                files[path] = entry
+            else:
+                stale.append((path, stat))
+
+        if stale:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                rows = pool.map(_hash_file, [path for path, _ in stale], chunksize=64)
+                for (path, stat), row in zip(stale, rows):
+                    if row is None:
+                        logging.warning(f"Imagem ignorada (não foi possível calcular os hashes): {path}")
+                        continue
+                    files[path] = {"label": images[path], "size": stat.st_size,
+                                   "mtime_ns": stat.st_mtime_ns, "row": row}
+        logging.info(f"{len(images)} imagens, {len(stale)} recalculadas, "
+                     f"{len(previous.keys() - images.keys())} removidas.")
+
+        grouped: Dict[str, List[List[int]]] = {char: list(rows) for char, rows in (seed or {}).items()}
+        for entry in files.values():
+            grouped.setdefault(entry["label"], []).append(entry["row"])
+
+        bank = ReferenceBank()
+        total = 0
+        for char in sorted(grouped):
+            rows = np.array(grouped[char], dtype=np.uint64).reshape(-1, len(HASH_TYPES))
+            unique = remove_near_duplicates(rows, self.dedup_distance)
+            total += len(rows)
+            bank.add_rows(char, unique.tolist())
+
+        bank.save(self.output)
+        self._save_manifest(files)
+        logging.info(
+            f"Banco com {len(bank)} referências ({total - len(bank)} quase-duplicatas removidas) "
+            f"salvo em {self.output} em {time.perf_counter() - start:.1f}s: {bank.counts()}"
+        )
+        return bank
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Constrói o banco binário de referências do captcha de caçada")
+    parser.add_argument("directories", nargs="+", help="Pastas com um subdiretório de imagens por personagem")
+    parser.add_argument("-o", "--output", default=DEFAULT_BANK_FILE, help="Arquivo do banco")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Processos para calcular os hashes")
+    parser.add_argument("--dedup-distance", type=int, default=2,
+                        help="Distância máxima (soma dos três hashes) para considerar duas imagens iguais")
+    parser.add_argument("--no-seed", action="store_true",
+                        help="Não inclui as referências dos arquivos <personagem>_hashes.txt")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    builder = ReferenceBankBuilder(args.output, workers=args.workers, dedup_distance=args.dedup_distance)
+    builder.build(args.directories, seed=None if args.no_seed else seed_rows())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import logging
+import re
+from typing import Dict, Iterable, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+from .rate_controller import BUDGETED_TYPES
+
+# Domínios de anúncios e rastreamento bloqueados (inclui subdomínios)
+AD_HOST_SUFFIXES = (
+    "googleadservices.com",
+    "doubleclick.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "adnxs.com",
+    "advertising.com",
+    "adform.net",
+    "facebook.com",
+    "facebook.net",
+)
+
+# Trechos de URL típicos de anúncios, aplicados a scripts e imagens
+AD_URL_PATTERN = re.compile(
+    r"(?:^|[/._?=&-])(?:ads|adsystem|adserver|analytics|pixel|track(?:er|ing)?|banner|popup)(?:$|[/._?=&-])",
+    re.IGNORECASE
+)
+
+# Páginas (parâmetro `p`) com imagens de que o bot depende: o captcha de caçada e o
+# botão de receber a recompensa (cacadas) e o captcha do invasor (invasao). A página
+# sem `p` é a de login, com o captcha de login. Nelas nenhuma imagem do site é
+# bloqueada: as URLs reais dessas imagens não foram verificadas, então a decisão é
+# tomada pela página que faz a requisição, não por um palpite sobre a URL.
+CAPTCHA_PAGES = frozenset({"", "cacadas", "invasao"})
+
+# Heurística só para imagens de outros domínios (um captcha servido por CDN, por exemplo)
+ESSENTIAL_IMAGE_PATTERN = re.compile(r"captcha", re.IGNORECASE)
+
+def is_captcha_page(page_url: Optional[str]) -> bool:
+    """Indica se a página pode exibir um captcha ou o botão de recompensa"""
+    if not page_url:
+        return False
+    query = parse_qs(urlsplit(page_url).query)
+    return query.get("p", [""])[0] in CAPTCHA_PAGES
+
+class RequestFilter:
+    """Filtro único de requisições do contexto, com contadores por regra.
+
+    Substitui vários `context.route` por um só handler: um conjunto de
+    sufixos de domínio, um padrão de URL pré-compilado e políticas por tipo de
+    recurso. Cada bloqueio é contado por regra, junto com uma estimativa dos
+    bytes economizados (tamanho médio observado do mesmo tipo de recurso).
+    """
+
+    def __init__(self,
+                 site_host: str = "narutoplayers.com.br",
+                 blocked_resource_types: Iterable[str] = ("font", "media"),
+                 block_third_party_images: bool = True,
+                 block_site_images: bool = False,
+                 block_third_party_stylesheets: bool = False,
+                 host_suffixes: Iterable[str] = AD_HOST_SUFFIXES,
+                 rate_controller=None):
+        # Imagens de www.site e site são ambas do próprio jogo
+        self.site_host = site_host[4:] if site_host.startswith("www.") else site_host
+        self.blocked_resource_types: Set[str] = set(blocked_resource_types)
+        self.block_third_party_images = block_third_party_images
+        self.block_site_images = block_site_images
+        self.block_third_party_stylesheets = block_third_party_stylesheets
+        self._host_suffixes = tuple(host_suffixes)
+        # HostRateController opcional: navegações do site gastam o orçamento do host e informam a saúde dele
+        self.rate_controller = rate_controller
+        self._host_cache: Dict[str, bool] = {}
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self._size_totals: Dict[str, float] = {}
+        self._size_counts: Dict[str, int] = {}
+
+    def _is_ad_host(self, host: str) -> bool:
+        cached = self._host_cache.get(host)
+        if cached is None:
+            cached = any(host == s or host.endswith("." + s) for s in self._host_suffixes)
+            self._host_cache[host] = cached
+        return cached
+
+    def _is_site_host(self, host: str) -> bool:
+        return host == self.site_host or host.endswith("." + self.site_host)
+
+    def classify(self, url: str, resource_type: str, page_url: Optional[str] = None) -> Optional[str]:
+        """Retorna o nome da regra que bloqueia a requisição, ou None para deixá-la passar.
+
+        `page_url` é o documento que fez a requisição; imagens do site pedidas
+        pelas páginas de captcha nunca são bloqueadas.
+        """
+        if url.startswith("data:"):
+            return None
+        host = urlsplit(url).hostname or ""
+
+        if self._is_ad_host(host):
+            return "ad_host"
+        if resource_type in self.blocked_resource_types:
+            return f"type:{resource_type}"
+        if resource_type in ("script", "image") and AD_URL_PATTERN.search(url):
+            return "ad_url"
+        if resource_type == "stylesheet" and self.block_third_party_stylesheets and not self._is_site_host(host):
+            return "third_party_stylesheet"
+        if resource_type == "image":
+            if self._is_site_host(host):
+                if self.block_site_images and not is_captcha_page(page_url):
+                    return "site_image"
+            elif self.block_third_party_images and not ESSENTIAL_IMAGE_PATTERN.search(url):
+                return "third_party_image"
+        return None
+
+    async def handle(self, route) -> None:
+        """Handler único registrado com `context.route("**/*", ...)`"""
+        request = route.request
+        page_url = None
+        if request.resource_type == "image":
+            try:
+                page_url = request.frame.url
+            except Exception:
+                pass  # requisição sem frame (service worker): tratada como página comum
+        rule = self.classify(request.url, request.resource_type, page_url)
+        if rule is None:
+            if self.rate_controller is not None and request.resource_type in BUDGETED_TYPES:
+                host = urlsplit(request.url).hostname or ""
+                if self._is_site_host(host):
+                    await self.rate_controller.acquire(host)
+            await route.continue_()
+            return
+
+        counter = self.counters.setdefault(rule, {"requests": 0, "estimated_bytes": 0.0})
+        counter["requests"] += 1
+        counter["estimated_bytes"] += self._average_size(request.resource_type)
+        await route.abort()
+
+    def observe_response(self, response) -> None:
+        """Acumula o tamanho das respostas liberadas para estimar a economia dos bloqueios"""
+        if self.rate_controller is not None and response.request.resource_type == "document":
+            host = urlsplit(response.url).hostname or ""
+            if self._is_site_host(host):
+                self.rate_controller.record_response(host, response.status)
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            resource_type = response.request.resource_type
+            self._size_totals[resource_type] = self._size_totals.get(resource_type, 0) + int(length)
+            self._size_counts[resource_type] = self._size_counts.get(resource_type, 0) + 1
+
+    def _average_size(self, resource_type: str) -> float:
+        count = self._size_counts.get(resource_type)
+        return self._size_totals[resource_type] / count if count else 0.0
+
+    async def install(self, context) -> None:
+        """Registra o filtro no contexto"""
+        await context.route("**/*", self.handle)
+        context.on("response", self.observe_response)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Contadores de bloqueio por regra"""
+        return {rule: dict(counter) for rule, counter in self.counters.items()}
+
+    def log_summary(self, prefix: str = "") -> None:
+        """Registra no log o que o filtro bloqueou até agora"""
+        if not self.counters:
+            return
+        total = sum(c["requests"] for c in self.counters.values())
+        saved_kb = sum(c["estimated_bytes"] for c in self.counters.values()) / 1024
+        details = ", ".join(
+            f"{rule}={int(c['requests'])} (~{c['estimated_bytes'] / 1024:.0f} KB)"
+            for rule, c in sorted(self.counters.items())
+        )
+        logging.info(f"{prefix}Requisições bloqueadas: {total} (~{saved_kb:.0f} KB economizados): {details}")
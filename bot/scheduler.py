@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Atividades agendáveis de cada conta
+HUNT = "hunt"
+INVASION = "invasion"
+DOUJUTSU = "doujutsu"
+
+class DeadlineScheduler:
+    """Fila de prioridade de prazos por conta e por atividade.
+
+    Cada conta tem um heap de (prazo, sequência, atividade). Reagendar uma
+    atividade substitui o prazo anterior (a entrada antiga é descartada de
+    forma preguiçosa), e quem estiver esperando acorda imediatamente se o novo
+    prazo for mais cedo que o atual.
+    """
+
+    def __init__(self,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._counter = itertools.count()
+        self._heaps: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._current: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    def now(self) -> float:
+        """Retorna o relógio usado pelo agendador"""
+        return self._clock()
+
+    def schedule(self, account: str, activity: str, delay: float) -> float:
+        """Agenda a atividade para daqui a `delay` segundos e retorna o prazo"""
+        return self.schedule_at(account, activity, self._clock() + max(delay, 0))
+
+    def schedule_at(self, account: str, activity: str, deadline: float) -> float:
+        """Agenda (ou reagenda) a atividade para o instante `deadline`"""
+        seq = next(self._counter)
+        self._current[(account, activity)] = (deadline, seq)
+        heap = self._heaps.setdefault(account, [])
+        heapq.heappush(heap, (deadline, seq, activity))
+
+        # Acorda quem estiver esperando caso este seja o novo prazo mais próximo
+        head = self.peek(account)
+        if head and head[1] == activity and head[0] == deadline:
+            self._wakeup(account).set()
+        logging.debug(f"[{account}] {activity} agendado para daqui {deadline - self._clock():.1f}s")
+        return deadline
+
+    def cancel(self, account: str, activity: str) -> None:
+        """Remove o prazo pendente de uma atividade"""
+        if self._current.pop((account, activity), None) is not None:
+            self._wakeup(account).set()
+
+    def deadline(self, account: str, activity: str) -> Optional[float]:
+        """Retorna o prazo pendente de uma atividade, se houver"""
+        entry = self._current.get((account, activity))
+        return entry[0] if entry else None
+
+    def peek(self, account: str) -> Optional[Tuple[float, str]]:
+        """Retorna (prazo, atividade) mais próximo da conta, descartando entradas obsoletas"""
+        heap = self._heaps.get(account)
+        while heap:
+            deadline, seq, activity = heap[0]
+            if self._current.get((account, activity)) == (deadline, seq):
+                return deadline, activity
+            heapq.heappop(heap)
+        return None
+
+    def pending(self, account: str) -> Dict[str, float]:
+        """Retorna os segundos restantes de cada atividade pendente da conta"""
+        now = self._clock()
+        return {
+            activity: deadline - now
+            for (acc, activity), (deadline, _) in self._current.items()
+            if acc == account
+        }
+
+    def remove_account(self, account: str) -> None:
+        """Descarta todos os prazos de uma conta"""
+        for key in [key for key in self._current if key[0] == account]:
+            del self._current[key]
+        self._heaps.pop(account, None)
+        self._wakeup(account).set()
+
+    async def next_activity(self, account: str) -> str:
+        """Espera até o prazo mais próximo da conta vencer e retorna a atividade"""
+        wakeup = self._wakeup(account)
+        while True:
+            wakeup.clear()
+            head = self.peek(account)
+            if head is None:
+                await wakeup.wait()
+                continue
+
+            deadline, activity = head
+            delay = deadline - self._clock()
+            if delay <= 0:
+                heapq.heappop(self._heaps[account])
+                del self._current[(account, activity)]
+                return activity
+
+            # Dorme até o prazo ou até alguém agendar algo mais cedo
+            sleeper = asyncio.ensure_future(self._sleep(delay))
+            waiter = asyncio.ensure_future(wakeup.wait())
+            try:
+                await asyncio.wait({sleeper, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sleeper.cancel()
+                waiter.cancel()
+
+    def _wakeup(self, account: str) -> asyncio.Event:
+        if account not in self._wakeups:
+            self._wakeups[account] = asyncio.Event()
+        return self._wakeups[account]
@@ -0,0 +1,40 @@
+import logging
+import os
+import re
+from typing import Optional
+
+class SessionStore:
+    """Guarda o estado autenticado (cookies e local storage) de cada conta.
+
+    Depois de um login e seleção de personagem bem-sucedidos o storage state
+    do contexto é salvo em `<diretório>/<usuário>.json`; no próximo início o
+    contexto é criado a partir dele e o login completo só é refeito se a
+    sessão tiver expirado.
+    """
+
+    def __init__(self, directory: str = "sessions"):
+        self.directory = directory
+
+    def path(self, username: str) -> str:
+        """Caminho do arquivo de sessão da conta"""
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", username)
+        return os.path.join(self.directory, f"{safe_name}.json")
+
+    def load(self, username: str) -> Optional[str]:
+        """Retorna o arquivo de sessão salvo da conta, se existir"""
+        path = self.path(username)
+        return path if os.path.exists(path) else None
+
+    async def save(self, context, username: str) -> None:
+        """Salva o storage state atual do contexto"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(username)
+        await context.storage_state(path=path)
+        logging.info(f"Sessão de {username} salva em {path}.")
+
+    def discard(self, username: str) -> None:
+        """Remove a sessão salva (por exemplo, quando expirou)"""
+        path = self.path(username)
+        if os.path.exists(path):
+            os.remove(path)
+            logging.info(f"Sessão expirada de {username} descartada.")
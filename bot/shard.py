@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from typing import Callable, Dict, Optional, Set
+from .fleet import run_fleet
+from .fleet_config import AccountConfig, FleetConfigWatcher
+from .browser_profile import get_profile
+from .metrics import MetricsRegistry, MetricsServer, REGISTRY
+from .reference_bank import ReferenceBank
+from .startup import StartupTimer
+from .supervisor import RecyclePolicy
+
+# Monta o `make_bot` de um worker: (startup, banco de referências compartilhado, número de workers)
+BotFactory = Callable[[StartupTimer, Optional[ReferenceBank], int], Callable[[AccountConfig], object]]
+
+class ShutdownRequested(Exception):
+    """O coordenador pediu (ou, ao morrer, forçou) o encerramento do worker"""
+
+class PipeWatcher:
+    """Contas do worker enviadas pelo coordenador, no lugar do arquivo da frota.
+
+    Tem a mesma interface do `FleetConfigWatcher`, então o `run_fleet` do
+    worker aplica as mudanças de atribuição como aplicaria um arquivo novo.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def poll(self) -> Optional[Dict[str, AccountConfig]]:
+        latest = None
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                if message is None:
+                    raise ShutdownRequested()
+                latest = message
+        except (EOFError, OSError):
+            # Coordenador morto: encerra as contas salvando as sessões
+            raise ShutdownRequested()
+        return latest
+
+def _worker_main(index: int, conn, factory: BotFactory, bank_descriptor: Optional[Dict],
+                 workers: int, fleet_options: Dict, metrics_port: int) -> None:
+    """Processo worker: um Chromium e um event loop para as contas atribuídas"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - %(levelname)s - [worker {index}] [%(filename)s:%(lineno)d] - %(message)s',
+        force=True,
+    )
+    metrics_server = MetricsServer(port=metrics_port + 1 + index).start() if metrics_port else None
+    try:
+        # As referências vêm da memória compartilhada, sem reler os *_hashes.txt
+        bank = ReferenceBank.attach(bank_descriptor) if bank_descriptor else None
+        startup = StartupTimer()
+        make_bot = factory(startup, bank, workers)
+        accounts = conn.recv()
+        if accounts is None:
+            return
+        options = dict(fleet_options)
+        options["profile"] = get_profile(options["profile"])
+        asyncio.run(run_fleet(accounts, make_bot, watcher=PipeWatcher(conn), startup=startup, **options))
+    except (ShutdownRequested, KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+class ShardCoordinator:
+    """Distribui as contas entre processos worker, cada um com o seu Chromium.
+
+    Uma conta nova vai para o worker com menos contas e fica nele enquanto
+    ele viver; mudanças de modo, limites, senha ou slot são repassadas ao
+    worker dono. Quando um worker morre, ele é relançado e as suas contas
+    são redistribuídas pelos menos carregados (as sessões salvas evitam um
+    novo login). Um worker que morre `max_fast_failures` vezes seguidas em
+    menos de `min_uptime` segundos deixa de ser relançado.
+    """
+
+    def __init__(self, workers: int, factory: BotFactory, bank_descriptor: Optional[Dict] = None,
+                 fleet_options: Optional[Dict] = None, metrics_port: int = 0,
+                 min_uptime: float = 60.0, max_fast_failures: int = 3,
+                 stop_timeout: float = 30.0, metrics: Optional[MetricsRegistry] = None):
+        if workers < 1:
+            raise ValueError("workers deve ser >= 1")
+        self.workers = workers
+        self.factory = factory
+        self.bank_descriptor = bank_descriptor
+        self.fleet_options = fleet_options or {}
+        self.metrics_port = metrics_port
+        self.min_uptime = min_uptime
+        self.max_fast_failures = max_fast_failures
+        self.stop_timeout = stop_timeout
+        self.metrics = metrics or REGISTRY
+        # Processos iniciados com spawn: o Playwright e o asyncio não sobrevivem bem a um fork
+        self._context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self._pipes: Dict = {}
+        self._started_at: Dict[int, float] = {}
+        self._fast_failures: Dict[int, int] = {index: 0 for index in range(workers)}
+        self.retired: Set[int] = set()
+        self.accounts: Dict[str, AccountConfig] = {}
+        self.assignments: Dict[int, Dict[str, AccountConfig]] = {index: {} for index in range(workers)}
+        self.owner: Dict[str, int] = {}
+
+    def load(self, index: int) -> int:
+        """Carga do worker: quantidade de contas atribuídas"""
+        return len(self.assignments[index])
+
+    def _least_loaded(self) -> int:
+        candidates = [index for index in range(self.workers) if index not in self.retired]
+        if not candidates:
+            raise RuntimeError("Todos os workers falharam repetidamente; encerrando a frota.")
+        return min(candidates, key=lambda index: (self.load(index), index))
+
+    def _spawn(self, index: int) -> None:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, name=f"naruto-worker-{index}",
+            args=(index, child, self.factory, self.bank_descriptor, self.workers,
+                  self.fleet_options, self.metrics_port),
+        )
+        process.start()
+        child.close()
+        self.processes[index] = process
+        self._pipes[index] = parent
+        self._started_at[index] = time.monotonic()
+        logging.info(f"Worker {index} iniciado (pid {process.pid}).")
+
+    def _send(self, index: int) -> None:
+        self.metrics.set_gauge("worker_accounts", self.load(index), worker=str(index))
+        try:
+            self._pipes[index].send(dict(self.assignments[index]))
+        except (BrokenPipeError, OSError) as e:
+            # O worker morreu; `check` o relança e redistribui as contas
+            logging.warning(f"Não foi possível enviar as contas ao worker {index}: {e}")
+
+    def start(self, accounts: Dict[str, AccountConfig]) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+        self.apply(accounts, notify=set(range(self.workers)))
+
+    def apply(self, accounts: Dict[str, AccountConfig], notify: Optional[Set[int]] = None) -> None:
+        """Distribui o conjunto de contas, avisando só os workers cujas contas mudaram"""
+        changed = set(notify or ())
+        for username in list(self.owner.keys() - accounts.keys()):
+            index = self.owner.pop(username)
+            del self.assignments[index][username]
+            changed.add(index)
+        for username, account in accounts.items():
+            index = self.owner.get(username)
+            if index is None:
+                index = self.owner[username] = self._least_loaded()
+                logging.info(f"Conta {username} atribuída ao worker {index}.")
+            elif self.assignments[index][username] == account:
+                continue
+            self.assignments[index][username] = account
+            changed.add(index)
+        self.accounts = dict(accounts)
+        for index in sorted(changed):
+            if index not in self.retired:
+                self._send(index)
+
+    def check(self) -> None:
+        """Relança os workers mortos e redistribui as contas deles"""
+        for index, process in list(self.processes.items()):
+            if process.is_alive() or index in self.retired:
+                continue
+            orphans = self.assignments[index]
+            logging.error(f"Worker {index} morreu (código {process.exitcode}); "
+                          f"redistribuindo {len(orphans)} conta(s).")
+            self.metrics.inc("worker_restarts_total", worker=str(index))
+            for username in orphans:
+                self.owner.pop(username, None)
+            self.assignments[index] = {}
+            self._pipes.pop(index).close()
+
+            if time.monotonic() - self._started_at[index] < self.min_uptime:
+                self._fast_failures[index] += 1
+            else:
+                self._fast_failures[index] = 0
+            if self._fast_failures[index] >= self.max_fast_failures:
+                logging.error(f"Worker {index} falhou {self._fast_failures[index]} vezes seguidas, desativando.")
+                self.retired.add(index)
+                self.metrics.set_gauge("worker_accounts", 0, worker=str(index))
+                notify = set()
+            else:
+                self._spawn(index)
+                notify = {index}
+            self.apply(self.accounts, notify=notify)
+
+    def stop(self) -> None:
+        """Pede a cada worker que encerre as contas (salvando as sessões) e aguarda"""
+        for index, pipe in self._pipes.items():
+            try:
+                pipe.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        deadline = time.monotonic() + self.stop_timeout
+        for index, process in self.processes.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logging.warning(f"Worker {index} não encerrou a tempo, terminando o processo.")
+                process.terminate()
+                process.join()
+        for pipe in self._pipes.values():
+            pipe.close()
+        self._pipes.clear()
+
+def run_sharded(accounts: Dict[str, AccountConfig], factory: BotFactory, workers: int,
+                watcher: Optional[FleetConfigWatcher] = None, bank: Optional[ReferenceBank] = None,
+                headless: bool = True, policy: Optional[RecyclePolicy] = None, profile: str = "standard",
+                reload_interval: float = 5.0, metrics_port: int = 0) -> None:
+    """Executa a frota em `workers` processos, cada um com o seu Chromium e o seu event loop.
+
+    O banco de referências do captcha é publicado uma vez em memória
+    compartilhada e mapeado por todos os workers. `factory` precisa ser uma
+    função de módulo (os workers são iniciados com spawn); `profile` é o
+    nome do perfil do navegador. Com `watcher`, as mudanças do arquivo da
+    frota são redistribuídas entre os workers.
+    """
+    segment, descriptor = bank.share() if bank is not None else (None, None)
+    fleet_options = {"headless": headless, "policy": policy, "profile": profile, "reload_interval": reload_interval}
+    coordinator = ShardCoordinator(workers, factory, descriptor, fleet_options, metrics_port)
+    logging.info(f"Iniciando frota com {len(accounts)} conta(s) em {workers} worker(s).")
+    try:
+        coordinator.start(accounts)
+        while True:
+            time.sleep(reload_interval)
+            coordinator.check()
+            if watcher is not None:
+                reloaded = watcher.poll()
+                if reloaded is not None:
+                    coordinator.apply(reloaded)
+    finally:
+        coordinator.stop()
+        if segment is not None:
+            segment.close()
+            segment.unlink()
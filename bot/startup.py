@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+from .metrics import MetricsRegistry, REGISTRY
+
+class StartupTimer:
+    """Duração de cada fase do início do processo e o tempo até a primeira ação.
+
+    As fases podem se sobrepor (o Chromium sobe enquanto os bots são montados),
+    então o relatório traz a duração de cada uma e o tempo total de parede,
+    medido a partir de `origin` (em geral, o início do `index.py`).
+    """
+
+    def __init__(self, origin: Optional[float] = None, metrics: Optional[MetricsRegistry] = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.metrics = metrics or REGISTRY
+        self.phases: Dict[str, float] = {}
+        self.first_action_seconds: Optional[float] = None
+        self._started_accounts: Set[str] = set()
+        self.first_action_event = asyncio.Event()
+
+    def mark(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+        self.metrics.set_gauge("startup_seconds", seconds, phase=phase)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, time.perf_counter() - start)
+
+    def first_action(self, account: str) -> None:
+        """Chamado por cada conta antes de cada atividade; só a primeira de cada conta é medida.
+
+        O relatório do início sai na primeira ação do processo.
+        """
+        if account in self._started_accounts:
+            return
+        self._started_accounts.add(account)
+        elapsed = time.perf_counter() - self.origin
+        self.metrics.set_gauge("time_to_first_action_seconds", elapsed, account=account)
+        if self.first_action_seconds is not None:
+            return
+        self.first_action_seconds = elapsed
+        self.first_action_event.set()
+        logging.info(f"Primeira ação em {elapsed:.2f}s ({account}). {self.report()}")
+
+    def report(self) -> str:
+        return "Início: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.phases.items())
+
+    def summary(self) -> Dict:
+        return {
+            "phases_ms": {name: seconds * 1000 for name, seconds in self.phases.items()},
+            "first_action_ms": None if self.first_action_seconds is None else self.first_action_seconds * 1000,
+        }
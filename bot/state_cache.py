@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Callable, Optional, Tuple
+from .game_state import GameState
+
+class GameStateCache:
+    """Estado do jogo de uma conta com validade definida pelo próprio jogo.
+
+    - doujutsu: válido até o fim do timer do Rinnegan (ou por `default_ttl`
+      quando não há timer a acompanhar);
+    - invasão: indisponível até `#relogio_invasao` zerar;
+    - HP: última leitura, descontada a cada batalha pela maior perda por
+      batalha já observada; a estimativa só é usada depois que essa perda é
+      conhecida e expira após `hp_ttl`.
+
+    Assim o ciclo só busca uma página quando a resposta guardada venceu.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 default_ttl: float = 300.0, hp_ttl: float = 1800.0):
+        self._clock = clock
+        self.default_ttl = default_ttl
+        self.hp_ttl = hp_ttl
+        self._doujutsu: Optional[Tuple[int, float]] = None   # (segundos restantes na leitura, expira em)
+        self._doujutsu_read_at = 0.0
+        self._invasion_until: Optional[float] = None
+        self._hp: Optional[Tuple[int, int]] = None
+        self._hp_read_at = 0.0
+        self._battles_since_hp = 0
+        self.hp_drop_per_battle: Optional[float] = None
+
+    # Doujutsu
+    def record_doujutsu(self, remaining: int) -> None:
+        """Guarda o tempo restante do Rinnegan (0: sem Rinnegan ativo a acompanhar)"""
+        now = self._clock()
+        expires = now + remaining if remaining > 0 else now + self.default_ttl
+        self._doujutsu = (remaining, expires)
+        self._doujutsu_read_at = now
+
+    def doujutsu_remaining(self) -> Optional[int]:
+        """Segundos restantes do Rinnegan, 0 se inativo, ou None se a informação venceu"""
+        if self._doujutsu is None:
+            return None
+        remaining, expires = self._doujutsu
+        now = self._clock()
+        if now >= expires:
+            self._doujutsu = None
+            return None
+        return max(int(expires - now), 0) if remaining > 0 else 0
+
+    def invalidate_doujutsu(self) -> None:
+        self._doujutsu = None
+
+    # Invasão
+    def record_invasion(self, available: bool, remaining: int) -> None:
+        """Guarda o timer da invasão; invasão disponível nunca fica em cache"""
+        if available or remaining <= 0:
+            self._invasion_until = None
+        else:
+            self._invasion_until = self._clock() + remaining
+
+    def invasion_remaining(self) -> int:
+        """Segundos até a próxima invasão segundo o último timer lido (0 se desconhecido)"""
+        if self._invasion_until is None:
+            return 0
+        remaining = self._invasion_until - self._clock()
+        if remaining <= 0:
+            self._invasion_until = None
+            return 0
+        return int(remaining) + 1
+
+    # HP
+    def record_hp(self, current: int, maximum: int) -> None:
+        """Guarda uma leitura real de HP e aprende a perda média por batalha"""
+        if self._hp is not None and self._battles_since_hp:
+            drop = (self._hp[0] - current) / self._battles_since_hp
+            if drop > 0:
+                self.hp_drop_per_battle = max(drop, self.hp_drop_per_battle or 0.0)
+                logging.debug(f"Perda de HP por batalha estimada em {self.hp_drop_per_battle:.1f}")
+        self._hp = (current, maximum)
+        self._hp_read_at = self._clock()
+        self._battles_since_hp = 0
+
+    def record_battle(self) -> None:
+        self._battles_since_hp += 1
+
+    def hp_estimate(self) -> Optional[Tuple[int, int]]:
+        """HP (atual estimado, máximo), ou None se a estimativa não for confiável"""
+        if self._hp is None or self.hp_drop_per_battle is None:
+            return None
+        if self._clock() - self._hp_read_at > self.hp_ttl:
+            return None
+        current, maximum = self._hp
+        return max(int(current - self._battles_since_hp * self.hp_drop_per_battle), 0), maximum
+
+    def hp_is_safe(self) -> bool:
+        """Indica se mesmo após mais uma batalha o HP estimado fica acima da metade"""
+        estimate = self.hp_estimate()
+        if estimate is None:
+            return False
+        current, maximum = estimate
+        return current - self.hp_drop_per_battle >= maximum / 2
+
+    def invalidate_hp(self) -> None:
+        self._hp = None
+        self._battles_since_hp = 0
+
+    def update(self, state: GameState) -> None:
+        """Aproveita qualquer leitura de página para atualizar o que ela mostrar"""
+        if state.hp is not None:
+            self.record_hp(*state.hp)
+        if state.invasion_text:
+            self.record_invasion(state.invasion_available, state.invasion_remaining)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+from playwright.async_api import Browser
+from .metrics import MetricsRegistry, REGISTRY
+
+try:
+    import psutil
+except ImportError:  # opcional: sem ele só o heap JS de cada página é medido
+    psutil = None
+
+MB = 2 ** 20
+
+@dataclass
+class RecyclePolicy:
+    """Limites para recriar o contexto de uma conta ou o navegador inteiro"""
+    max_cycles: int = 200  # atividades por contexto antes de recriá-lo
+    max_page_heap_mb: float = 256.0  # heap JS da página da conta
+    max_browser_rss_mb: float = 2048.0  # RSS somado dos processos do Chromium (requer psutil)
+    cycle_timeout: float = 300.0  # uma atividade mais longa que isso é considerada travada
+    ping_interval: float = 30.0  # intervalo do watchdog
+    ping_timeout: float = 10.0  # sem resposta nesse tempo, o navegador é reiniciado
+    close_timeout: float = 15.0  # fechamento que demora mais que isso vira kill
+
+class BrowserSupervisor:
+    """Mantém o Chromium compartilhado vivo e com memória limitada.
+
+    Um watchdog pinga o navegador pelo CDP e mede o RSS dos seus processos;
+    se ele parar de responder (ou passar do teto de memória) é fechado, morto
+    à força se o fechamento travar, e lançado de novo. Cada relançamento
+    incrementa `generation`, e os bots recriam os seus contextos a partir da
+    sessão salva quando percebem a mudança.
+    """
+
+    def __init__(self, launch: Callable[[], Awaitable[Browser]], policy: Optional[RecyclePolicy] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        self._launch = launch
+        self.policy = policy or RecyclePolicy()
+        self.metrics = metrics or REGISTRY
+        self.browser: Optional[Browser] = None
+        self.generation = 0
+        self._cdp = None
+        self._processes: List = []
+        self._lock = asyncio.Lock()
+        self._watchdog: Optional[asyncio.Task] = None
+        self._started = asyncio.Event()
+
+    async def start(self) -> "BrowserSupervisor":
+        if psutil is None:
+            logging.warning(f"psutil não instalado: o limite de RSS do navegador "
+                            f"({self.policy.max_browser_rss_mb:.0f} MB) está desativado e um navegador "
+                            f"travado no fechamento não pode ser morto (pip install psutil).")
+        await self._open()
+        self._watchdog = asyncio.create_task(self._watch())
+        self._started.set()
+        return self
+
+    async def wait_started(self) -> None:
+        """Aguarda o primeiro lançamento do navegador"""
+        await self._started.wait()
+
+    async def stop(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            try:
+                await self._watchdog
+            except asyncio.CancelledError:
+                pass
+        await self._close()
+
+    async def _open(self) -> None:
+        before = self._child_pids()
+        self.browser = await self._launch()
+        self._cdp = await self.browser.new_browser_cdp_session()
+        # Os processos novos desde o lançamento são deste navegador (o driver já existia)
+        self._processes = [psutil.Process(pid) for pid in self._child_pids() - before] if psutil else []
+        self.generation += 1
+
+    @staticmethod
+    def _child_pids() -> set:
+        if psutil is None:
+            return set()
+        return {child.pid for child in psutil.Process().children(recursive=True)}
+
+    def _process_tree(self) -> List:
+        """Processos do navegador atual (principal, GPU, renderizadores...)"""
+        processes = []
+        for process in self._processes:
+            try:
+                processes.append(process)
+                processes.extend(process.children(recursive=True))
+            except psutil.Error:
+                pass
+        return processes
+
+    def browser_rss(self) -> Optional[int]:
+        """RSS somado dos processos do navegador, em bytes (None sem psutil)"""
+        if psutil is None or not self._processes:
+            return None
+        total = 0
+        for process in self._process_tree():
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    @staticmethod
+    async def page_heap(page) -> Optional[int]:
+        """Heap JS usado pela página (processo renderizador da conta), em bytes"""
+        try:
+            session = await page.context.new_cdp_session(page)
+            try:
+                usage = await session.send("Runtime.getHeapUsage")
+            finally:
+                await session.detach()
+            return int(usage["usedSize"])
+        except Exception as e:
+            logging.debug(f"Não foi possível medir o heap da página: {e}")
+            return None
+
+    async def ping(self) -> bool:
+        """Verifica se o navegador ainda responde a um comando simples do CDP"""
+        if self.browser is None or not self.browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(self._cdp.send("Browser.getVersion"), self.policy.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def restart(self, reason: str, generation: Optional[int] = None) -> None:
+        """Fecha (ou mata) o navegador e lança outro.
+
+        `generation` é a geração que o chamador viu com problema; se outro
+        chamador já reiniciou o navegador nesse meio tempo, nada é feito.
+        """
+        async with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            logging.warning(f"Reiniciando o navegador (motivo: {reason}).")
+            self.metrics.inc("browser_restarts_total", reason=reason)
+            await self._close()
+            await self._open()
+
+    async def _close(self) -> None:
+        browser, self.browser = self.browser, None
+        if browser is None:
+            return
+        try:
+            await asyncio.wait_for(browser.close(), self.policy.close_timeout)
+        except Exception as e:
+            logging.error(f"O navegador não fechou ({e!r}), encerrando os processos.")
+            self._kill()
+        self._processes = []
+
+    def _kill(self) -> None:
+        if psutil is None:
+            logging.error("psutil não instalado: os processos do navegador antigo podem continuar vivos.")
+            return
+        for process in self._process_tree():
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.policy.ping_interval)
+            generation = self.generation
+            try:
+                if not await self.ping():
+                    await self.restart("unresponsive", generation)
+                    continue
+                rss = self.browser_rss()
+                if rss is not None:
+                    self.metrics.set_gauge("browser_rss_bytes", rss)
+                    if rss > self.policy.max_browser_rss_mb * MB:
+                        await self.restart("memory", generation)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Erro no watchdog do navegador:")
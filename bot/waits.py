@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from .metrics import MetricsRegistry, REGISTRY
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """Pausa "humana" entre passos, separada das esperas de correção"""
+    name: str
+    min_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def delay(self) -> float:
+        return random.uniform(self.min_seconds, self.max_seconds) if self.max_seconds > 0 else 0.0
+
+LATENCY_PROFILES: Dict[str, LatencyProfile] = {
+    # Os mesmos 1-2 s de antes entre os passos de um ciclo
+    "human": LatencyProfile("human", 1.0, 2.0),
+    # Pausa curta: para o modo só invasões, em que chegar antes dos outros jogadores decide
+    "fast": LatencyProfile("fast", 0.05, 0.25),
+    "none": LatencyProfile("none"),
+}
+
+def get_latency_profile(name: str) -> LatencyProfile:
+    try:
+        return LATENCY_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Perfil de latência desconhecido {name!r} (opções: {', '.join(LATENCY_PROFILES)})")
+
+class StepWaits:
+    """Esperas dos passos de um ciclo, cada uma pela condição que o passo precisa.
+
+    Cada espera informa quanto a versão antiga esperava naquele passo (uma
+    pausa fixa), e a diferença para o tempo realmente esperado é somada por
+    ciclo em `naruto_cycle_seconds_saved` (negativa quando a condição
+    demorou mais que a pausa antiga).
+    """
+
+    def __init__(self, latency: LatencyProfile, metrics: Optional[MetricsRegistry] = None, account: str = ""):
+        self.latency = latency
+        self.metrics = metrics or REGISTRY
+        self.account = account
+        self._saved = 0.0
+
+    def _record(self, step: str, legacy: Optional[float], elapsed: float) -> None:
+        # Sem pausa fixa antes (só um wait_for_load_state, que não esperava a navegação): nada a comparar
+        if legacy is None:
+            return
+        saved = legacy - elapsed
+        self._saved += saved
+        # Contadores só crescem: economia e perda vão para séries separadas
+        if saved >= 0:
+            self.metrics.inc("wait_seconds_saved_total", saved, step=step, account=self.account)
+        else:
+            self.metrics.inc("wait_seconds_lost_total", -saved, step=step, account=self.account)
+
+    async def pause(self, step: str, legacy: float = 1.5) -> None:
+        """Pausa do perfil de latência (nenhuma condição depende dela)"""
+        delay = self.latency.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._record(step, legacy, delay)
+
+    async def until(self, step: str, condition: Awaitable, legacy: Optional[float]):
+        """Aguarda a condição do passo (seletor, resposta, navegação) e devolve o resultado dela"""
+        start = time.perf_counter()
+        try:
+            return await condition
+        finally:
+            self._record(step, legacy, time.perf_counter() - start)
+
+    async def navigation(self, page, step: str, action: Callable[[], Awaitable], legacy: Optional[float] = None,
+                         timeout: float = 30000, required: bool = True) -> bool:
+        """Executa a ação (um clique que envia formulário ou segue link) e espera a nova página carregar.
+
+        Com `required=False` a ação pode não navegar (um link por AJAX, por
+        exemplo): passado o `timeout` (ms), devolve False em vez de falhar.
+        """
+        start = time.perf_counter()
+        try:
+            async with page.expect_navigation(timeout=timeout):
+                await action()
+            return True
+        except PlaywrightTimeoutError:
+            if required:
+                raise
+            logging.debug(f"{step}: a ação não navegou em {timeout / 1000:.1f}s.")
+            return False
+        finally:
+            self._record(step, legacy, time.perf_counter() - start)
+
+    def cycle_report(self, activity: str) -> float:
+        """Segundos economizados no ciclo que terminou (zera o acumulado)"""
+        saved, self._saved = self._saved, 0.0
+        if saved:
+            self.metrics.observe("cycle_seconds_saved", saved, activity=activity, account=self.account)
+            logging.debug(f"Esperas de {activity}: {saved:.2f}s economizados no ciclo.")
+        return saved
@@ -5,7 +5,45 @@ load_dotenv()
 
 USER = os.getenv("NP_USER")
 PASSWORD = os.getenv("NP_PASSWORD")
+# Opcional: sem ela o captcha de login depende só do solver local
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Cliente do Gemini compartilhado pelas contas: chamadas por segundo, rajada, chamadas simultâneas,
+# timeout de cada chamada e prazo total de um captcha (fila e novas tentativas incluídas), em segundos
+GEMINI_RATE = float(os.getenv("NP_GEMINI_RATE", "1"))
+GEMINI_BURST = int(os.getenv("NP_GEMINI_BURST", "5"))
+GEMINI_CONCURRENCY = int(os.getenv("NP_GEMINI_CONCURRENCY", "4"))
+GEMINI_TIMEOUT = float(os.getenv("NP_GEMINI_TIMEOUT", "20"))
+GEMINI_DEADLINE = float(os.getenv("NP_GEMINI_DEADLINE", "60"))
+# Orçamento de requisições ao site, somado entre as contas: navegações por segundo e rajada
+HOST_RATE = float(os.getenv("NP_HOST_RATE", "5"))
+HOST_BURST = int(os.getenv("NP_HOST_BURST", "20"))
+# Permite apontar o bot para outro servidor (por exemplo, o servidor local dos benchmarks)
+BASE_URL = os.getenv("NP_BASE_URL", "https://www.narutoplayers.com.br/")
+# Exportação de métricas: porta do endpoint Prometheus (0 desativa) e arquivo JSON lines
+METRICS_PORT = int(os.getenv("NP_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("NP_METRICS_FILE")
+METRICS_INTERVAL = float(os.getenv("NP_METRICS_INTERVAL", "60"))
+# Banco SQLite de batalhas, recompensas e captchas (relatório: python -m bot.events); vazio desativa
+EVENTS_FILE = os.getenv("NP_EVENTS_FILE", "events.db")
+# Reciclagem do navegador: atividades por contexto, tetos de memória (MB) e tempo máximo de uma atividade (s)
+RECYCLE_CYCLES = int(os.getenv("NP_RECYCLE_CYCLES", "200"))
+MAX_PAGE_HEAP_MB = float(os.getenv("NP_MAX_PAGE_HEAP_MB", "256"))
+MAX_BROWSER_RSS_MB = float(os.getenv("NP_MAX_BROWSER_RSS_MB", "2048"))
+CYCLE_TIMEOUT = float(os.getenv("NP_CYCLE_TIMEOUT", "300"))
+# Perfil do navegador: "standard" ou "lite" (menos memória por conta, para muitas contas por máquina)
+BROWSER_PROFILE = os.getenv("NP_BROWSER_PROFILE", "standard")
+# Arquivo da frota (contas, modos, slots e limites), recarregado sem reiniciar; sem ele valem as variáveis NP_USER*
+FLEET_FILE = os.getenv("NP_FLEET_FILE", "fleet.json")
+# Processos worker da frota, cada um com o seu Chromium (0 = um por núcleo); 1 mantém tudo em um processo
+WORKERS = int(os.getenv("NP_WORKERS", "1"))
+# Pausa "humana" entre os passos de uma atividade: human (1-2s, padrão), fast (50-250ms) ou none
+LATENCY_PROFILE = os.getenv("NP_LATENCY_PROFILE", "human")
+# Modo das contas definidas por variáveis de ambiente: level, timed ou invasion
+HUNT_MODE = os.getenv("NP_HUNT_MODE", "level")
 
-if not GOOGLE_API_KEY:
-    raise ValueError("A chave API do Google (GOOGLE_API_KEY) não está configurada.")
\ No newline at end of file
+# Contas adicionais para rodar no mesmo processo: NP_USER_2/NP_PASSWORD_2, NP_USER_3/NP_PASSWORD_3, ...
+ACCOUNTS = [(USER, PASSWORD)]
+_index = 2
+while os.getenv(f"NP_USER_{_index}"):
+    ACCOUNTS.append((os.getenv(f"NP_USER_{_index}"), os.getenv(f"NP_PASSWORD_{_index}")))
+    _index += 1
@@ -1,13 +1,27 @@
+import time
+_STARTED = time.perf_counter()  # origem do tempo até a primeira ação (inclui as importações abaixo)
+import asyncio
+import atexit
 import logging
 import os
-from datetime import datetime
-import google.generativeai as genai
+from typing import Optional
 import config
-from bot.naruto_bot import NarutoBot
-
-# Configuração do Google AI (Gemini)
-genai.configure(api_key=config.GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp-01-21')
+from bot.naruto_bot import NarutoBot, CHARACTER_IDS
+from bot.fleet import run_fleet
+from bot.shard import run_sharded
+from bot.captcha_processor import CaptchaProcessor
+from bot.reference_bank import ReferenceBank
+from bot.fleet_config import FleetConfigWatcher, accounts_from_env
+from bot.supervisor import RecyclePolicy
+from bot.browser_profile import get_profile
+from bot.scheduler import DeadlineScheduler
+from bot.captcha_cache import CaptchaCache
+from bot.metrics import MetricsServer, JsonLinesWriter
+from bot.startup import StartupTimer
+from bot.gemini import GeminiClient
+from bot.rate_controller import HostRateController
+from bot.waits import get_latency_profile
+from bot.events import EventStore
 
 # Configuração de logging
 logging.basicConfig(
@@ -18,6 +32,76 @@ logging.basicConfig(
     ]
 )
 
+def make_bot_factory(startup: StartupTimer, reference_bank: Optional[ReferenceBank] = None, workers: int = 1):
+    """`make_bot` das contas de um processo (o único ou cada worker da frota)"""
+    # Um único agendador de prazos para todas as contas do processo
+    scheduler = DeadlineScheduler()
+    # As respostas confirmadas por uma conta ajudam todas as outras
+    captcha_cache = CaptchaCache()
+    profile = get_profile(config.BROWSER_PROFILE)
+    # Um só cliente do Gemini por processo; com vários workers, os limites são divididos entre eles
+    gemini_client = GeminiClient(rate=config.GEMINI_RATE / workers, burst=max(config.GEMINI_BURST // workers, 1),
+                                 max_concurrency=max(config.GEMINI_CONCURRENCY // workers, 1),
+                                 call_timeout=config.GEMINI_TIMEOUT, deadline=config.GEMINI_DEADLINE)
+    # Orçamento de requisições e circuit breaker do site, comuns a todas as contas do processo
+    rate_controller = HostRateController(rate=config.HOST_RATE / workers, burst=max(config.HOST_BURST // workers, 1))
+    latency = get_latency_profile(config.LATENCY_PROFILE)
+    # Eventos gravados em lotes por uma thread; com vários workers todos usam o mesmo arquivo (WAL)
+    events = EventStore(config.EVENTS_FILE).start() if config.EVENTS_FILE else None
+    if events is not None:
+        atexit.register(events.stop)
+
+    # Referências dos dois captchas: carregadas pela primeira conta, reaproveitadas pelas demais
+    shared = {"bank": reference_bank} if reference_bank is not None else {}
+
+    def make_bot(account):
+        bot = NarutoBot(username=account.username, password=account.password, hunt_type=account.hunt_type,
+                        slot=account.slot, limits=account.limits, scheduler=scheduler,
+                        base_url=config.BASE_URL, captcha_cache=captcha_cache, profile=profile,
+                        reference_bank=shared.get("bank"), login_solver=shared.get("solver"),
+                        gemini_client=gemini_client, rate_controller=rate_controller, latency=latency,
+                        events=events, startup=startup)
+        shared.setdefault("bank", bot.captcha_processor.reference_bank)
+        shared.setdefault("solver", bot.login_captcha_processor.local_solver)
+        return bot
+
+    return make_bot
+
 if __name__ == "__main__":
-    bot = NarutoBot(username=config.USER, password=config.PASSWORD)
-    bot.run()
\ No newline at end of file
+    startup = StartupTimer(origin=_STARTED)
+    startup.mark("imports", time.perf_counter() - _STARTED)
+    if not config.GOOGLE_API_KEY:
+        # O SDK do Gemini só é carregado se o solver local não resolver um captcha de login
+        logging.warning("GOOGLE_API_KEY não configurada: o captcha de login dependerá só do solver local.")
+
+    # Contas do arquivo da frota (recarregado em execução) ou, sem ele, das variáveis NP_USER*
+    if os.path.exists(config.FLEET_FILE):
+        watcher = FleetConfigWatcher(config.FLEET_FILE)
+        accounts = watcher.load()
+    else:
+        watcher = None
+        accounts = accounts_from_env(config.ACCOUNTS, config.HUNT_MODE)
+    if not accounts:
+        raise SystemExit(f"Nenhuma conta configurada: crie {config.FLEET_FILE} ou defina NP_USER e NP_PASSWORD.")
+
+    # Exportadores de métricas opcionais (Prometheus e/ou JSON lines)
+    metrics_server = MetricsServer(port=config.METRICS_PORT).start() if config.METRICS_PORT else None
+    metrics_writer = (JsonLinesWriter(config.METRICS_FILE, interval=config.METRICS_INTERVAL).start()
+                      if config.METRICS_FILE else None)
+    try:
+        policy = RecyclePolicy(max_cycles=config.RECYCLE_CYCLES, max_page_heap_mb=config.MAX_PAGE_HEAP_MB,
+                               max_browser_rss_mb=config.MAX_BROWSER_RSS_MB, cycle_timeout=config.CYCLE_TIMEOUT)
+        workers = min(config.WORKERS or os.cpu_count() or 1, len(accounts))
+        if workers > 1:
+            # Referências do captcha lidas uma vez aqui e publicadas em memória compartilhada para os workers
+            bank = CaptchaProcessor(list(CHARACTER_IDS)).reference_bank
+            run_sharded(accounts, make_bot_factory, workers, watcher=watcher, bank=bank, policy=policy,
+                        profile=config.BROWSER_PROFILE, metrics_port=config.METRICS_PORT)
+        else:
+            asyncio.run(run_fleet(accounts, make_bot_factory(startup), watcher=watcher, policy=policy,
+                                  profile=get_profile(config.BROWSER_PROFILE), startup=startup))
+    finally:
+        if metrics_writer:
+            metrics_writer.stop()
+        if metrics_server:
+            metrics_server.stop()
@@ -0,0 +1,87 @@
+import numpy as np
+from bot.captcha_cache import CaptchaCache, image_digest
+
+def row(value: int) -> np.ndarray:
+    return np.array([value, value + 1, value + 2], dtype=np.uint64)
+
+def test_lookup_returns_confirmed_answer():
+    cache = CaptchaCache(path=None)
+    digest = image_digest(b"captcha-1")
+    assert cache.lookup(digest) is None
+    cache.confirm(digest, "Naruto", row(1), promote=False)
+    assert cache.lookup(digest) == "Naruto"
+    assert cache.lookup(image_digest(b"captcha-2")) is None
+
+def test_lru_eviction_keeps_recently_used():
+    cache = CaptchaCache(path=None, max_entries=2)
+    a, b, c = (image_digest(data) for data in (b"a", b"b", b"c"))
+    cache.confirm(a, "Naruto", row(1), promote=False)
+    cache.confirm(b, "Sakura", row(2), promote=False)
+    cache.lookup(a)  # "a" passa a ser o mais recente
+    cache.confirm(c, "Sasuke", row(3), promote=False)
+    assert len(cache) == 2
+    assert cache.lookup(b) is None
+    assert (cache.lookup(a), cache.lookup(c)) == ("Naruto", "Sasuke")
+
+def test_promoted_rows_and_version():
+    cache = CaptchaCache(path=None)
+    version = cache.version
+    cache.confirm(image_digest(b"a"), "Naruto", row(1), promote=False)
+    assert cache.promoted_rows() == {}
+    assert cache.version == version
+    cache.confirm(image_digest(b"b"), "Naruto", row(10), promote=True)
+    cache.confirm(image_digest(b"c"), "Sakura", row(20), promote=True)
+    # Sem linha não há o que promover
+    cache.confirm(image_digest(b"d"), "Sakura", None, promote=True)
+    promoted = cache.promoted_rows()
+    assert promoted["Naruto"].tolist() == [row(10).tolist()]
+    assert promoted["Sakura"].tolist() == [row(20).tolist()]
+    assert cache.version == version + 2
+
+def test_reconfirm_without_row_keeps_known_row():
+    cache = CaptchaCache(path=None)
+    digest = image_digest(b"a")
+    cache.confirm(digest, "Naruto", row(1), promote=True)
+    cache.confirm(digest, "Naruto", None, promote=False)
+    assert cache.promoted_rows()["Naruto"].tolist() == [row(1).tolist()]
+
+def test_reject_removes_entry_and_promoted_row():
+    cache = CaptchaCache(path=None)
+    digest = image_digest(b"a")
+    cache.confirm(digest, "Naruto", row(1), promote=True)
+    version = cache.version
+    cache.reject(digest)
+    assert cache.lookup(digest) is None
+    assert cache.promoted_rows() == {}
+    assert cache.version == version + 1
+    cache.reject(digest)  # já removido: nada muda
+    assert cache.version == version + 1
+
+def test_eviction_of_promoted_row_bumps_version():
+    cache = CaptchaCache(path=None, max_entries=1)
+    cache.confirm(image_digest(b"a"), "Naruto", row(1), promote=True)
+    version = cache.version
+    cache.confirm(image_digest(b"b"), "Sakura", row(2), promote=False)
+    assert cache.promoted_rows() == {}
+    assert cache.version == version + 1
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "captcha_cache.npz")
+    cache = CaptchaCache(path=path, persist_every=1000)
+    first, second = image_digest(b"a"), image_digest(b"b")
+    cache.confirm(first, "Naruto", row(1), promote=True)
+    cache.confirm(second, "Sakura", None, promote=False)
+    cache.save()
+
+    loaded = CaptchaCache(path=path)
+    assert len(loaded) == 2
+    assert (loaded.lookup(first), loaded.lookup(second)) == ("Naruto", "Sakura")
+    assert loaded.promoted_rows()["Naruto"].tolist() == [row(1).tolist()]
+
+def test_saves_every_few_changes(tmp_path):
+    path = tmp_path / "captcha_cache.npz"
+    cache = CaptchaCache(path=str(path), persist_every=2)
+    cache.confirm(image_digest(b"a"), "Naruto", row(1), promote=False)
+    assert not path.exists()
+    cache.confirm(image_digest(b"b"), "Sakura", row(2), promote=False)
+    assert path.exists()
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+import pytest
+from bot.events import EventStore, parse_amounts, parse_outcome, report
+from bot.metrics import MetricsRegistry
+
+@pytest.mark.parametrize("text, expected", [
+    ("Você venceu! Ganhou 1.200 pontos de experiência e 35 ryous.", (1200, 35)),
+    ("Recebeu 80 exp e 10 de ouro", (80, 10)),
+    ("Nada aconteceu", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_amounts(text, expected):
+    assert parse_amounts(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("Você venceu a batalha e perdeu 12 de HP", "win"),
+    ("Você perdeu a batalha", "loss"),
+    ("A batalha empatou", "draw"),
+    ("Aguarde", None),
+])
+def test_parse_outcome(text, expected):
+    assert parse_outcome(text) == expected
+
+def test_report_aggregates_per_account_mode_and_solver(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path, flush_interval=0.05, metrics=MetricsRegistry()).start()
+    store.battle("a", "hunt", "Zabuza", "Você venceu! Ganhou 100 de experiência e 20 ryous")
+    store.battle("a", "hunt", "Haku", "Você perdeu a batalha")
+    store.invasion("a", "hunt", "Orochimaru", "Você venceu! Ganhou 50 exp")
+    store.reward("b", "timed", "Recebeu 300 pontos de experiência e 40 ryous")
+    store.captcha("a", "hunt", True)
+    store.captcha("a", "hunt", False)
+    store.captcha("a", "invasion", True)
+    store.stop()
+
+    result = report(path, account=None)
+    a, b = result["throughput"]
+    assert (a["account"], a["mode"], a["battles"], a["invasions"], a["wins"], a["losses"]) == ("a", "hunt", 2, 1, 2, 1)
+    assert (a["xp"], a["gold"], a["xp_per_hour"]) == (150, 20, 150 / a["hours"])
+    assert (b["account"], b["rewards"], b["xp"], b["gold"]) == ("b", 1, 300, 40)
+    rates = {row["solver"]: row["success_rate"] for row in result["captcha"]}
+    assert rates == {"hunt": 0.5, "invasion": 1.0}
+    assert [row["account"] for row in report(path, account="b")["throughput"]] == ["b"]
+
+def test_report_since_filters_old_events(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path, flush_interval=0.05, metrics=MetricsRegistry()).start()
+    store.battle("a", "hunt", None, "Você venceu")
+    store.stop()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("UPDATE events SET ts = ?", (time.time() - 48 * 3600,))
+    connection.close()
+    assert report(path, since_hours=24)["throughput"] == []
+    assert len(report(path)["throughput"]) == 1
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import pytest
+from bot.fleet import FleetManager
+from bot.fleet_config import (AccountConfig, AccountLimits, FleetConfigWatcher, accounts_from_env,
+                              parse_fleet_config)
+
+def test_defaults_are_merged_into_accounts():
+    accounts = parse_fleet_config({
+        "defaults": {"mode": "timed", "limits": {"max_hunts_per_day": 100}},
+        "accounts": [
+            {"username": "a", "password": "x"},
+            {"username": "b", "password": "y", "mode": "invasion", "slot": 2,
+             "limits": {"active_hours": [22, 6]}},
+        ],
+    })
+    assert accounts["a"] == AccountConfig("a", "x", "timed", 1, AccountLimits(100, None))
+    assert accounts["b"] == AccountConfig("b", "y", "invasion", 2, AccountLimits(100, (22, 6)))
+    assert accounts["b"].hunt_type == 3
+
+def test_disabled_accounts_are_skipped():
+    accounts = parse_fleet_config({"accounts": [
+        {"username": "a", "password": "x", "enabled": False},
+        {"username": "b", "password": "y"},
+    ]})
+    assert list(accounts) == ["b"]
+
+def test_password_from_environment(monkeypatch):
+    monkeypatch.setenv("NP_TEST_PASSWORD", "segredo")
+    accounts = parse_fleet_config({"accounts": [{"username": "a", "password_env": "NP_TEST_PASSWORD"}]})
+    assert accounts["a"].password == "segredo"
+
+@pytest.mark.parametrize("account, message", [
+    ({"password": "x"}, "username"),
+    ({"username": "a"}, "password"),
+    ({"username": "a", "password_env": "NP_TEST_UNSET_PASSWORD"}, "password"),
+    ({"username": "a", "password": "x", "mode": "rapido"}, "modo inválido"),
+    ({"username": "a", "password": "x", "slot": 0}, "slot"),
+    ({"username": "a", "password": "x", "limits": {"max_hunts_per_day": -1}}, "max_hunts_per_day"),
+    ({"username": "a", "password": "x", "limits": {"active_hours": [8]}}, "active_hours"),
+    ({"username": "a", "password": "x", "limits": {"max_hunts": 3}}, "desconhecidos"),
+])
+def test_invalid_accounts_are_rejected(account, message):
+    with pytest.raises(ValueError, match=message):
+        parse_fleet_config({"accounts": [account]})
+
+def test_duplicate_usernames_are_rejected():
+    with pytest.raises(ValueError, match="mais de uma vez"):
+        parse_fleet_config({"accounts": [{"username": "a", "password": "x"}, {"username": "a", "password": "y"}]})
+
+@pytest.mark.parametrize("hours, active, inactive", [
+    ((8, 18), [8, 12, 17], [7, 18, 23]),
+    ((22, 6), [22, 23, 0, 5], [6, 12, 21]),
+])
+def test_active_hours(hours, active, inactive):
+    limits = AccountLimits(active_hours=hours)
+    assert all(limits.is_active_hour(h) for h in active)
+    assert not any(limits.is_active_hour(h) for h in inactive)
+
+def test_requires_restart_only_for_password_or_slot():
+    account = AccountConfig("a", "x")
+    assert not account.requires_restart(AccountConfig("a", "x", "timed", 1, AccountLimits(5)))
+    assert account.requires_restart(AccountConfig("a", "y"))
+    assert account.requires_restart(AccountConfig("a", "x", slot=2))
+
+def test_accounts_from_env():
+    accounts = accounts_from_env([("a", "x"), (None, None), ("b", "y")], "invasion")
+    assert list(accounts) == ["a", "b"]
+    assert accounts["b"].mode == "invasion"
+    with pytest.raises(ValueError):
+        accounts_from_env([("a", "x")], "rapido")
+
+def test_watcher_reloads_on_change_and_keeps_config_on_error(tmp_path):
+    path = tmp_path / "fleet.json"
+    path.write_text(json.dumps({"accounts": [{"username": "a", "password": "x"}]}))
+    watcher = FleetConfigWatcher(str(path))
+    assert list(watcher.load()) == ["a"]
+    assert watcher.poll() is None  # sem mudança
+
+    def rewrite(content: str, tick: int) -> None:
+        path.write_text(content)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + tick * 10 ** 9))
+
+    rewrite(json.dumps({"accounts": [{"username": "a", "password": "x"}, {"username": "b", "password": "y"}]}), 1)
+    assert list(watcher.poll()) == ["a", "b"]
+    rewrite("{inválido", 2)
+    assert watcher.poll() is None
+
+class FakeBot:
+    def __init__(self, account: AccountConfig):
+        self.username = account.username
+        self.applied = []
+
+    async def run(self, supervisor) -> None:
+        await asyncio.Event().wait()
+
+    def apply_config(self, account: AccountConfig) -> None:
+        self.applied.append(account)
+
+def test_fleet_manager_applies_only_the_differences():
+    async def scenario():
+        built = []
+
+        def make_bot(account):
+            bot = FakeBot(account)
+            built.append(account.username)
+            return bot
+
+        manager = FleetManager(supervisor=None, make_bot=make_bot)
+        await manager.apply({"a": AccountConfig("a", "x"), "b": AccountConfig("b", "y"), "c": AccountConfig("c", "z")})
+        assert sorted(built) == ["a", "b", "c"]
+        bot_a, task_b = manager.bots["a"], manager.tasks["b"]
+
+        changed_mode = AccountConfig("a", "x", "invasion")
+        await manager.apply({"a": changed_mode, "b": AccountConfig("b", "y2"), "d": AccountConfig("d", "w")})
+        # Modo alterado: aplicado sem reiniciar; senha alterada: reinicia; removida: para; nova: começa
+        assert manager.bots["a"] is bot_a and bot_a.applied == [changed_mode]
+        assert task_b.cancelled() and manager.tasks["b"] is not task_b
+        assert "c" not in manager.tasks
+        assert sorted(built) == ["a", "b", "b", "c", "d"]
+        assert manager.accounts["a"] == changed_mode
+        await manager.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,127 @@
+import asyncio
+import os
+from string import Template
+from bot.game_state import parse_game_state, parse_timer, read_page_state
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "pages")
+
+def render(name: str, **values) -> str:
+    """Página do servidor de testes (benchmarks/pages) dentro do layout"""
+    def template(page: str) -> Template:
+        with open(os.path.join(PAGES_DIR, f"{page}.html"), encoding="utf-8") as f:
+            return Template(f.read())
+    return template("layout").safe_substitute(content=template(name).safe_substitute(**values))
+
+def test_parse_timer():
+    assert parse_timer("Você precisa aguardar 01:02:03") == 3723
+    assert parse_timer("Inativo") is None
+    assert parse_timer(None) is None
+
+def test_status_page():
+    state = parse_game_state(render("status", hp=35, max_hp=120, doujutsu_name="Rinnegan",
+                                    doujutsu_timer="00:10:00"))
+    assert state.hp == (35, 120)
+    assert state.doujutsu_name == "Rinnegan"
+    assert state.doujutsu_remaining == 600
+    assert not state.reward_available
+
+def test_status_page_without_doujutsu():
+    state = parse_game_state(render("status", hp=120, max_hp=120, doujutsu_name="Rinnegan", doujutsu_timer="Inativo"))
+    assert state.doujutsu_remaining is None
+
+def test_invasion_page():
+    waiting = parse_game_state(render("invasao", captcha="", invasion="00:05:30"))
+    assert not waiting.invasion_available
+    assert waiting.invasion_remaining == 330
+    ready = parse_game_state(render("invasao", captcha="", invasion="Atacar!"))
+    assert ready.invasion_available
+    assert ready.invasion_remaining == 0
+
+def test_hunt_penalty_and_error_pages():
+    assert parse_game_state(render("timer", timer="00:02:00")).hunt_remaining == 120
+    assert parse_game_state(render("cacadas_nivel", captcha="")).hunt_remaining == 0
+    assert parse_game_state(render("aviso", error="Você está sem HP")).error_text == "Você está sem HP"
+
+def test_hunt_result_page():
+    state = parse_game_state(render("cacadas_resultado", enemy="Zabuza",
+                                    result="Você venceu! Ganhou 100 de experiência"))
+    assert state.enemy_name == "Zabuza"
+    # Só o primeiro resultado da coluna da batalha
+    assert state.battle_text == "Você venceu! Ganhou 100 de experiência"
+
+def test_timed_hunt_pages():
+    body = '<a id="receber_m" href="?p=cacadas&action=tempo&receber=1"><img src="/static/receber.png"></a>'
+    assert parse_game_state(render("cacadas_tempo", body=body, reward="")).reward_available
+    running = parse_game_state(render("cacadas_tempo", body='<span id="relogio_contador">00:30:00</span>',
+                                      reward=""))
+    assert not running.reward_available
+    assert running.hunt_remaining == 1800
+    reward = '<div class="cacada_recompensa">Você recebeu 120 de experiência e 200 ryous.</div>'
+    received = parse_game_state(render("cacadas_tempo", body="", reward=reward))
+    assert received.reward_text == "Você recebeu 120 de experiência e 200 ryous."
+
+def test_missing_fields_and_unclosed_tags():
+    state = parse_game_state('<div id="corpo"><p>Sem nada aqui<div id="hp_baixo"><span class="hp_xp">10 / 50'
+                             '</div><div id="error">Aviso</div>')
+    assert state.hp == (10, 50)
+    assert state.invasion_text is None
+    assert state.error_text == "Aviso"
+    assert parse_game_state('<div id="hp_baixo"><span class="hp_xp">--</span></div>').hp is None
+
+class FakeFrame:
+    pass
+
+class FakePage:
+    """Página que devolve um resultado fixo do script de leitura e conta as chamadas"""
+
+    def __init__(self, texts: dict, flags: dict, ready: bool = True):
+        self.main_frame = FakeFrame()
+        self.result = {"ready": ready, "texts": texts, "flags": flags}
+        self.evaluations = 0
+        self.handlers = []
+
+    def on(self, event: str, handler) -> None:
+        assert event == "framenavigated"
+        self.handlers.append(handler)
+
+    def navigate(self, frame=None) -> None:
+        for handler in self.handlers:
+            handler(frame or self.main_frame)
+
+    async def wait_for_load_state(self, state: str) -> None:
+        pass
+
+    async def evaluate(self, script: str, arguments: dict) -> dict:
+        self.evaluations += 1
+        # O script recebe um seletor CSS por campo
+        assert arguments["texts"]["hp_text"] == "#hp_baixo .hp_xp"
+        return self.result
+
+def test_page_snapshot_reads_once_per_navigation():
+    async def scenario():
+        page = FakePage({"hp_text": " 35 /\n120 ", "invasion_text": None}, {"reward_available": False})
+        state = await read_page_state(page)
+        assert state.hp == (35, 120)
+        assert state.invasion_text is None
+        await read_page_state(page)
+        assert page.evaluations == 1
+        # Um iframe navegando não invalida; o frame principal sim
+        page.navigate(FakeFrame())
+        await read_page_state(page)
+        assert page.evaluations == 1
+        page.navigate()
+        await read_page_state(page)
+        assert page.evaluations == 2
+        await read_page_state(page, refresh=True)
+        assert page.evaluations == 3
+
+    asyncio.run(scenario())
+
+def test_page_snapshot_is_not_kept_while_loading():
+    async def scenario():
+        page = FakePage({"hp_text": "1 / 2"}, {"reward_available": True}, ready=False)
+        assert (await read_page_state(page)).reward_available
+        await read_page_state(page)
+        assert page.evaluations == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from benchmarks.gemini_stub import StubModel, StubResponse
+from bot.gemini import GeminiClient
+from bot.metrics import MetricsRegistry
+
+def clean(text: str):
+    answer = text.replace(" ", "")
+    return answer if len(answer) == 5 else None
+
+class ScriptedModel:
+    """Modelo que segue um roteiro por chamada: texto, exceção ou "hang" (trava até o timeout)"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def generate_content_async(self, parts):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if step == "hang":
+            await asyncio.sleep(3600)
+        if isinstance(step, Exception):
+            raise step
+        return StubResponse(step)
+
+def make_client(model, **options) -> GeminiClient:
+    options = {"rate": 1000, "burst": 1000, "backoff": 0.01, "max_backoff": 0.01, **options}
+    return GeminiClient(model_factory=lambda: model, metrics=MetricsRegistry(), **options)
+
+def test_valid_answer_and_single_model_handle():
+    async def scenario():
+        created = []
+
+        def factory():
+            created.append(1)
+            time.sleep(0.05)  # a criação do modelo roda fora do loop
+            return StubModel(latency=0.01, jitter=0)
+
+        client = GeminiClient(model_factory=factory, rate=1000, burst=1000, metrics=MetricsRegistry())
+        answers = await asyncio.gather(*(client.generate(["captcha"], validate=clean) for _ in range(5)))
+        assert answers == ["AB12C"] * 5
+        assert created == [1]
+        assert client.counts == {"ok": 5}
+
+    asyncio.run(scenario())
+
+def test_concurrency_is_limited_by_the_semaphore():
+    async def scenario():
+        model = StubModel(latency=0.02, jitter=0)
+        client = make_client(model, max_concurrency=2)
+        await asyncio.gather(*(client.generate(["captcha"], validate=clean) for _ in range(8)))
+        assert model.calls == 8
+        assert model.max_in_flight == 2
+
+    asyncio.run(scenario())
+
+def test_errors_and_timeouts_are_retried():
+    async def scenario():
+        model = ScriptedModel(ConnectionError("falha"), "hang", "K 7 M 2 P")
+        client = make_client(model, call_timeout=0.05, retries=2)
+        assert await client.generate(["captcha"], validate=clean) == "K7M2P"
+        assert client.counts == {"error": 1, "timeout": 1, "retry": 2, "ok": 1}
+
+    asyncio.run(scenario())
+
+def test_invalid_answer_is_not_retried():
+    async def scenario():
+        model = ScriptedModel("não sei", "K7M2P")
+        client = make_client(model)
+        assert await client.generate(["captcha"], validate=clean) is None
+        assert model.calls == 1
+        assert client.counts == {"invalid": 1}
+
+    asyncio.run(scenario())
+
+def test_deadline_bounds_the_whole_request():
+    async def scenario():
+        client = make_client(ScriptedModel("hang"), call_timeout=10, retries=5, deadline=0.2)
+        start = time.perf_counter()
+        assert await client.generate(["captcha"], validate=clean) is None
+        assert time.perf_counter() - start < 1.0
+        assert client.counts["timeout"] >= 1
+
+    asyncio.run(scenario())
+
+def test_waiting_for_a_slot_counts_against_the_deadline():
+    async def scenario():
+        client = make_client(ScriptedModel("hang"), max_concurrency=1, call_timeout=0.5, retries=0, deadline=5)
+        busy = asyncio.create_task(client.generate(["captcha"]))
+        await asyncio.sleep(0.01)
+        assert await client.generate(["captcha"], deadline=0.05) is None
+        assert client.counts == {"throttled": 1}
+        assert await busy is None
+
+    asyncio.run(scenario())
+
+def test_rate_limit_throttles_when_budget_does_not_fit_deadline():
+    async def scenario():
+        client = make_client(StubModel(latency=0, jitter=0), rate=0.1, burst=1)
+        assert await client.generate(["captcha"], validate=clean) == "AB12C"
+        assert await client.generate(["captcha"], validate=clean, deadline=0.05) is None
+        assert client.counts == {"ok": 1, "throttled": 1}
+
+    asyncio.run(scenario())
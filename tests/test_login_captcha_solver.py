@@ -0,0 +1,64 @@
+import io
+import random
+import pytest
+from PIL import Image
+from benchmarks.mock_server import render_login_captcha
+from bot.login_captcha_solver import LocalCaptchaSolver, segment_glyphs
+
+ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+
+@pytest.fixture(scope="module")
+def solver(tmp_path_factory) -> LocalCaptchaSolver:
+    """Solver treinado com captchas rotulados desenhados pelo servidor de testes"""
+    directory = tmp_path_factory.mktemp("login_captchas")
+    rng = random.Random(7)
+    for i in range(40):
+        text = "".join(rng.choice(ALPHABET) for _ in range(5))
+        (directory / f"{text}_{i}.png").write_bytes(render_login_captcha(text, rng))
+    (directory / "sem_rotulo.png").write_bytes(render_login_captcha("ABCDE", rng))  # ignorado
+    solver = LocalCaptchaSolver(bank_path=None)
+    assert solver.train(str(directory)) == 40 * 5
+    return solver
+
+def blank_image() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (120, 40), (230, 230, 230)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_segments_five_glyphs():
+    assert len(segment_glyphs(render_login_captcha("K7M2P", random.Random(1)))) == 5
+
+def test_confident_answers_are_right(solver):
+    rng = random.Random(99)
+    confident = correct = 0
+    for _ in range(100):
+        text = "".join(rng.choice(ALPHABET) for _ in range(5))
+        solution = solver.solve(render_login_captcha(text, rng))
+        assert len(solution.confidences) == len(solution.margins) == 5
+        if solution.confident:
+            confident += 1
+            correct += solution.text == text
+    # O solver responde sozinho boa parte das vezes e quase nunca erra quando responde
+    assert confident >= 30
+    assert correct >= 0.95 * confident
+
+def test_abstains_when_confidence_is_too_low(solver):
+    strict = LocalCaptchaSolver(bank_path=None, min_confidence=1.01)
+    strict.templates, strict.labels = solver.templates, solver.labels
+    solution = strict.solve(render_login_captcha("K7M2P", random.Random(3)))
+    assert solution is not None
+    assert not solution.confident
+
+def test_abstains_without_glyphs_or_templates(solver):
+    # Captcha em branco (imagem que não carregou): nada para segmentar, sem erro
+    assert solver.solve(blank_image()) is None
+    assert LocalCaptchaSolver(bank_path=None).solve(render_login_captcha("K7M2P")) is None
+
+def test_bank_save_and_load(solver, tmp_path):
+    path = str(tmp_path / "login_glyphs.npz")
+    solver.save(path)
+    loaded = LocalCaptchaSolver(bank_path=path)
+    assert loaded.ready
+    assert len(loaded.labels) == len(solver.labels)
+    image = render_login_captcha("HN3TX", random.Random(5))
+    assert loaded.solve(image).text == solver.solve(image).text
@@ -0,0 +1,167 @@
+import asyncio
+import pytest
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from bot.metrics import MetricsRegistry
+from bot.rate_controller import (BackoffPolicy, CircuitBreaker, HostRateController, SessionLost, CAPTCHA, ELEMENT,
+                                 GAME, NETWORK, SESSION, TIMEOUT, UNKNOWN, classify_error)
+
+HOST = "www.narutoplayers.com.br"
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def no_jitter(**options):
+    return {cls: BackoffPolicy(base, cap, jitter=0.0) for cls, (base, cap) in options.items()}
+
+def make_controller(clock=None, **options) -> HostRateController:
+    policies = no_jitter(network=(2, 120), timeout=(10, 300), captcha=(1, 15), game=(5, 60),
+                         element=(5, 120), session=(1, 30), unknown=(5, 120))
+    return HostRateController(policies=policies, clock=clock or Clock(), metrics=MetricsRegistry(), **options)
+
+def test_backoff_policy_grows_exponentially_up_to_cap():
+    policy = BackoffPolicy(base=2, cap=20, jitter=0.0)
+    assert [policy.delay(n) for n in range(1, 6)] == [2, 4, 8, 16, 20]
+
+def test_backoff_policy_jitter_stays_in_range():
+    policy = BackoffPolicy(base=10, cap=10, jitter=0.5)
+    delays = [policy.delay(1) for _ in range(200)]
+    assert all(5 <= delay <= 15 for delay in delays)
+
+@pytest.mark.parametrize("error, expected", [
+    (SessionLost(), SESSION),
+    (asyncio.TimeoutError(), TIMEOUT),
+    (PlaywrightTimeoutError('Page.goto: Timeout 30000ms exceeded.\nCall log:\n  - navigating to "https://x/"'), TIMEOUT),
+    (PlaywrightTimeoutError('Timeout 30000ms exceeded.\n=== logs ===\nwaiting for navigation until "load"'), TIMEOUT),
+    (PlaywrightTimeoutError("APIRequestContext.get: Timeout 10000ms exceeded."), TIMEOUT),
+    (PlaywrightTimeoutError("Page.wait_for_selector: Timeout 30000ms exceeded.\nCall log:\n"
+                            "  - waiting for locator(\"#relogio_invasao\") to be visible"), ELEMENT),
+    (PlaywrightTimeoutError("Locator.click: Timeout 30000ms exceeded."), ELEMENT),
+    (ConnectionResetError(), NETWORK),
+    (PlaywrightError("net::ERR_CONNECTION_REFUSED at https://x"), NETWORK),
+    (PlaywrightError("Target page, context or browser has been closed"), SESSION),
+    (RuntimeError("HTTP 503 em status"), NETWORK),
+    (ValueError("outra coisa"), UNKNOWN),
+])
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
+
+def test_backoff_grows_per_account_and_class():
+    controller = make_controller()
+    assert [controller.backoff("a", NETWORK) for _ in range(3)] == [2, 4, 8]
+    # Outra classe e outra conta começam do primeiro passo
+    assert controller.backoff("a", CAPTCHA) == 1
+    assert controller.backoff("b", NETWORK) == 2
+
+def test_succeeded_resets_only_given_classes():
+    controller = make_controller()
+    controller.backoff("a", NETWORK)
+    controller.backoff("a", NETWORK)
+    controller.backoff("a", CAPTCHA)
+    controller.backoff("a", CAPTCHA)
+    controller.succeeded("a", CAPTCHA, GAME)
+    assert controller.backoff("a", CAPTCHA) == 1
+    assert controller.backoff("a", NETWORK) == 8
+
+def test_succeeded_without_classes_resets_all():
+    controller = make_controller()
+    controller.backoff("a", NETWORK)
+    controller.backoff("a", TIMEOUT)
+    controller.succeeded("a")
+    assert controller.backoff("a", NETWORK) == 2
+    assert controller.backoff("a", TIMEOUT) == 10
+
+def test_breaker_opens_after_threshold_within_window():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=3, window=60, open_seconds=30, clock=clock)
+    assert not breaker.record_failure()
+    clock.now += 61  # a primeira falha sai da janela
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(30)
+
+def test_breaker_half_open_releases_a_single_probe():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, open_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.retry_after() == 0  # a sonda
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.retry_after() == pytest.approx(30)  # os demais esperam o resultado
+    assert breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.retry_after() == 0
+
+def test_breaker_failed_probe_doubles_open_period():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, open_seconds=30, max_open_seconds=100, clock=clock)
+    breaker.record_failure()
+    for expected in (60, 100):
+        clock.now += breaker.remaining()
+        assert breaker.retry_after() == 0
+        assert breaker.record_failure()
+        assert breaker.remaining() == pytest.approx(expected)
+
+def test_remaining_has_no_side_effect():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, open_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.remaining() == 0
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_host_failures_feed_the_breaker_and_delay_backoff():
+    clock = Clock()
+    controller = make_controller(clock, failure_threshold=2, open_seconds=30)
+    controller.backoff("a", NETWORK, HOST)
+    assert controller.retry_after(HOST) == 0
+    delay = controller.backoff("b", TIMEOUT, HOST)
+    assert controller.retry_after(HOST) == pytest.approx(30)
+    # Ninguém volta antes do circuito permitir
+    assert controller.backoff("c", NETWORK, HOST) >= 30
+    assert delay == 30
+
+def test_captcha_failures_do_not_touch_the_breaker():
+    controller = make_controller(failure_threshold=1)
+    controller.backoff("a", CAPTCHA, HOST)
+    controller.backoff("a", GAME, HOST)
+    assert controller.retry_after(HOST) == 0
+
+def test_element_timeouts_do_not_touch_the_breaker():
+    controller = make_controller(failure_threshold=1)
+    controller.backoff("a", ELEMENT, HOST)
+    controller.backoff("b", ELEMENT, HOST)
+    assert controller.retry_after(HOST) == 0
+
+def test_record_response_5xx_is_a_host_failure():
+    clock = Clock()
+    controller = make_controller(clock, failure_threshold=2)
+    controller.record_response(HOST, 502)
+    controller.record_response(HOST, 200)  # sucesso zera as falhas seguidas
+    controller.record_response(HOST, 503)
+    assert controller.retry_after(HOST) == 0
+    controller.record_response(HOST, 500)
+    assert controller.retry_after(HOST) > 0
+
+def test_acquire_waits_for_budget():
+    async def scenario():
+        clock = Clock()
+        controller = make_controller(clock, rate=2, burst=2)
+        slept = []
+
+        async def sleep(seconds):
+            slept.append(seconds)
+            clock.now += seconds
+
+        await controller.acquire(HOST)
+        controller._buckets[HOST]._sleep = sleep
+        await controller.acquire(HOST)
+        await controller.acquire(HOST)
+        assert slept == [pytest.approx(0.5)]
+
+    asyncio.run(scenario())
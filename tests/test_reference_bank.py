@@ -0,0 +1,141 @@
+import struct
+import numpy as np
+import pytest
+from bot.reference_bank import (ReferenceBank, HASH_FILE_HEADER, HASH_VERSION, popcount, read_hash_file,
+                                write_hash_file)
+
+NARUTO = [0x8bf8e48d1cc4bc74, 0xf179793919393939, 0xa389cbf3f3f3eb73]
+SAKURA = [0x0f0f0f0f0f0f0f0f, 0x00ff00ff00ff00ff, 0x3c3c3c3c3c3c3c3c]
+
+def flip(row, bits):
+    """A linha com os `bits` mais baixos de cada hash invertidos"""
+    mask = (1 << bits) - 1
+    return [value ^ mask for value in row]
+
+def test_popcount():
+    values = np.array([0, 1, 0xff, 0xffffffffffffffff], dtype=np.uint64)
+    assert popcount(values).tolist() == [0, 1, 8, 64]
+
+def make_bank(threshold: int = 30) -> ReferenceBank:
+    bank = ReferenceBank(threshold=threshold)
+    bank.add_rows("Naruto", [NARUTO])
+    bank.add_rows("Sakura", [SAKURA])
+    return bank
+
+def test_match_picks_nearest_character_and_runner_up():
+    result = make_bank().match_rows(np.array([flip(NARUTO, 2)], dtype=np.uint64))[0]
+    assert result.character == "Naruto"
+    assert result.distance == 6
+    assert result.runner_up == "Sakura"
+    assert result.margin == result.runner_up_distance - 6
+    assert result.accepted
+
+def test_match_respects_threshold():
+    result = make_bank(threshold=5).match_rows(np.array([flip(NARUTO, 2)], dtype=np.uint64))[0]
+    assert result.character == "Naruto"
+    assert not result.accepted
+
+def test_match_dict_api_matches_rows_api():
+    bank = make_bank()
+    hashes = dict(zip(("phash", "ahash", "dhash"), flip(SAKURA, 1)))
+    assert bank.match(hashes) == bank.match_rows(np.array([flip(SAKURA, 1)], dtype=np.uint64))[0]
+
+def test_interleaved_adds_are_grouped_per_character():
+    bank = ReferenceBank()
+    bank.add_rows("Naruto", [NARUTO])
+    bank.add_rows("Sakura", [SAKURA])
+    bank.add_rows("Naruto", [flip(SAKURA, 3)])  # uma variação de Naruto parecida com Sakura
+    assert bank.counts() == {"Naruto": 2, "Sakura": 1}
+    # O mínimo por personagem (reduceat) considera todas as referências do grupo
+    result = bank.match_rows(np.array([flip(SAKURA, 3)], dtype=np.uint64))[0]
+    assert (result.character, result.distance) == ("Naruto", 0)
+    assert (result.runner_up, result.runner_up_distance) == ("Sakura", 9)
+
+def test_characters_without_rows_are_skipped(tmp_path):
+    bank = ReferenceBank()
+    bank.add_rows("Naruto", [NARUTO])
+    bank.add_rows("Kakashi", [])  # arquivo de hashes só com o cabeçalho
+    bank.add_rows("Sakura", [SAKURA])
+    assert bank.counts() == {"Naruto": 1, "Sakura": 1}
+    assert bank.match_rows(np.array([SAKURA], dtype=np.uint64))[0].character == "Sakura"
+    path = str(tmp_path / "bank.bin")
+    bank.save(path)
+    assert ReferenceBank.load(path).counts() == {"Naruto": 1, "Sakura": 1}
+
+def test_bank_with_only_empty_characters_is_empty():
+    bank = ReferenceBank()
+    bank.add_rows("Kakashi", [])
+    assert bank.counts() == {}
+    assert len(bank) == 0
+    assert bank.match_rows(np.array([NARUTO], dtype=np.uint64)) == [None]
+
+def test_batch_matches_each_query():
+    queries = np.array([NARUTO, SAKURA, flip(NARUTO, 1)], dtype=np.uint64)
+    results = make_bank().match_rows(queries)
+    assert [r.character for r in results] == ["Naruto", "Sakura", "Naruto"]
+    assert [r.distance for r in results] == [0, 0, 3]
+
+def test_empty_bank_or_batch():
+    assert ReferenceBank().match_rows(np.array([NARUTO], dtype=np.uint64)) == [None]
+    assert make_bank().match_batch([]) == []
+
+def test_extended_does_not_change_original():
+    bank = make_bank()
+    extended = bank.extended({"Sakura": np.array([flip(NARUTO, 1)], dtype=np.uint64)})
+    assert extended.counts() == {"Naruto": 1, "Sakura": 2}
+    assert bank.counts() == {"Naruto": 1, "Sakura": 1}
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_roundtrip(tmp_path, mmap):
+    bank = make_bank()
+    bank.add_rows("Naruto", [flip(NARUTO, 4)])
+    path = str(tmp_path / "bank.bin")
+    bank.save(path)
+    loaded = ReferenceBank.load(path, threshold=30, mmap=mmap)
+    assert loaded.counts() == bank.counts()
+    queries = np.array([flip(NARUTO, 3), SAKURA], dtype=np.uint64)
+    assert loaded.match_rows(queries) == bank.match_rows(queries)
+
+def test_load_refuses_other_formats(tmp_path):
+    path = tmp_path / "bank.bin"
+    make_bank().save(str(path))
+    data = path.read_bytes()
+
+    # Formato 1: hashes anteriores ao pré-processamento atual
+    path.write_bytes(data[:4] + struct.pack("<H", 1) + data[6:])
+    with pytest.raises(ValueError, match="reconstrua"):
+        ReferenceBank.load(str(path))
+
+    path.write_bytes(data[:6] + struct.pack("<H", HASH_VERSION + 1) + data[8:])
+    with pytest.raises(ValueError, match="versão"):
+        ReferenceBank.load(str(path))
+
+    path.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        ReferenceBank.load(str(path))
+
+def test_hash_file_roundtrip(tmp_path):
+    path = str(tmp_path / "naruto_hashes.txt")
+    write_hash_file(path, [NARUTO, SAKURA])
+    with open(path) as f:
+        assert f.readline().strip() == HASH_FILE_HEADER.format(HASH_VERSION)
+    assert read_hash_file(path) == [NARUTO, SAKURA]
+
+def test_hash_file_without_version_is_refused(tmp_path):
+    path = tmp_path / "naruto_hashes.txt"
+    path.write_text("".join(f"{value:016x}\n" for value in NARUTO))
+    with pytest.raises(ValueError, match="versão 1"):
+        read_hash_file(str(path))
+
+def test_shared_memory_roundtrip():
+    bank = make_bank()
+    segment, descriptor = bank.share()
+    try:
+        attached = ReferenceBank.attach(descriptor)
+        assert attached.counts() == bank.counts()
+        queries = np.array([flip(SAKURA, 2)], dtype=np.uint64)
+        assert attached.match_rows(queries) == bank.match_rows(queries)
+        del attached
+    finally:
+        segment.close()
+        segment.unlink()
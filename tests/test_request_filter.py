@@ -0,0 +1,143 @@
+import asyncio
+from typing import Optional
+import pytest
+from bot.browser_profile import LITE, STANDARD
+from bot.request_filter import RequestFilter, is_captcha_page
+
+SITE = "https://www.narutoplayers.com.br"
+
+@pytest.mark.parametrize("url, resource_type, rule", [
+    ("https://www.googletagmanager.com/gtm.js", "script", "ad_host"),
+    ("https://stats.g.doubleclick.net/collect", "xhr", "ad_host"),
+    (f"{SITE}/fonts/naruto.woff2", "font", "type:font"),
+    (f"{SITE}/video/intro.mp4", "media", "type:media"),
+    ("https://cdn.example.com/js/ads.js", "script", "ad_url"),
+    (f"{SITE}/img/banner-topo.png", "image", "ad_url"),
+    ("https://cdn.example.com/img/avatar.png", "image", "third_party_image"),
+    ("https://cdn.example.com/captcha/7.png", "image", None),
+    (f"{SITE}/?p=status", "document", None),
+    (f"{SITE}/js/jquery.js", "script", None),
+    (f"{SITE}/img/personagem.png", "image", None),
+    ("https://cdn.example.com/estilo.css", "stylesheet", None),
+    ("data:image/png;base64,AAAA", "image", None),
+])
+def test_classify_default_policy(url, resource_type, rule):
+    assert RequestFilter(site_host="www.narutoplayers.com.br").classify(url, resource_type) == rule
+
+def test_classify_subdomains_and_site_host():
+    request_filter = RequestFilter(site_host="www.narutoplayers.com.br", block_third_party_stylesheets=True)
+    assert request_filter.classify("https://connect.facebook.net/sdk.js", "script") == "ad_host"
+    assert request_filter.classify("https://notfacebook.net/x.js", "script") is None
+    assert request_filter.classify("https://cdn.example.com/estilo.css", "stylesheet") == "third_party_stylesheet"
+    assert request_filter.classify("https://narutoplayers.com.br/estilo.css", "stylesheet") is None
+    assert request_filter.classify("https://img.narutoplayers.com.br/a.png", "image") is None
+
+@pytest.mark.parametrize("page_url, expected", [
+    (f"{SITE}/", True),
+    (f"{SITE}/?aviso=1", True),
+    (f"{SITE}/?p=cacadas&action=tempo", True),
+    (f"{SITE}/?p=invasao", True),
+    (f"{SITE}/?p=status", False),
+    (None, False),
+])
+def test_captcha_pages(page_url, expected):
+    assert is_captcha_page(page_url) == expected
+
+@pytest.mark.parametrize("page_url, rule", [
+    (f"{SITE}/", None),                               # login: captcha de login
+    (f"{SITE}/?p=cacadas&action=nivel", None),        # captcha de caçada e botão de receber
+    (f"{SITE}/?p=invasao", None),                     # captcha do invasor
+    (f"{SITE}/?p=status", "site_image"),
+    (None, "site_image"),
+])
+def test_lite_profile_blocks_site_images_outside_captcha_pages(page_url, rule):
+    request_filter = LITE.request_filter("www.narutoplayers.com.br")
+    assert request_filter.classify(f"{SITE}/img/qualquer.png", "image", page_url) == rule
+
+def test_standard_profile_keeps_site_images():
+    request_filter = STANDARD.request_filter("www.narutoplayers.com.br")
+    assert request_filter.classify(f"{SITE}/img/qualquer.png", "image", f"{SITE}/?p=status") is None
+
+class FakeFrame:
+    def __init__(self, url: str):
+        self.url = url
+
+class FakeRequest:
+    def __init__(self, url: str, resource_type: str, frame_url: Optional[str] = None):
+        self.url = url
+        self.resource_type = resource_type
+        self._frame_url = frame_url
+
+    @property
+    def frame(self) -> FakeFrame:
+        if self._frame_url is None:
+            raise RuntimeError("requisição sem frame")
+        return FakeFrame(self._frame_url)
+
+class FakeRoute:
+    def __init__(self, url: str, resource_type: str, frame_url: Optional[str] = None):
+        self.request = FakeRequest(url, resource_type, frame_url)
+        self.result = None
+
+    async def continue_(self) -> None:
+        self.result = "continue"
+
+    async def abort(self) -> None:
+        self.result = "abort"
+
+class FakeResponse:
+    def __init__(self, url: str, resource_type: str, size: int, status: int = 200):
+        self.url = url
+        self.status = status
+        self.request = FakeRequest(url, resource_type)
+        self.headers = {"content-length": str(size)}
+
+class FakeRateController:
+    def __init__(self):
+        self.acquired = []
+        self.responses = []
+
+    async def acquire(self, host: str) -> None:
+        self.acquired.append(host)
+
+    def record_response(self, host: str, status: int) -> None:
+        self.responses.append((host, status))
+
+def test_handle_counts_blocked_requests_and_estimates_savings():
+    async def scenario():
+        request_filter = RequestFilter()
+        request_filter.observe_response(FakeResponse("https://cdn.example.com/a.woff2", "font", 3000))
+        request_filter.observe_response(FakeResponse("https://cdn.example.com/b.woff2", "font", 1000))
+        routes = [FakeRoute(f"{SITE}/f{i}.woff2", "font") for i in range(3)]
+        routes.append(FakeRoute(f"{SITE}/?p=status", "document"))
+        for route in routes:
+            await request_filter.handle(route)
+        assert [route.result for route in routes] == ["abort"] * 3 + ["continue"]
+        assert request_filter.summary() == {"type:font": {"requests": 3, "estimated_bytes": 6000.0}}
+
+    asyncio.run(scenario())
+
+def test_handle_decides_site_images_by_the_requesting_frame():
+    async def scenario():
+        request_filter = LITE.request_filter("www.narutoplayers.com.br")
+        image = f"{SITE}/img/captcha_7.png"
+        routes = [FakeRoute(image, "image", f"{SITE}/?p=cacadas"), FakeRoute(image, "image", f"{SITE}/?p=status"),
+                  FakeRoute(image, "image")]
+        for route in routes:
+            await request_filter.handle(route)
+        assert [route.result for route in routes] == ["continue", "abort", "abort"]
+
+    asyncio.run(scenario())
+
+def test_site_navigations_spend_the_host_budget():
+    async def scenario():
+        rate = FakeRateController()
+        request_filter = RequestFilter(site_host="www.narutoplayers.com.br", rate_controller=rate)
+        for url, resource_type in ((f"{SITE}/?p=status", "document"), (f"{SITE}/img/a.png", "image"),
+                                   ("https://cdn.example.com/api", "fetch")):
+            await request_filter.handle(FakeRoute(url, resource_type))
+        assert rate.acquired == ["www.narutoplayers.com.br"]
+        request_filter.observe_response(FakeResponse(f"{SITE}/?p=status", "document", 10, status=503))
+        assert rate.responses == [("www.narutoplayers.com.br", 503)]
+
+    asyncio.run(scenario())
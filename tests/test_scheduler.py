@@ -0,0 +1,90 @@
+import asyncio
+from bot.scheduler import DeadlineScheduler, DOUJUTSU, HUNT, INVASION
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_earliest_deadline_comes_first():
+    clock = Clock()
+    scheduler = DeadlineScheduler(clock=clock)
+    scheduler.schedule("a", HUNT, 300)
+    scheduler.schedule("a", INVASION, 60)
+    scheduler.schedule("a", DOUJUTSU, 120)
+    assert scheduler.peek("a") == (60, INVASION)
+
+def test_reschedule_replaces_previous_deadline():
+    clock = Clock()
+    scheduler = DeadlineScheduler(clock=clock)
+    scheduler.schedule("a", HUNT, 300)
+    scheduler.schedule("a", HUNT, 30)
+    scheduler.schedule("a", INVASION, 100)
+    assert scheduler.deadline("a", HUNT) == 30
+    assert scheduler.pending("a") == {HUNT: 30, INVASION: 100}
+    # A entrada antiga (300) continua no heap, mas é descartada ao chegar ao topo
+    scheduler.schedule("a", HUNT, 500)
+    assert scheduler.peek("a") == (100, INVASION)
+
+def test_cancel_and_remove_account():
+    scheduler = DeadlineScheduler(clock=Clock())
+    scheduler.schedule("a", HUNT, 10)
+    scheduler.schedule("a", INVASION, 20)
+    scheduler.schedule("b", HUNT, 5)
+    scheduler.cancel("a", HUNT)
+    assert scheduler.peek("a") == (20, INVASION)
+    scheduler.remove_account("a")
+    assert scheduler.peek("a") is None
+    assert scheduler.pending("b") == {HUNT: 5}
+
+def test_accounts_are_independent():
+    scheduler = DeadlineScheduler(clock=Clock())
+    scheduler.schedule("a", HUNT, 10)
+    scheduler.schedule("b", HUNT, 1)
+    assert scheduler.peek("a") == (10, HUNT)
+    assert scheduler.peek("b") == (1, HUNT)
+
+def test_next_activity_returns_due_activity_and_consumes_it():
+    async def scenario():
+        clock = Clock()
+
+        async def sleep(seconds):
+            clock.now += seconds
+            await asyncio.sleep(0)
+
+        scheduler = DeadlineScheduler(clock=clock, sleep=sleep)
+        scheduler.schedule("a", HUNT, 300)
+        scheduler.schedule("a", INVASION, 60)
+        first = await scheduler.next_activity("a")
+        assert (first, clock.now) == (INVASION, 60)
+        second = await scheduler.next_activity("a")
+        assert (second, clock.now) == (HUNT, 300)
+        assert scheduler.pending("a") == {}
+
+    asyncio.run(scenario())
+
+def test_earlier_deadline_wakes_waiter():
+    async def scenario():
+        scheduler = DeadlineScheduler()
+        scheduler.schedule("a", HUNT, 3600)
+        waiter = asyncio.create_task(scheduler.next_activity("a"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        # Uma invasão que abre durante a penalidade é atendida na hora
+        scheduler.schedule("a", INVASION, 0)
+        assert await asyncio.wait_for(waiter, 1) == INVASION
+        assert scheduler.deadline("a", HUNT) is not None
+
+    asyncio.run(scenario())
+
+def test_waiter_with_no_deadlines_wakes_on_schedule():
+    async def scenario():
+        scheduler = DeadlineScheduler()
+        waiter = asyncio.create_task(scheduler.next_activity("a"))
+        await asyncio.sleep(0.01)
+        scheduler.schedule("a", HUNT, 0)
+        assert await asyncio.wait_for(waiter, 1) == HUNT
+
+    asyncio.run(scenario())
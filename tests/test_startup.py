@@ -0,0 +1,32 @@
+from bot.metrics import MetricsRegistry
+from bot.startup import StartupTimer
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def first_action_gauges(metrics: MetricsRegistry) -> dict:
+    return {g["labels"]["account"]: g["value"] for g in metrics.snapshot()["gauges"]
+            if g["name"] == "time_to_first_action_seconds"}
+
+def test_first_action_is_measured_once_per_account(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("bot.startup.time.perf_counter", clock)
+    metrics = MetricsRegistry()
+    startup = StartupTimer(origin=0.0, metrics=metrics)
+
+    clock.now = 2.0
+    startup.first_action("a")
+    clock.now = 3.0
+    startup.first_action("b")
+    # As atividades seguintes não mexem no tempo até a primeira ação
+    clock.now = 500.0
+    startup.first_action("a")
+    startup.first_action("b")
+
+    assert first_action_gauges(metrics) == {"a": 2.0, "b": 3.0}
+    assert startup.first_action_seconds == 2.0
+    assert startup.first_action_event.is_set()
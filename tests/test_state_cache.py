@@ -0,0 +1,94 @@
+from bot.game_state import GameState
+from bot.state_cache import GameStateCache
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_doujutsu_follows_the_game_timer():
+    clock = Clock()
+    cache = GameStateCache(clock=clock, default_ttl=300)
+    assert cache.doujutsu_remaining() is None
+    cache.record_doujutsu(600)
+    clock.now = 100
+    assert cache.doujutsu_remaining() == 500
+    clock.now = 600
+    assert cache.doujutsu_remaining() is None  # venceu: é preciso ler a página de novo
+
+def test_inactive_doujutsu_is_cached_for_default_ttl():
+    clock = Clock()
+    cache = GameStateCache(clock=clock, default_ttl=300)
+    cache.record_doujutsu(0)
+    clock.now = 299
+    assert cache.doujutsu_remaining() == 0
+    clock.now = 300
+    assert cache.doujutsu_remaining() is None
+    cache.record_doujutsu(0)
+    cache.invalidate_doujutsu()
+    assert cache.doujutsu_remaining() is None
+
+def test_invasion_timer_counts_down_and_available_is_not_cached():
+    clock = Clock()
+    cache = GameStateCache(clock=clock)
+    cache.record_invasion(False, 120)
+    clock.now = 60
+    assert 60 <= cache.invasion_remaining() <= 61
+    clock.now = 120
+    assert cache.invasion_remaining() == 0
+    cache.record_invasion(False, 120)
+    cache.record_invasion(True, 0)
+    assert cache.invasion_remaining() == 0
+
+def test_hp_estimate_needs_a_learned_drop():
+    cache = GameStateCache(clock=Clock())
+    cache.record_hp(100, 100)
+    cache.record_battle()
+    assert cache.hp_estimate() is None
+    assert not cache.hp_is_safe()
+    cache.record_hp(90, 100)
+    assert cache.hp_drop_per_battle == 10
+    assert cache.hp_estimate() == (90, 100)
+
+def test_hp_estimate_discounts_battles_with_the_largest_drop():
+    cache = GameStateCache(clock=Clock())
+    cache.record_hp(100, 100)
+    cache.record_battle()
+    cache.record_battle()
+    cache.record_hp(80, 100)   # 10 por batalha
+    cache.record_battle()
+    cache.record_hp(65, 100)   # 15: a maior perda vale
+    assert cache.hp_drop_per_battle == 15
+    cache.record_battle()
+    assert cache.hp_estimate() == (50, 100)
+    # Mais uma batalha deixaria 35 < 50: não é seguro seguir sem ler o HP
+    assert not cache.hp_is_safe()
+
+def test_hp_is_safe_above_half_after_next_battle():
+    cache = GameStateCache(clock=Clock())
+    cache.record_hp(100, 100)
+    cache.record_battle()
+    cache.record_hp(95, 100)
+    assert cache.hp_is_safe()
+
+def test_hp_estimate_expires_and_invalidates():
+    clock = Clock()
+    cache = GameStateCache(clock=clock, hp_ttl=1800)
+    cache.record_hp(100, 100)
+    cache.record_battle()
+    cache.record_hp(90, 100)
+    clock.now = 1801
+    assert cache.hp_estimate() is None
+    cache.record_hp(90, 100)
+    cache.invalidate_hp()
+    assert cache.hp_estimate() is None
+
+def test_update_from_page_state():
+    cache = GameStateCache(clock=Clock())
+    cache.update(GameState(hp_text="40 / 100", invasion_text="00:02:00"))
+    assert cache.invasion_remaining() == 121
+    cache.record_battle()
+    cache.update(GameState(hp_text="30 / 100"))
+    assert cache.hp_estimate() == (30, 100)